@@ -0,0 +1,264 @@
+# agent_alerts.py
+"""Alertas al webhook de Slack sin bloquear al que llama.
+
+`post()` sólo toca memoria (un dict y un lock) y vuelve enseguida; un worker
+en segundo plano entrega por una sesión HTTP con pool y timeouts.
+
+- Buffer anillo acotado (`capacity`): si se llena se descarta la alerta
+  pendiente más vieja (`dropped` en `stats()`).
+- Deduplicación: un mensaje idéntico a uno pendiente sólo suma al contador; si
+  ya se envió dentro de `window` segundos se retiene y al cerrar la ventana
+  sale un único resumen "(×N en 60 s)".
+- Coalescencia: cada POST lleva hasta `batch` alertas pendientes, una por línea.
+- Token bucket (`rate` POST/s, ráfaga `burst`) y respeto de `Retry-After` en 429
+  (segundos o fecha HTTP; si no se puede leer, el backoff normal).
+"""
+import atexit, logging, threading, time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+log = logging.getLogger(__name__)
+
+TIMEOUT = (3, 10)      # (conexión, lectura) en segundos
+
+
+def retry_after(value, default) -> float:
+    """Segundos a esperar según `Retry-After` (delta en segundos o fecha HTTP, RFC 9110)."""
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """`rate` fichas por segundo, hasta `burst` acumuladas."""
+
+    def __init__(self, rate, burst):
+        self.rate, self.burst = float(rate), float(burst)
+        self.tokens, self.t = float(burst), time.monotonic()
+
+    def wait(self) -> float:
+        """Segundos hasta que haya una ficha (0 si ya hay)."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class AlertDispatcher:
+    """Buffer de alertas deduplicadas + worker con rate limit."""
+
+    def __init__(self, webhook, window=60.0, rate=1.0, burst=5, batch=20, capacity=500,
+                 max_retries=3, backoff=2.0, timeout=TIMEOUT, session=None):
+        self.webhook, self.window, self.batch, self.capacity = webhook, window, batch, capacity
+        self.max_retries, self.backoff, self.timeout = max_retries, backoff, timeout
+        self._session = session
+        self._bucket = TokenBucket(rate, burst)
+        self._pending = OrderedDict()    # texto → [repeticiones, primer timestamp]
+        self._held = {}                  # texto → repeticiones retenidas en la ventana
+        self._sent = {}                  # texto → fin de la ventana de deduplicación
+        self._cv = threading.Condition()
+        self._stop = False
+        self._busy = False
+        self.received = self.delivered = self.posts = self.coalesced = 0
+        self.dropped = self.failed = 0
+        self._thread = None
+
+    # ── API ──────────────────────────────────────────────────────────────
+
+    def start(self):
+        """Arranca el worker (idempotente) y vacía el buffer al salir del proceso."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop, 5.0)
+        return self
+
+    def post(self, message: str) -> bool:
+        """Encola una alerta sin esperar a la red; False si se coalesció con otra."""
+        text, now = str(message).strip(), time.monotonic()
+        with self._cv:
+            self.received += 1
+            if text in self._pending:
+                self._pending[text][0] += 1
+                self.coalesced += 1
+                return False
+            if self._sent.get(text, 0) > now:
+                self._held[text] = self._held.get(text, 0) + 1
+                self.coalesced += 1
+                return False
+            if len(self._pending) >= self.capacity:
+                self._pending.popitem(last=False)   # descarta la más vieja
+                self.dropped += 1
+            self._pending[text] = [1, time.time()]
+            self._cv.notify()
+        return True
+
+    def flush(self, timeout=10.0) -> bool:
+        """Espera a que se entregue todo lo pendiente (no los resúmenes aún en ventana)."""
+        end = time.monotonic() + timeout
+        with self._cv:
+            while self._pending or self._busy:
+                left = end - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cv.wait(min(left, 0.05))
+        return True
+
+    def stop(self, timeout=5.0):
+        """Entrega lo pendiente (resúmenes incluidos) dentro de `timeout` y frena el worker."""
+        with self._cv:
+            for text, n in self._held.items():
+                self._summary(text, n)
+            self._held.clear()
+            self._cv.notify()
+        self.flush(timeout)
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cv:
+            return {"received": self.received, "coalesced": self.coalesced,
+                    "dropped": self.dropped, "posts": self.posts,
+                    "delivered": self.delivered, "failed": self.failed,
+                    "pending": len(self._pending), "held": sum(self._held.values())}
+
+    # ── Worker ───────────────────────────────────────────────────────────
+
+    def _summary(self, text, n):
+        # sin ventana de deduplicación, para que el resumen no vuelva a retenerse
+        key = f"{text} (×{n} en {self.window:g} s)"
+        if key not in self._pending and len(self._pending) < self.capacity:
+            self._pending[key] = [1, time.time()]
+
+    def _release(self, now):
+        """Pasa a pendientes los resúmenes cuya ventana terminó."""
+        for text, end in list(self._sent.items()):
+            if end <= now:
+                del self._sent[text]
+                n = self._held.pop(text, 0)
+                if n:
+                    self._summary(text, n)
+
+    def _take(self):
+        with self._cv:
+            while True:
+                if self._stop:
+                    return None
+                now = time.monotonic()
+                self._release(now)
+                if self._pending:
+                    wait = self._bucket.wait()
+                    if wait <= 0:
+                        break
+                else:
+                    wait = min(self._sent.values(), default=now + 1.0) - now
+                self._cv.wait(min(max(wait, 0.01), 1.0))
+            self._bucket.take()
+            lote = [self._pending.popitem(last=False) for _ in range(min(self.batch, len(self._pending)))]
+            for text, _ in lote:
+                self._sent[text] = now + self.window
+            self._busy = True
+            return lote
+
+    def _run(self):
+        while True:
+            lote = self._take()
+            if lote is None:
+                return
+            try:
+                ok = self._deliver(lote)
+            except Exception:  # el worker nunca debe morir
+                log.exception("alertas: error inesperado")
+                ok = False
+            with self._cv:
+                self.posts += 1
+                if ok:
+                    self.delivered += len(lote)
+                else:
+                    self.failed += len(lote)
+                self._busy = False
+                self._cv.notify_all()
+
+    def _deliver(self, lote) -> bool:
+        text = "\n".join(t if n == 1 else f"{t} (×{n})" for t, (n, _) in lote)
+        if self._session is None:
+            from agent_fetch import session
+            self._session = session()
+        import requests
+        for i in range(self.max_retries + 1):
+            try:
+                r = self._session.post(self.webhook, json={"text": text}, timeout=self.timeout)
+            except requests.RequestException as e:
+                log.warning("alertas: intento %d: %s", i + 1, e)
+                delay = self.backoff ** i
+            else:
+                if r.status_code < 300:
+                    return True
+                if r.status_code != 429 and r.status_code < 500:
+                    log.error("alertas: webhook respondió %d, se descartan %d", r.status_code, len(lote))
+                    return False
+                delay = retry_after(r.headers.get("Retry-After"), self.backoff ** i)
+            if i < self.max_retries:
+                time.sleep(delay)
+        log.error("alertas: %d descartadas tras %d intentos", len(lote), self.max_retries + 1)
+        return False
+
+
+if __name__ == "__main__":
+    # Stand-in local del webhook: rate limit estilo Slack (1 POST/s, 429 + Retry-After)
+    import http.server, json, statistics, sys
+
+    recibidos, ultimo = [], [0.0]
+
+    class Webhook(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            now = time.monotonic()
+            if now - ultimo[0] < 0.5:
+                self.send_response(429); self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0"); self.end_headers()
+                return
+            ultimo[0] = now
+            recibidos.append(body["text"])
+            self.send_response(200); self.send_header("Content-Length", "2"); self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *a):
+            pass
+
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Webhook)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_port}/hook"
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    d = AlertDispatcher(url, window=2.0, rate=1.0, burst=3).start()
+    lat = []
+    for i in range(n):  # un batch que falla: pocas causas distintas repetidas muchas veces
+        t = time.perf_counter()
+        d.post(f"prepare:fuente_{i % 7} falló: ConnectionError")
+        lat.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    d.stop(timeout=30)
+    print(f"post():   p50 {statistics.median(lat)*1e6:.1f} µs   max {max(lat)*1e6:.1f} µs")
+    print(f"entrega:  {time.perf_counter() - t:.2f} s   {len(recibidos)} POST recibidos")
+    print(json.dumps(d.stats()))
+    srv.shutdown()
@@ -0,0 +1,172 @@
+# agent_deploy.py
+"""Despliegue por lotes de tableros generados: un commit y un push para N archivos.
+
+En lugar de `checkout -b` / `add` / `commit` / `push` por tablero, el lote se
+escribe con plumbing de git sobre un índice temporal, sin tocar el working tree
+ni la rama actual:
+
+    hash-object -w --stdin-paths   (todos los blobs en un solo proceso)
+    read-tree <padre> ; update-index --index-info ; write-tree
+    commit-tree ; update-ref ; push <commit>:refs/heads/<rama>   (una conexión)
+
+`DeployBatcher` junta pedidos concurrentes (`submit()` devuelve un Future con la
+URL) y despliega desde su propio thread, así quien llama no espera a git.
+
+Todos los tableros quedan en la misma rama (`BRANCH`), cada uno en
+`<DEST_DIR>/<archivo>`. El subdominio de una app de Streamlit Community Cloud se
+elige al crearla, así que no se deduce del nombre: la URL devuelta es el enlace
+de deploy de ese repo, rama y archivo (`URL_TEMPLATE`). Si las apps se publican
+con otro esquema, `CIVIC_TWIN_DEPLOY_URL` lo reemplaza; admite `{repo}`
+(owner/nombre del remoto), `{branch}`, `{path}` y `{stem}`.
+"""
+import os, queue, re, subprocess, tempfile, threading, time
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import quote
+
+BRANCH   = os.environ.get("CIVIC_TWIN_DEPLOY_BRANCH", "deploy/dashboards")
+REMOTE   = "origin"
+DEST_DIR = "dashboards"
+URL_TEMPLATE = os.environ.get(
+    "CIVIC_TWIN_DEPLOY_URL",
+    "https://share.streamlit.io/deploy?repository={repo}&branch={branch}&mainModule={path}")
+
+
+def dashboard_url(script_path, branch=BRANCH, dest_dir=DEST_DIR, repo_slug="") -> str:
+    """URL de un tablero desplegado: rama y ruta reales dentro de ella (ver `URL_TEMPLATE`)."""
+    path = f"{dest_dir}/{Path(script_path).name}"
+    return URL_TEMPLATE.format(repo=quote(repo_slug, safe="/"), branch=quote(branch, safe=""),
+                               path=quote(path, safe=""), stem=Path(script_path).stem)
+
+def repo_slug(repo=".", remote=REMOTE) -> str:
+    """owner/nombre del remoto (GitHub por https o ssh), o "" si no se puede saber."""
+    try:
+        url = _git(repo, "remote", "get-url", remote)
+    except subprocess.CalledProcessError:
+        return ""
+    m = re.search(r"[:/]([^/:]+/[^/]+?)(?:\.git)?/?$", url)
+    return m.group(1) if m else ""
+
+class GitError(subprocess.CalledProcessError):
+    """CalledProcessError cuyo mensaje incluye el stderr de git."""
+    def __str__(self):
+        return f"{super().__str__()}: {(self.stderr or '').strip()}"
+
+def _git(repo, *args, input=None, env=None):
+    r = subprocess.run(["git", "-C", str(repo), *args], input=input, env=env,
+                       capture_output=True, text=True, check=False)
+    if r.returncode:
+        raise GitError(r.returncode, ["git", *args], r.stdout, r.stderr)
+    return r.stdout.strip()
+
+def _rev(repo, ref):
+    try:
+        return _git(repo, "rev-parse", "--verify", "-q", f"{ref}^{{commit}}")
+    except subprocess.CalledProcessError:
+        return None
+
+def _base(repo, branch, remote, tip, fetch=True):
+    """(padre, es_la_rama) del commit de deploy: la rama local o la del remoto, la
+    que esté más adelante; HEAD si la rama todavía no existe en ningún lado.
+
+    En un clon nuevo la rama existe sólo como `refs/remotes/<remote>/<rama>`;
+    partir del HEAD haría que el push no sea fast-forward. Con `fetch` se
+    actualiza antes esa referencia (si el remoto todavía no tiene la rama, se sigue).
+    """
+    if fetch:
+        try:
+            _git(repo, "fetch", "-q", remote, f"+refs/heads/{branch}:refs/remotes/{remote}/{branch}")
+        except subprocess.CalledProcessError:
+            pass
+    theirs = _rev(repo, f"refs/remotes/{remote}/{branch}")
+    if theirs and (not tip or _is_ancestor(repo, tip, theirs)):
+        return theirs, True
+    if tip:
+        return tip, True
+    return _rev(repo, "HEAD"), False   # rama nueva: parte del HEAD actual
+
+def _is_ancestor(repo, a, b):
+    try:
+        _git(repo, "merge-base", "--is-ancestor", a, b)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+def deploy_many(script_paths, repo=".", branch=BRANCH, remote=REMOTE,
+                dest_dir=DEST_DIR, push=True) -> dict:
+    """Commitea todos los scripts en `dest_dir/` de `branch` y hace un solo push."""
+    paths = list(dict.fromkeys(Path(p).resolve() for p in script_paths))
+    if not paths:
+        return {}
+    blobs = _git(repo, "hash-object", "-w", "--stdin-paths",
+                 input="\n".join(map(str, paths)) + "\n").splitlines()
+    tip = _rev(repo, f"refs/heads/{branch}")
+    parent, on_branch = _base(repo, branch, remote, tip, fetch=push)
+    fd, index = tempfile.mkstemp(prefix="deploy-index-")
+    os.close(fd); os.unlink(index)  # git crea el índice
+    env = {**os.environ, "GIT_INDEX_FILE": index}
+    try:
+        if parent:
+            _git(repo, "read-tree", parent, env=env)
+        info = "".join(f"100644 {sha}\t{dest_dir}/{p.name}\n" for sha, p in zip(blobs, paths))
+        _git(repo, "update-index", "--add", "--index-info", input=info, env=env)
+        tree = _git(repo, "write-tree", env=env)
+    finally:
+        Path(index).unlink(missing_ok=True)
+    if on_branch and _git(repo, "rev-parse", f"{parent}^{{tree}}") == tree:
+        commit = parent  # nada cambió
+    else:
+        msg = f"Deploy {len(paths)} dashboard(s): " + ", ".join(p.stem for p in paths[:10])
+        commit = _git(repo, "commit-tree", tree, *(["-p", parent] if parent else []), "-m", msg)
+    if commit != tip:
+        _git(repo, "update-ref", f"refs/heads/{branch}", commit, tip or "")
+    if push:
+        _git(repo, "push", remote, f"{commit}:refs/heads/{branch}")
+    slug = repo_slug(repo, remote)
+    return {str(p): dashboard_url(p, branch, dest_dir, slug) for p in paths}
+
+
+class DeployBatcher:
+    """Cola de despliegues: agrupa lo que llega dentro de `linger` segundos en un lote."""
+
+    def __init__(self, repo=".", branch=BRANCH, remote=REMOTE, dest_dir=DEST_DIR,
+                 linger=0.5, max_batch=200, push=True):
+        self.kw = dict(repo=repo, branch=branch, remote=remote, dest_dir=dest_dir, push=push)
+        self.linger, self.max_batch = linger, max_batch
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="deploy-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, script_path) -> Future:
+        """Encola un script; el Future resuelve a su URL pública."""
+        fut = Future()
+        self._q.put((str(Path(script_path).resolve()), fut))
+        return fut
+
+    def close(self, timeout=None):
+        self._q.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            lote, end = [item], time.monotonic() + self.linger
+            while len(lote) < self.max_batch:
+                try:
+                    item = self._q.get(timeout=max(end - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._q.put(None)  # procesar este lote y salir en la próxima vuelta
+                    break
+                lote.append(item)
+            try:
+                urls = deploy_many([p for p, _ in lote], **self.kw)
+            except Exception as e:
+                for _, f in lote:
+                    f.set_exception(e)
+            else:
+                for p, f in lote:
+                    f.set_result(urls[p])
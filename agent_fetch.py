@@ -0,0 +1,200 @@
+# agent_fetch.py
+"""Descargas en streaming, reanudables y con caché por contenido para `fetch_data`.
+
+- Sesión `requests` compartida con pool de conexiones y timeouts.
+- Escritura por bloques a un `.part` y rename atómico al terminar.
+- Reanudación con `Range` / `If-Range` si la descarga anterior quedó a medias;
+  un `.part` completo (caída antes del rename, o 416 con el mismo tamaño) se
+  termina sin volver a bajarlo y uno que no coincide se descarta.
+- Peticiones condicionales (`If-None-Match` / `If-Modified-Since`): un 304
+  reutiliza el objeto ya descargado en la caché (direccionada por sha256).
+  El destino recibe siempre una copia: editarlo no toca el objeto cacheado.
+- `prune` (después de cada descarga nueva) borra los objetos que ningún índice
+  referencia y, si la caché pasa de `MAX_BYTES`, los más viejos.
+- `fetch_many` descarga varias fuentes en paralelo.
+
+Caché:  <FETCH_DIR>/objects/<sha256>   index/<hash(url)>.json   partial/<hash(url)>.part
+"""
+import hashlib, json, os, shutil, threading, time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FETCH_DIR  = Path(os.environ.get("CIVIC_TWIN_FETCH_CACHE", "/tmp/civic_twin_fetch"))
+CHUNK      = 1 << 20
+TIMEOUT    = (10, 60)      # (conexión, lectura) en segundos
+POOL_SIZE  = 16
+MAX_BYTES  = int(os.environ.get("CIVIC_TWIN_FETCH_MAX_MB", 4096)) << 20
+GRACE_S    = 300           # objetos más nuevos que esto no se tocan (descargas en curso)
+
+_session, _session_lock = None, threading.Lock()
+_url_locks = defaultdict(threading.Lock)   # una descarga a la vez por URL
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+def session() -> requests.Session:
+    """Sesión HTTP compartida (keep-alive + pool) para todo el proceso."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            s.mount("http://", adapter); s.mount("https://", adapter)
+            _session = s
+        return _session
+
+def _key(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+def _read_json(p):
+    try:
+        return json.loads(p.read_text())
+    except (OSError, ValueError):
+        return None
+
+def _write_json(p, data):
+    tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, p)
+
+def _materialize(obj: Path, dest: Path):
+    """Deja en `dest` una copia del objeto cacheado (no un hardlink: quien edite o
+    agregue al archivo no debe corromper lo que un 304 va a reutilizar)."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.copyfile(obj, tmp)
+    os.replace(tmp, dest)
+
+def _discard(part, part_meta):
+    part.unlink(missing_ok=True); part_meta.unlink(missing_ok=True)
+
+def _range_total(r):
+    """Tamaño total de `Content-Range: bytes */N` (respuesta 416), o None."""
+    try:
+        return int(r.headers.get("Content-Range", "").rpartition("/")[2])
+    except ValueError:
+        return None
+
+
+def download(url, dest=None, sha256=None, cache_dir=FETCH_DIR, timeout=TIMEOUT) -> Path:
+    """Descarga `url` a `dest` (por defecto /tmp/<hash(url)>-<nombre>) y devuelve la ruta."""
+    with _url_locks[(str(cache_dir), url)]:
+        return _download(url, dest, sha256, Path(cache_dir), timeout)
+
+def _download(url, dest, sha256, cache_dir, timeout):
+    for d in ("objects", "index", "partial"):
+        (cache_dir/d).mkdir(parents=True, exist_ok=True)
+    k = _key(url)
+    # el hash de la URL en el nombre: dos URLs que terminan en data.csv no se pisan
+    dest = Path(dest) if dest else Path("/tmp")/f"{k[:12]}-{Path(urlparse(url).path).name or 'data'}"
+    idx_path, part, part_meta = cache_dir/"index"/f"{k}.json", \
+        cache_dir/"partial"/f"{k}.part", cache_dir/"partial"/f"{k}.json"
+
+    headers = {}
+    idx = _read_json(idx_path)
+    if idx and (cache_dir/"objects"/idx["sha256"]).exists():
+        if idx.get("etag"):
+            headers["If-None-Match"] = idx["etag"]
+        if idx.get("last_modified"):
+            headers["If-Modified-Since"] = idx["last_modified"]
+
+    h, offset, done = hashlib.sha256(), 0, False
+    meta = (_read_json(part_meta) if part.exists() else None) or {}
+    etag, lm, size = meta.get("etag"), meta.get("last_modified"), meta.get("size")
+    if (etag or lm) and size is not None and part.stat().st_size > size:
+        _discard(part, part_meta)           # más bytes que los anunciados: no sirve
+        etag = lm = None
+    if etag or lm:
+        with open(part, "rb") as f:
+            for b in iter(lambda: f.read(CHUNK), b""):
+                h.update(b)
+        offset = part.stat().st_size
+        done = offset == size               # completo: el proceso cayó antes del rename
+        headers["Range"], headers["If-Range"] = f"bytes={offset}-", etag or lm
+
+    while not done:
+        with session().get(url, headers=headers, stream=True, timeout=timeout) as r:
+            if r.status_code == 304:
+                obj = cache_dir/"objects"/idx["sha256"]
+                os.utime(obj)                   # reciente para `prune`
+                _materialize(obj, dest)
+                return dest
+            if r.status_code == 416 and "Range" in headers:
+                if _range_total(r) == offset:   # el .part ya tenía todo
+                    break
+                _discard(part, part_meta)       # no coincide con el recurso: desde cero
+                del headers["Range"], headers["If-Range"]
+                h, offset = hashlib.sha256(), 0
+                continue
+            r.raise_for_status()
+            if r.status_code != 206:  # el servidor ignoró el Range: desde cero
+                h, offset = hashlib.sha256(), 0
+            etag, lm = r.headers.get("ETag"), r.headers.get("Last-Modified")
+            total = r.headers.get("Content-Length")
+            size = (offset + int(total) if total is not None
+                    and not r.headers.get("Content-Encoding") else None)
+            _write_json(part_meta, {"url": url, "etag": etag, "last_modified": lm, "size": size})
+            with open(part, "ab" if offset else "wb") as f:
+                for b in r.iter_content(CHUNK):
+                    f.write(b)
+                    h.update(b)
+            if size is not None and part.stat().st_size != size:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"Descarga incompleta de {url}; se reanudará en el próximo intento")
+            done = True
+
+    digest = h.hexdigest()
+    if sha256 and digest != sha256.lower():
+        _discard(part, part_meta)
+        raise ChecksumError(f"sha256 de {url} no coincide: {digest}")
+    obj = cache_dir/"objects"/digest
+    os.replace(part, obj)
+    part_meta.unlink(missing_ok=True)
+    _write_json(idx_path, {"url": url, "sha256": digest, "size": obj.stat().st_size,
+                           "etag": etag, "last_modified": lm})
+    _materialize(obj, dest)
+    prune(cache_dir)
+    return dest
+
+def prune(cache_dir=FETCH_DIR, max_bytes=MAX_BYTES, grace=GRACE_S) -> list:
+    """Borra objetos sin índice que los referencie y, si la caché supera `max_bytes`,
+    los referenciados más viejos (con su índice). Devuelve los objetos borrados."""
+    cache_dir = Path(cache_dir)
+    now, refs = time.time(), {}
+    for p in (cache_dir/"index").glob("*.json"):
+        idx = _read_json(p)
+        if idx and idx.get("sha256"):
+            refs.setdefault(idx["sha256"], []).append(p)
+    objs = []
+    for o in (cache_dir/"objects").iterdir():
+        try:
+            st = o.stat()
+        except FileNotFoundError:
+            continue
+        if now - st.st_mtime >= grace:
+            objs.append((st.st_mtime, st.st_size, o))
+    total = sum(size for _, size, _ in objs)
+    removed = []
+    for mtime, size, o in sorted(objs, key=lambda x: (x[2].name in refs, x[0])):
+        if o.name in refs and total <= max_bytes:
+            break
+        for p in refs.get(o.name, ()):
+            p.unlink(missing_ok=True)
+        o.unlink(missing_ok=True)
+        total -= size
+        removed.append(o)
+    return removed
+
+def fetch_many(sources, max_workers=4, **kw) -> list:
+    """Descarga varias fuentes `{"url": ..., "sha256": ...}` en paralelo (orden preservado)."""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futs = [ex.submit(download, s["url"], s.get("dest"), s.get("sha256"), **kw)
+                for s in sources]
+        return [str(f.result()) for f in futs]
@@ -0,0 +1,161 @@
+# agent_llm_cache.py
+"""Caché persistente y determinista de respuestas del LLM (SQLite).
+
+La clave es el sha256 de (`llm_string`, prompt): LangChain arma `llm_string` con
+el modelo, la temperatura y demás parámetros, incluidas las `functions` (el
+schema de las tools) del agente openai-functions; el prompt son los mensajes
+serializados. Así dos corridas idénticas comparten respuesta.
+
+Modos (`CIVIC_TWIN_LLM_CACHE_MODE`):
+  cache   lee y escribe (default)
+  record  siempre llama al LLM y graba/actualiza la respuesta
+  replay  sólo lee; un miss lanza `CacheMiss` (corridas 100 % offline)
+  off     sin caché
+
+Eviction: TTL opcional por antigüedad + LRU por cantidad máxima de entradas.
+"""
+import hashlib, os, sqlite3, threading, time, warnings
+from pathlib import Path
+
+DB_PATH     = Path(os.environ.get("CIVIC_TWIN_LLM_CACHE", "/tmp/civic_twin_llm_cache.sqlite"))
+MODES       = ("cache", "record", "replay", "off")
+MAX_ENTRIES = 10_000
+EVICT_EVERY = 100
+
+
+class CacheMiss(LookupError):
+    """Respuesta no grabada en modo replay."""
+
+
+class ResponseStore:
+    """Tabla clave → respuesta serializada, con TTL, LRU y contadores de aciertos."""
+
+    def __init__(self, path=DB_PATH, ttl=None, max_entries=MAX_ENTRIES, mode="cache"):
+        if mode not in MODES:
+            raise ValueError(f"Modo de caché {mode!r} no soportado")
+        self.path, self.ttl, self.max_entries, self.mode = Path(path), ttl, max_entries, mode
+        self.hits = self.misses = self.writes = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, value TEXT NOT NULL,
+            created REAL NOT NULL, accessed REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    @staticmethod
+    def key(llm_string: str, prompt: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def get(self, key):
+        if self.mode in ("off", "record"):
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key=?",
+                                   (key,)).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key=?", (key,))
+                row = None
+            if row:
+                self._db.execute("UPDATE responses SET accessed=? WHERE key=?", (now, key))
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+        if self.mode == "replay":
+            raise CacheMiss(f"Respuesta {key[:12]} no grabada (modo replay)")
+        return None
+
+    def put(self, key, value: str):
+        if self.mode in ("off", "replay"):
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                             (key, value, now, now))
+            self.writes += 1
+            if self.writes % EVICT_EVERY == 0:
+                self._evict(now)
+
+    def evict(self):
+        with self._lock:
+            self._evict(time.time())
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        self._db.execute("""DELETE FROM responses WHERE key IN (
+            SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+                         (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            n = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"mode": self.mode, "entries": n, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+# ── Integración con LangChain (import perezoso) ─────────────────────────────
+
+def _serde():
+    try:
+        from langchain_core.load import dumps, loads
+    except ImportError:  # langchain < 0.1
+        from langchain.load.dump import dumps
+        from langchain.load.load import loads
+    return dumps, loads
+
+def langchain_cache(store: ResponseStore):
+    """Adaptador `BaseCache` de LangChain sobre un ResponseStore."""
+    try:
+        from langchain_core.caches import BaseCache
+    except ImportError:
+        from langchain.schema import BaseCache
+    dumps, loads = _serde()
+
+    class _Cache(BaseCache):
+        def lookup(self, prompt, llm_string):
+            raw = store.get(store.key(llm_string, prompt))
+            if raw is None:
+                return None
+            with warnings.catch_warnings():  # `loads` es beta en langchain_core
+                warnings.simplefilter("ignore")
+                return loads(raw)
+
+        def update(self, prompt, llm_string, return_val):
+            store.put(store.key(llm_string, prompt), dumps(list(return_val)))
+
+        def clear(self, **kwargs):
+            store.clear()
+
+    return _Cache()
+
+def install(path=DB_PATH, mode=None, ttl=None, max_entries=MAX_ENTRIES) -> ResponseStore:
+    """Crea el store y lo registra como caché global de LangChain."""
+    mode = mode or os.environ.get("CIVIC_TWIN_LLM_CACHE_MODE", "cache")
+    store = ResponseStore(path, ttl=ttl, max_entries=max_entries, mode=mode)
+    cache = None if mode == "off" else langchain_cache(store)
+    try:
+        from langchain_core.globals import set_llm_cache
+    except ImportError:
+        try:
+            from langchain.globals import set_llm_cache
+        except ImportError:  # langchain < 0.1
+            import langchain
+            set_llm_cache = lambda c: setattr(langchain, "llm_cache", c)
+    set_llm_cache(cache)
+    return store
+
+def fake_llm(responses):
+    """Chat model falso que devuelve `responses` en orden (pruebas y benchmarks offline)."""
+    try:
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    except ImportError:
+        from langchain.chat_models.fake import FakeListChatModel
+    return FakeListChatModel(responses=list(responses))
@@ -0,0 +1,263 @@
+# agent_pipeline.py
+"""Orquestador DAG para correr las tools del Agent en paralelo, sin un turno de LLM por paso.
+
+Un job es una lista de `Node` (función + argumentos). Los argumentos pueden
+contener `Ref("otro_nodo")`, que se reemplaza por el resultado de ese nodo; las
+dependencias salen de ahí. Cada nodo corre en cuanto sus dependencias terminan:
+I/O en un pool de threads, CPU (`prepare_data`) en un pool de procesos y los
+pasos que no admiten concurrencia en un pool serial de un solo thread.
+Así el tiempo total tiende al camino crítico y no a la suma de los pasos.
+
+Los nodos con `cache=True` guardan su resultado por hash de entradas (función,
+argumentos ya resueltos y tamaño/mtime de los archivos que reciben) junto con una
+copia (hardlink si se puede) de cada archivo que devuelven, en `<cache>/<hash>/`.
+Un acierto restaura esa copia en la ruta original si algo la pisó o la borró
+después (cada nodo escribe su propia ruta: `prepare_data` la nombra por hash de
+fuente y plan, `fetch_data` por hash de URL).
+Se conservan las últimas `MAX_CACHED` entradas. `on_event` recibe el timing de
+cada nodo al vuelo.
+
+    report = run(plan_job({"sources": [...], "dashboards": [...]}))
+"""
+import asyncio, hashlib, json, logging, os, shutil, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.environ.get("CIVIC_TWIN_PIPELINE_CACHE", "/tmp/civic_twin_pipeline"))
+POOLS     = ("thread", "process", "serial")
+MAX_CACHED = 64
+
+
+@dataclass(frozen=True)
+class Ref:
+    """Referencia al resultado de otro nodo."""
+    node: str
+
+@dataclass
+class Node:
+    id:     str
+    fn:     Callable
+    args:   tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    deps:   tuple = ()          # dependencias extra, además de las `Ref`
+    pool:   str = "thread"
+    cache:  bool = False
+
+    def refs(self):
+        out = set(self.deps)
+        _walk((self.args, self.kwargs), lambda r: out.add(r.node))
+        return out
+
+
+def _walk(obj, fn):
+    if isinstance(obj, Ref):
+        return fn(obj)
+    if isinstance(obj, dict):
+        return {k: _walk(v, fn) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_walk(v, fn) for v in obj)
+    return obj
+
+def _fingerprint(obj):
+    """Versión JSON-able de los argumentos; los archivos existentes aportan tamaño y mtime."""
+    if isinstance(obj, dict):
+        return {str(k): _fingerprint(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_fingerprint(v) for v in obj]
+    if isinstance(obj, str) and len(obj) < 4096 and os.path.isfile(obj):
+        st = os.stat(obj)
+        return [obj, st.st_size, st.st_mtime_ns]
+    return obj if isinstance(obj, (int, float, bool, type(None))) else str(obj)
+
+def _cache_key(node, args, kwargs):
+    fp = {"fn": f"{node.fn.__module__}.{node.fn.__qualname__}",
+          "args": _fingerprint(args), "kwargs": _fingerprint(kwargs)}
+    return hashlib.sha256(json.dumps(fp, sort_keys=True).encode()).hexdigest()
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _artifacts(res):
+    """Archivos (rutas absolutas existentes) que devolvió un nodo."""
+    paths = res if isinstance(res, list) else [res]
+    return [p for p in paths if isinstance(p, str) and p.startswith("/") and os.path.isfile(p)]
+
+def _place(src, dest):
+    """Copia atómica `src` → `dest` (hardlink si están en el mismo filesystem)."""
+    dest = Path(dest)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+def _store(key, node_id, res, cache_dir):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    arts = {}
+    for i, p in enumerate(_artifacts(res)):
+        copy = cache_dir/key/f"{i}-{Path(p).name}"
+        copy.parent.mkdir(exist_ok=True)
+        _place(p, copy)
+        arts[p] = [str(copy), *_stat(copy)]
+    (cache_dir/f"{key}.json").write_text(json.dumps({"node": node_id, "result": res,
+                                                     "artifacts": arts}))
+    entries = sorted(cache_dir.glob("*.json"), key=lambda f: f.stat().st_mtime_ns)
+    for old in entries[:-MAX_CACHED]:
+        old.unlink(missing_ok=True)
+        shutil.rmtree(cache_dir/old.stem, ignore_errors=True)
+
+def _cached(key, cache_dir):
+    """(resultado, válido); si válido, los archivos del resultado ya son los de la caché."""
+    try:
+        entry = json.loads((cache_dir/f"{key}.json").read_text())
+        res, arts = entry["result"], entry["artifacts"]
+        for path, (copy, size, mtime) in arts.items():
+            if _stat(copy) != [size, mtime]:
+                return None, False      # alguien modificó la copia: no es confiable
+            if not os.path.exists(path) or _stat(path) != [size, mtime]:
+                _place(copy, path)      # otra corrida pisó (o borró) la salida
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, False
+    return res, True
+
+
+def _validate(nodes):
+    ids = {n.id: n for n in nodes}
+    if len(ids) != len(nodes):
+        raise ValueError("IDs de nodo duplicados")
+    for n in nodes:
+        if n.pool not in POOLS:
+            raise ValueError(f"Pool {n.pool!r} no soportado en {n.id}")
+        missing = n.refs() - ids.keys()
+        if missing:
+            raise ValueError(f"{n.id} depende de nodos inexistentes: {sorted(missing)}")
+    seen, stack = set(), set()
+    def visit(i):
+        if i in stack:
+            raise ValueError(f"Ciclo en el DAG en {i}")
+        if i not in seen:
+            stack.add(i)
+            for d in ids[i].refs():
+                visit(d)
+            stack.discard(i); seen.add(i)
+    for i in ids:
+        visit(i)
+    return ids
+
+
+async def _execute(nodes, max_threads, max_procs, cache_dir, on_event):
+    ids = _validate(nodes)
+    deps = {i: n.refs() for i, n in ids.items()}
+    children = {i: [j for j in ids if i in deps[j]] for i in ids}
+    pending = {i: len(d) for i, d in deps.items()}
+    results, timings, status = {}, {}, {}
+    loop = asyncio.get_running_loop()
+    pools = {"thread": ThreadPoolExecutor(max_threads, thread_name_prefix="pipeline"),
+             "process": ProcessPoolExecutor(max_procs),
+             "serial": ThreadPoolExecutor(1, thread_name_prefix="pipeline-serial")}
+
+    def emit(**ev):
+        log.info("pipeline %s", ev)
+        if on_event:
+            on_event(ev)
+
+    async def exec_node(n):
+        args, kwargs = (_walk(x, lambda r: results[r.node]) for x in (n.args, n.kwargs))
+        t0 = time.perf_counter()
+        key = _cache_key(n, args, kwargs) if n.cache else None
+        if key:
+            res, ok = _cached(key, cache_dir)
+            if ok:
+                emit(node=n.id, status="cached", seconds=0.0)
+                return res, "cached", 0.0
+        emit(node=n.id, status="start")
+        res = await loop.run_in_executor(pools[n.pool], _call, n.fn, args, kwargs)
+        secs = time.perf_counter() - t0
+        if key:
+            _store(key, n.id, res, cache_dir)
+        emit(node=n.id, status="done", seconds=secs)
+        return res, "done", secs
+
+    running = {}
+    def launch(i):
+        running[asyncio.ensure_future(exec_node(ids[i]))] = i
+
+    def skip(i):
+        for c in children[i]:
+            if c not in status:
+                status[c] = "skipped"
+                emit(node=c, status="skipped")
+                skip(c)
+
+    try:
+        for i, k in pending.items():
+            if k == 0:
+                launch(i)
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                i = running.pop(t)
+                try:
+                    results[i], status[i], timings[i] = t.result()
+                except Exception as e:
+                    status[i], results[i] = "error", repr(e)
+                    emit(node=i, status="error", error=repr(e))
+                    skip(i)
+                    continue
+                for c in children[i]:
+                    pending[c] -= 1
+                    if pending[c] == 0 and c not in status:
+                        launch(c)
+    finally:
+        for p in pools.values():
+            p.shutdown(wait=False, cancel_futures=True)
+    return results, status, timings
+
+def _call(fn, args, kwargs):
+    return fn(*args, **kwargs)
+
+def run(nodes, max_threads=8, max_procs=None, cache_dir=CACHE_DIR, on_event=None) -> dict:
+    """Ejecuta el DAG y devuelve resultados, estado y timing por nodo."""
+    t0 = time.perf_counter()
+    results, status, timings = asyncio.run(
+        _execute(list(nodes), max_threads, max_procs, Path(cache_dir), on_event))
+    wall = time.perf_counter() - t0
+    return {"results": results, "status": status, "timings": timings, "wall": wall,
+            "sum": sum(timings.values()),
+            "failed": sorted(i for i, s in status.items() if s in ("error", "skipped"))}
+
+
+def plan_job(spec: dict) -> list:
+    """Traduce un job de alto nivel a nodos del DAG.
+
+    spec = {"sources":    [{"name": "ventas", "source": {...}, "transforms": [...]}, ...],
+            "dashboards": [{"params": {"project_name": ..., ...},
+                            "data": ["ventas", ...], "deploy": True}, ...]}
+
+    Cada dashboard recibe en `params["data_paths"]` las rutas de los datos ya
+    preparados que declara en `data`.
+    """
+    import my_agent as A
+    nodes = []
+    for s in spec.get("sources", []):
+        name = s["name"]
+        nodes.append(Node(f"fetch:{name}", A.fetch_data, (s["source"],)))
+        nodes.append(Node(f"prepare:{name}", A.prepare_data,
+                          (Ref(f"fetch:{name}"), s.get("transforms", [])),
+                          s.get("prepare_kwargs", {}), pool="process", cache=True))
+    for d in spec.get("dashboards", []):
+        project = d["params"]["project_name"]
+        params = dict(d["params"], data_paths={n: Ref(f"prepare:{n}") for n in d.get("data", [])})
+        nodes.append(Node(f"generate:{project}", A.generate_dashboard, (params,), cache=True))
+        if d.get("deploy"):
+            # los deploys concurrentes se agrupan en un solo commit/push (DeployBatcher)
+            nodes.append(Node(f"deploy:{project}", A.deploy_dashboard,
+                              (Ref(f"generate:{project}"),)))
+    return nodes
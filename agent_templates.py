@@ -0,0 +1,60 @@
+# agent_templates.py
+"""Servicio de plantillas para `generate_dashboard`.
+
+Un único `jinja2.Environment` por directorio de plantillas: las plantillas se
+compilan una vez (caché en memoria + bytecode en disco) y se recargan solas si
+cambia su mtime. `render_many` genera muchos tableros en una pasada, escribe en
+paralelo y no toca los archivos cuyo contenido no cambió.
+"""
+import hashlib, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+TEMPLATE_DIR = "templates"
+TEMPLATE     = "dashboard.py.j2"
+BYTECODE_DIR = Path(os.environ.get("CIVIC_TWIN_JINJA_CACHE", "/tmp/civic_twin_jinja"))
+OUT_DIR      = Path("/tmp")
+
+
+@lru_cache(maxsize=None)
+def environment(template_dir=TEMPLATE_DIR) -> Environment:
+    """Environment compartido (auto-reload por mtime, bytecode cache en disco)."""
+    BYTECODE_DIR.mkdir(parents=True, exist_ok=True)
+    return Environment(loader=FileSystemLoader(template_dir), auto_reload=True,
+                       bytecode_cache=FileSystemBytecodeCache(str(BYTECODE_DIR)))
+
+def render(params: dict, template=TEMPLATE, template_dir=TEMPLATE_DIR) -> str:
+    return environment(str(template_dir)).get_template(template).render(**params)
+
+def output_path(params: dict, out_dir=OUT_DIR) -> Path:
+    return Path(out_dir)/f"dashboard_{params['project_name']}.py"
+
+def write_if_changed(path, text: str) -> bool:
+    """Escribe `text` (atómico) sólo si difiere por hash del contenido actual."""
+    path, data = Path(path), text.encode()
+    try:
+        if hashlib.sha256(path.read_bytes()).digest() == hashlib.sha256(data).digest():
+            return False
+    except FileNotFoundError:
+        pass
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+def render_many(params_list, out_dir=OUT_DIR, template=TEMPLATE,
+                template_dir=TEMPLATE_DIR, max_workers=8) -> list:
+    """Renderiza varios `params` con la plantilla ya compilada y escribe en paralelo.
+
+    Devuelve `[(ruta, escrito)]` en el mismo orden; `escrito` es False si el
+    archivo ya tenía exactamente ese contenido.
+    """
+    tpl = environment(str(template_dir)).get_template(template)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    jobs = [(output_path(p, out_dir), tpl.render(**p)) for p in params_list]
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        written = list(ex.map(lambda j: write_if_changed(*j), jobs))
+    return [(str(path), w) for (path, _), w in zip(jobs, written)]
@@ -0,0 +1,437 @@
+# agent_transforms.py
+"""Motor de transformaciones por bloques (out-of-core) para `prepare_data`.
+
+La lista de transforms se compila una vez a un plan: las operaciones sin estado
+se fusionan en una sola función por bloque y `dedupe` guarda sólo hashes de
+64 bits de las claves ya vistas, en memoria hasta `max_memory_mb` (default
+`CIVIC_TWIN_DEDUPE_MB`, 256) y en corridas ordenadas en disco por encima. El CSV se lee de a
+`chunksize` filas y la salida se escribe incrementalmente (CSV, o Parquet si
+está instalado pyarrow), así la memoria pico depende del bloque y no del archivo.
+Con `workers > 1` los rangos del archivo se procesan en paralelo en varios procesos.
+
+Benchmark de escalado:  python agent_transforms.py [n_filas]
+
+Operaciones:
+  {"op": "dropna", "subset": [...]}            {"op": "rename", "mappings": {...}}
+  {"op": "filter", "expr": "precio > 0"}       {"op": "cast", "dtypes": {"col": "float32"}}
+  {"op": "select", "columns": [...]}           {"op": "derive", "column": "c", "expr": "a * b"}
+  {"op": "dedupe", "subset": [...], "max_memory_mb": 256, "spill_dir": None}
+"""
+import io, logging, os, shutil, tempfile, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np, pandas as pd
+
+log = logging.getLogger(__name__)
+
+CHUNKSIZE = 100_000
+
+
+# ── Operaciones ─────────────────────────────────────────────────────────────
+
+def _dropna(t):   return lambda df: df.dropna(subset=t.get("subset"))
+def _rename(t):   return lambda df: df.rename(columns=t["mappings"])
+def _filter(t):   return lambda df: df.query(t["expr"])
+def _cast(t):     return lambda df: df.astype(t["dtypes"])
+def _select(t):   return lambda df: df[list(t["columns"])]
+def _derive(t):   return lambda df: df.assign(**{t["column"]: df.eval(t["expr"])})
+
+DEDUPE_MEMORY = int(os.environ.get("CIVIC_TWIN_DEDUPE_MB", 256)) << 20
+MERGE_BLOCK   = 1 << 20          # elementos por paso al fusionar corridas en disco
+
+def _isin_sorted(run, h):
+    """Máscara `h ∈ run` para un array ordenado (en memoria o mapeado)."""
+    if not len(run):
+        return np.zeros(len(h), dtype=bool)
+    i = np.minimum(np.searchsorted(run, h), len(run) - 1)
+    return run[i] == h
+
+def _merge_sorted(a, b, out, block=MERGE_BLOCK):
+    """Fusiona dos arrays ordenados y disjuntos en `out` de a bloques (memoria ~2·block)."""
+    i = j = k = 0
+    na, nb = len(a), len(b)
+    while i < na or j < nb:
+        if j >= nb:
+            x, i = np.asarray(a[i:i + block]), min(i + block, na)
+        elif i >= na:
+            x, j = np.asarray(b[j:j + block]), min(j + block, nb)
+        else:   # hasta el menor de los dos fines de bloque: nada posterior queda atrás
+            p = min(a[min(i + block, na) - 1], b[min(j + block, nb) - 1])
+            ia = i + int(np.searchsorted(a[i:i + block], p, "right"))
+            jb = j + int(np.searchsorted(b[j:j + block], p, "right"))
+            x = np.concatenate([a[i:ia], b[j:jb]])
+            x.sort()
+            i, j = ia, jb
+        out[k:k + len(x)] = x
+        k += len(x)
+    return out
+
+class SeenSet:
+    """Conjunto de hashes uint64 con memoria acotada (estructura tipo LSM).
+
+    Las altas van a corridas ordenadas en memoria que se fusionan de a pares
+    de tamaño parecido (costo amortizado O(log n) por clave). Cuando superan
+    `max_bytes` se fusionan en una corrida `.npy` en disco; las corridas en
+    disco también se fusionan de a pares, por bloques, y se consultan con
+    `searchsorted` sobre el archivo mapeado (lo resuelve el page cache del SO).
+    """
+
+    def __init__(self, max_bytes=DEDUPE_MEMORY, spill_dir=None):
+        self.cap = max(int(max_bytes) // 8 // 2, 1 << 10)   # la otra mitad: temporales de fusión
+        self.spill_dir, self._tmp, self._n = spill_dir, None, 0
+        self.mem, self.disk = [], []     # corridas ordenadas, de mayor a menor
+        self.spills = 0
+
+    def __len__(self):
+        return sum(map(len, self.mem)) + sum(map(len, self.disk))
+
+    def contains(self, h):
+        m = np.zeros(len(h), dtype=bool)
+        for run in self.mem:
+            m |= _isin_sorted(run, h)
+        if self.disk:
+            order = np.argsort(h, kind="stable")      # consultas ordenadas: acceso secuencial al archivo
+            hs, md = h[order], np.zeros(len(h), dtype=bool)
+            for run in self.disk:
+                md |= _isin_sorted(run, hs)
+            m[order] |= md
+        return m
+
+    def add(self, h):
+        """Agrega hashes únicos que todavía no están en el conjunto."""
+        if not len(h):
+            return
+        self.mem.append(np.sort(h))
+        while len(self.mem) > 1 and len(self.mem[-2]) <= 2 * len(self.mem[-1]):
+            b, a = self.mem.pop(), self.mem.pop()
+            self.mem.append(_merge_sorted(a, b, np.empty(len(a) + len(b), np.uint64)))
+        if sum(map(len, self.mem)) > self.cap:
+            self._spill()
+
+    def _spill(self):
+        run = self.mem.pop()
+        while self.mem:
+            a = self.mem.pop()
+            run = _merge_sorted(a, run, np.empty(len(a) + len(run), np.uint64))
+        self.disk.append(self._write(run))
+        self.spills += 1
+        while len(self.disk) > 1 and len(self.disk[-2]) <= 2 * len(self.disk[-1]):
+            b, a = self.disk.pop(), self.disk.pop()
+            out = self._open(len(a) + len(b))
+            _merge_sorted(a, b, out).flush()
+            for r in (a, b):
+                Path(r.filename).unlink(missing_ok=True)
+            self.disk.append(np.load(out.filename, mmap_mode="r"))
+
+    def _open(self, n):
+        if self._tmp is None:   # se borra solo al liberar el conjunto
+            self._tmp = tempfile.TemporaryDirectory(prefix=".dedupe-", dir=self.spill_dir)
+        self._n += 1
+        path = Path(self._tmp.name)/f"run{self._n:06d}.npy"
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint64, shape=(n,))
+
+    def _write(self, run):
+        out = self._open(len(run))
+        out[:] = run
+        out.flush()
+        return np.load(out.filename, mmap_mode="r")
+
+class _Dedupe:
+    """Descarta filas repetidas entre bloques recordando sólo el hash de la clave
+    (`max_memory_mb` acota la memoria; el resto se vuelca a disco)."""
+    def __init__(self, t):
+        self.subset = t.get("subset")
+        mb = t.get("max_memory_mb")
+        self.seen = SeenSet(DEDUPE_MEMORY if mb is None else int(mb) << 20, t.get("spill_dir"))
+
+    def __call__(self, df):
+        keys = df if self.subset is None else df[self.subset]
+        h = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+        nuevo = ~pd.Series(h).duplicated().to_numpy()
+        nuevo[nuevo] = ~self.seen.contains(h[nuevo])
+        self.seen.add(h[nuevo])
+        return df[nuevo]
+
+OPS = {"dropna": _dropna, "rename": _rename, "filter": _filter, "cast": _cast,
+       "select": _select, "derive": _derive, "dedupe": _Dedupe}
+
+
+def compile_plan(transforms):
+    """Valida la lista de transforms y devuelve una función bloque → bloque."""
+    steps = []
+    for t in transforms or []:
+        if t.get("op") not in OPS:
+            raise ValueError(f"Transform {t.get('op')!r} no soportado")
+        steps.append(OPS[t["op"]](t))
+
+    def plan(df):
+        for step in steps:
+            df = step(df)
+        return df
+    return plan
+
+
+# ── Escritores incrementales ────────────────────────────────────────────────
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.f, self.header = open(path, "w", newline=""), True
+
+    def write(self, df):
+        df.to_csv(self.f, index=False, header=self.header)
+        self.header = False
+
+    def append_part(self, part):
+        with open(part, newline="") as src:
+            if not self.header:
+                src.readline()
+            shutil.copyfileobj(src, self.f, 1 << 20)
+        self.header = False
+
+    @property
+    def written(self):
+        return not self.header
+
+    def close(self):
+        self.f.close()
+
+class _ParquetWriter:
+    """Parquet incremental con el esquema del primer bloque, promovido si hace falta.
+
+    Cada bloque se castea al esquema vigente. Si no entra (una columna toda NaN
+    que después trae texto, enteros que después traen decimales o NaN), se
+    promueve columna por columna (`unify_schemas` permisivo; si no hay tipo
+    común, string) y lo ya escrito se reescribe con el esquema nuevo. La
+    reescritura sólo ocurre cuando un tipo cambia.
+    """
+    def __init__(self, path):
+        try:
+            import pyarrow as pa, pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Salida parquet requiere pyarrow (pip install pyarrow)") from e
+        self.pa, self.pq, self.path, self.w = pa, pq, Path(path), None
+
+    def write(self, df):
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.w is None:
+            self.w = self.pq.ParquetWriter(self.path, table.schema)
+        try:
+            table = self._conform(table, self.w.schema)
+        except (self.pa.ArrowInvalid, self.pa.ArrowNotImplementedError, ValueError):
+            table = self._promote(table)
+        self.w.write_table(table)
+
+    def _conform(self, table, schema):
+        for f in schema:
+            if f.name not in table.column_names:
+                table = table.append_column(f.name, self.pa.nulls(len(table), f.type))
+        return table.select(schema.names).cast(schema)
+
+    def _field(self, a, b):
+        if b is None or a.type == b.type:
+            return a
+        try:
+            return self.pa.unify_schemas([self.pa.schema([a]), self.pa.schema([b])],
+                                         promote_options="permissive").field(0)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+            return self.pa.field(a.name, self.pa.string())
+
+    def _promote(self, table):
+        old = self.w.schema
+        fields = [self._field(f, table.schema.field(f.name) if f.name in table.column_names
+                              else None) for f in old]
+        fields += [f for f in table.schema if f.name not in old.names]
+        schema = self.pa.schema(fields)          # sin metadata de pandas: los dtypes cambian
+        self.w.close()
+        prev = self.path.with_name(self.path.name + ".prev")
+        os.replace(self.path, prev)
+        self.w = self.pq.ParquetWriter(self.path, schema)
+        try:
+            for batch in self.pq.ParquetFile(prev).iter_batches():
+                self.w.write_table(self._conform(self.pa.Table.from_batches([batch]), schema))
+        finally:
+            prev.unlink()
+        log.info("Salida parquet: esquema promovido a %s", schema)
+        return self._conform(table, schema)
+
+    def append_part(self, part):
+        self.write(self.pq.read_table(part).to_pandas())
+
+    @property
+    def written(self):
+        return self.w is not None
+
+    def close(self):
+        if self.w is not None:
+            self.w.close()
+
+WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+def run(path, transforms, out, chunksize=CHUNKSIZE, fmt="csv", workers=1, ordered=True) -> dict:
+    """Lee `path` por bloques, aplica el plan y escribe `out`; devuelve estadísticas.
+
+    Con `workers > 1` el archivo se parte en rangos de bytes alineados a fin de
+    línea y cada proceso parsea y transforma su rango (ver `_run_parallel`).
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de salida {fmt!r} no soportado")
+    compile_plan(transforms)  # valida antes de abrir nada
+    out = Path(out)
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    writer = WRITERS[fmt](tmp)
+    t0 = time.perf_counter()
+    try:
+        if workers > 1:
+            rows_in, rows_out = _run_parallel(path, transforms, writer, chunksize, fmt,
+                                              workers, ordered, tmp)
+        else:
+            rows_in, rows_out = _run_serial(path, transforms, writer, chunksize)
+        if not writer.written:  # sin filas: salida vacía con las columnas del plan
+            writer.write(compile_plan(transforms)(pd.read_csv(path, nrows=0)))
+    except BaseException:
+        writer.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    writer.close()
+    os.replace(tmp, out)
+    secs = time.perf_counter() - t0
+    stats = {"rows_in": rows_in, "rows_out": rows_out, "seconds": secs,
+             "rows_per_sec": rows_in / secs if secs else float("inf"), "workers": workers}
+    log.info("prepare_data %s: %d → %d filas, %.0f filas/s (%d workers)", Path(path).name,
+             rows_in, rows_out, stats["rows_per_sec"], workers)
+    return stats
+
+def _run_serial(path, transforms, writer, chunksize):
+    plan, rows_in, rows_out = compile_plan(transforms), 0, 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        rows_in += len(chunk)
+        chunk = plan(chunk)
+        rows_out += len(chunk)
+        writer.write(chunk)
+    return rows_in, rows_out
+
+
+# ── Ejecución en paralelo (ProcessPoolExecutor) ─────────────────────────────
+#
+# Los procesos reciben sólo (ruta, offset inicial, offset final): cada uno lee y
+# parsea su propio rango, así que el input nunca se serializa entre procesos.
+# Si el plan no tiene pasos con estado, cada worker escribe su parte a disco y
+# el proceso principal sólo concatena (en CSV, copia de bytes). Si hay `dedupe`,
+# los workers aplican el prefijo sin estado y el resto corre en orden acá.
+# Supone que no hay saltos de línea dentro de campos entrecomillados.
+
+TASK_BYTES = 64 << 20
+
+class _Range(io.RawIOBase):
+    """Vista de sólo lectura de `n` bytes de un archivo abierto."""
+    def __init__(self, f, n):
+        self.f, self.left = f, n
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.left <= 0:
+            return 0
+        n = self.f.readinto(memoryview(b)[:min(len(b), self.left)])
+        self.left -= n
+        return n
+
+def _split(path, workers):
+    """Cabecera (nombres de columna) y rangos [inicio, fin) alineados a líneas."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        body = f.tell()
+        step = max(min(TASK_BYTES, (size - body) // (workers * 4) + 1), 1 << 16)
+        cuts = [body]
+        while cuts[-1] < size:
+            f.seek(min(cuts[-1] + step, size))
+            f.readline()
+            cuts.append(min(f.tell(), size))
+    names = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+    return names, list(zip(cuts[:-1], cuts[1:]))
+
+def _split_plan(transforms):
+    """(prefijo sin estado, resto desde el primer paso con estado)."""
+    for i, t in enumerate(transforms or []):
+        if t.get("op") == "dedupe":
+            return transforms[:i], transforms[i:]
+    return list(transforms or []), []
+
+def _range_task(path, names, start, end, transforms, chunksize, part, fmt):
+    plan, rows_in, outs = compile_plan(transforms), 0, []
+    with open(path, "rb") as f:
+        f.seek(start)
+        src = io.BufferedReader(_Range(f, end - start), 1 << 20)
+        for chunk in pd.read_csv(src, header=None, names=names, chunksize=chunksize):
+            rows_in += len(chunk)
+            outs.append(plan(chunk))
+    df = pd.concat(outs, ignore_index=True) if outs else pd.DataFrame(columns=names)
+    if part is None:
+        return rows_in, df
+    w = WRITERS[fmt](part)
+    w.write(df)
+    w.close()
+    return rows_in, len(df)
+
+def _run_parallel(path, transforms, writer, chunksize, fmt, workers, ordered, tmp):
+    names, ranges = _split(path, workers)
+    prefix, suffix = _split_plan(transforms)
+    rest = compile_plan(suffix) if suffix else None
+    parts = Path(tempfile.mkdtemp(prefix=".parts-", dir=tmp.parent))
+    rows_in = rows_out = 0
+    try:
+        with ProcessPoolExecutor(workers) as ex:
+            pend, it = deque(), iter(enumerate(ranges))
+
+            def submit():
+                for i, (a, b) in it:
+                    part = None if rest else parts/f"{i:06d}.{fmt}"
+                    pend.append((ex.submit(_range_task, path, names, a, b, prefix,
+                                           chunksize, part, fmt), part))
+                    if len(pend) >= workers * 2:  # ventana acotada: memoria acotada
+                        return
+
+            submit()
+            while pend:
+                if ordered:
+                    fut, part = pend.popleft()
+                else:
+                    done = next(as_completed([f for f, _ in pend]))
+                    fut, part = next(x for x in pend if x[0] is done)
+                    pend.remove((fut, part))
+                n_in, res = fut.result()
+                rows_in += n_in
+                if rest is None:
+                    rows_out += res
+                    writer.append_part(part)
+                    part.unlink()
+                else:
+                    df = rest(res)
+                    rows_out += len(df)
+                    writer.write(df)
+                submit()
+    finally:
+        shutil.rmtree(parts, ignore_errors=True)
+    return rows_in, rows_out
+
+
+if __name__ == "__main__":
+    # Benchmark de escalado 1..N workers sobre un CSV sintético
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    src = Path(tempfile.gettempdir())/f"bench_transforms_{n}.csv"
+    if not src.exists():
+        rng = np.random.default_rng(0)
+        pd.DataFrame({"id": rng.integers(0, 10**6, n), "precio": rng.random(n) * 1000,
+                      "cant": np.where(rng.random(n) < .05, np.nan, rng.integers(1, 9, n)),
+                      "cat": rng.choice(["a", "b", "c", "d"], n)}).to_csv(src, index=False)
+    tr = [{"op": "dropna"}, {"op": "filter", "expr": "precio > 10"},
+          {"op": "derive", "column": "total", "expr": "precio * cant"},
+          {"op": "cast", "dtypes": {"total": "float32"}}]
+    for w in sorted({1, 2, 4, os.cpu_count() or 1}):
+        st = run(src, tr, src.with_name("bench_out.csv"), workers=w)
+        print(f"{w:3d} workers  {st['seconds']:7.2f} s  {st['rows_per_sec']:12,.0f} filas/s")
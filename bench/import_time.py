@@ -0,0 +1,51 @@
+# bench/import_time.py
+"""Control de regresión del tiempo de import de `my_agent` (python -X importtime).
+
+Falla (exit 1) si el import acumulado supera el presupuesto o si arrastra alguna
+dependencia pesada que debería cargarse sólo al usar las tools / el Agent.
+
+    python bench/import_time.py [--budget-ms 50] [--runs 5] [--json salida.json]
+"""
+import argparse, json, re, subprocess, sys
+from pathlib import Path
+
+ROOT   = Path(__file__).resolve().parent.parent
+HEAVY  = ("langchain", "openai", "pandas", "numpy", "requests", "jinja2")
+LINE   = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module="my_agent"):
+    """(µs acumulados del import de `module`, módulos top-level importados)."""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       cwd=ROOT, capture_output=True, text=True, check=True)
+    total, mods = None, set()
+    for line in r.stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        mods.add(m.group(4).split(".")[0])
+        if m.group(4) == module:
+            total = int(m.group(2))
+    return total, mods
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--module", default="my_agent")
+    ap.add_argument("--budget-ms", type=float, default=50.0)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json")
+    a = ap.parse_args(argv)
+    runs = [measure(a.module) for _ in range(a.runs)]
+    best = min(t for t, _ in runs) / 1000
+    heavy = sorted({m for _, mods in runs for m in mods} & set(HEAVY))
+    ok = best <= a.budget_ms and not heavy
+    res = {"module": a.module, "import_ms": round(best, 2), "budget_ms": a.budget_ms,
+           "heavy_imports": heavy, "ok": ok}
+    print(json.dumps(res))
+    if a.json:
+        Path(a.json).write_text(json.dumps(res, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+# bench/load_test.py
+"""Prueba de carga del tablero con AppTest (sin navegador ni red) + micro-benchmarks.
+
+Simula `--sessions` usuarios (en `--threads` hilos) que navegan home → dashboard
+→ contacto, barren los sliders y cambian el modo de gráfico. Registra la
+latencia de cada rerun (percentiles por acción), RSS pico, figuras de
+matplotlib y objetos vivos, y el desglose por etapa de `cafe_profiling`.
+Los micro-benchmarks miden por separado carga, KPI, gráfico y sensibilidad.
+
+    python bench/load_test.py [--sessions 8] [--steps 20] [--threads 4] [--json out.json]
+    python bench/load_test.py --compare base.json --json head.json   # exit 1 si empeora
+
+`--compare` marca como regresión cualquier métrica `*_ms` que crezca más de
+`--tolerance` (25 % por defecto) respecto del JSON anterior.
+"""
+import argparse, gc, json, os, platform, random, resource, subprocess, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP  = ROOT/"civic_twin_cafe_app.py"
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("CIVIC_TWIN_PROFILE", "1")   # desglose por etapa (antes de importar la app)
+
+import numpy as np
+
+
+def pct(xs) -> dict:
+    a = np.asarray(xs, dtype=float) * 1e3
+    if not len(a):
+        return {}
+    return {"n": int(len(a)), "p50_ms": round(float(np.percentile(a, 50)), 2),
+            "p90_ms": round(float(np.percentile(a, 90)), 2),
+            "p99_ms": round(float(np.percentile(a, 99)), 2), "max_ms": round(float(a.max()), 2)}
+
+def peak_rss_mib():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def open_figures():
+    from matplotlib import _pylab_helpers
+    from matplotlib.figure import Figure
+    gc.collect()
+    return {"pyplot": _pylab_helpers.Gcf.get_num_fig_managers(),
+            "figure_objects": sum(isinstance(o, Figure) for o in gc.get_objects())}
+
+
+# ── Sesiones simuladas ──────────────────────────────────────────────────────
+
+class Session:
+    def __init__(self, seed, lat, lock):
+        from streamlit.testing.v1 import AppTest
+        self.rng, self.lat, self.lock = random.Random(seed), lat, lock
+        self.at = AppTest.from_file(str(APP), default_timeout=120)
+        self.errors = 0
+
+    def _run(self, action, fn=None):
+        t = time.perf_counter()
+        (fn or self.at.run)()
+        dt = time.perf_counter() - t
+        with self.lock:
+            self.lat.setdefault(action, []).append(dt)
+        if self.at.exception:
+            self.errors += 1
+
+    def view(self, v):
+        self.at.session_state["view"] = v
+        self._run(f"view:{v}")
+
+    def step(self):
+        at, rng = self.at, self.rng
+        if at.session_state["view"] != "dashboard":
+            return self.view("dashboard")
+        r = rng.random()
+        if r < .40:
+            self._run("slider:cli", at.sidebar.slider(key="cli").set_value(rng.randrange(30, 201, 5)).run)
+        elif r < .75:
+            self._run("slider:tic", at.sidebar.slider(key="tic").set_value(rng.randrange(3000, 8001, 100)).run)
+        elif r < .85:
+            self._run("input:inf", at.sidebar.number_input(key="inf").set_value(float(rng.randrange(0, 101, 5))).run)
+        elif r < .93:
+            modo = at.sidebar.radio(key="modo")
+            self._run("radio:modo", modo.set_value("Interactivo" if modo.value == "Imagen" else "Imagen").run)
+        else:
+            self.view("contact" if rng.random() < .5 else "home")
+
+    def play(self, steps):
+        self._run("view:home")
+        for _ in range(steps):
+            self.step()
+        return self.errors
+
+
+def load_test(sessions, steps, threads, seed=0) -> dict:
+    from cafe_profiling import REGISTRY
+    lat, lock = {}, threading.Lock()
+    warm = Session(-1, {}, lock)       # cachés compartidas e imports fuera de la medición
+    warm.play(2)
+    REGISTRY.reset()
+    users = [Session(seed + i, lat, lock) for i in range(sessions)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        errors = sum(ex.map(lambda s: s.play(steps), users))
+    wall = time.perf_counter() - t0
+    todas = [x for xs in lat.values() for x in xs]
+    return {
+        "sessions": sessions, "steps": steps, "threads": threads, "errors": errors,
+        "wall_s": round(wall, 2), "reruns": len(todas),
+        "reruns_per_s": round(len(todas) / wall, 2),
+        "rerun": pct(todas),
+        "by_action": {k: pct(v) for k, v in sorted(lat.items())},
+        "stages": {k: {"n": v["count"], "p50_ms": round(v["p50"] * 1e3, 2),
+                       "p90_ms": round(v["p90"] * 1e3, 2)}
+                   for k, v in REGISTRY.summary().items()},
+        "peak_rss_mib": peak_rss_mib(), "figures": open_figures(),
+        "live_objects": len(gc.get_objects()),
+    }
+
+
+# ── Micro-benchmarks ────────────────────────────────────────────────────────
+
+def timeit(fn, reps) -> float:
+    fn()
+    t = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return round((time.perf_counter() - t) / reps * 1e3, 4)
+
+def micro() -> dict:
+    import cafe_charts
+    from cafe_data import find_source, load_sheets, read_source
+    from cafe_model import load_model
+    from cafe_projection import Projection
+    from cafe_sensitivity import tornado
+    from cafe_store import build_store
+    from cafe_whatif import defaults, evaluate, synthetic
+    src = find_source()
+    s = build_store()
+    m, g = s.model, s.grid
+    ganancia = g.kpis(100, 5000)[2]
+    n = [0]
+    def render_miss():
+        n[0] += 1
+        cafe_charts.render_projection(ganancia + n[0], 10, m.inv)
+    proj = Projection(120, "D")
+    proj.update(100, 5000, m.wd, m.ins_pct, m.inv, dict(m.monthly_costs), {"general": 50})
+    def proj_line():
+        n[0] += 1
+        proj.update(100, 5000, m.wd, m.ins_pct, m.inv,
+                    {**m.monthly_costs, "Servicios": n[0]}, {"general": 50})
+    bloque, d = next(synthetic(50_000)), defaults(m)
+    return {
+        "load:parse_source_ms": timeit(lambda: read_source(src), 3),
+        "load:sheets_cached_ms": timeit(lambda: load_sheets(src), 20),
+        "load:model_ms": timeit(lambda: load_model(), 20),
+        "load:store_ms": timeit(lambda: build_store(s.version), 10),
+        "kpi:grid_ms": timeit(lambda: g.kpis(135, 6200), 2000),
+        "kpi:off_grid_ms": timeit(lambda: g.kpis(137, 6210), 2000),
+        "chart:png_miss_ms": timeit(render_miss, 5),
+        "chart:png_hit_ms": timeit(lambda: cafe_charts.render_projection(ganancia, 10, m.inv), 200),
+        "chart:vega_data_ms": timeit(lambda: cafe_charts.projection_data(ganancia, 10, m.inv), 200),
+        "sensitivity:tornado_ms": timeit(lambda: tornado(m, 100, 5000, 10), 200),
+        "projection:daily_10y_line_ms": timeit(proj_line, 200),
+        "whatif:block_50k_ms": timeit(lambda: evaluate(bloque, d), 10),
+    }
+
+
+# ── Resultados ──────────────────────────────────────────────────────────────
+
+def _flat(d, prefix=""):
+    for k, v in d.items():
+        if isinstance(v, dict):
+            yield from _flat(v, f"{prefix}{k}.")
+        else:
+            yield f"{prefix}{k}", v
+
+def compare(old, new, tolerance) -> list:
+    """Métricas `*_ms` que empeoraron más que `tolerance` (fracción)."""
+    o = dict(_flat(old))
+    out = []
+    for k, v in _flat(new):
+        if k.endswith("_ms") and isinstance(o.get(k), (int, float)) and o[k] > 0.05:
+            ratio = v / o[k] - 1
+            if ratio > tolerance:
+                out.append((k, o[k], v, ratio))
+    return out
+
+def environment() -> dict:
+    import streamlit
+    try:
+        rev = subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {"commit": rev, "python": platform.python_version(), "streamlit": streamlit.__version__,
+            "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--steps", type=int, default=20)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--skip-load", action="store_true", help="sólo micro-benchmarks")
+    ap.add_argument("--json")
+    ap.add_argument("--compare")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    a = ap.parse_args(argv)
+
+    res = {"env": environment(), "micro": micro()}
+    if not a.skip_load:
+        res["load"] = load_test(a.sessions, a.steps, a.threads, a.seed)
+
+    for k, v in res["micro"].items():
+        print(f"{k:<32}{v:>10.3f} ms")
+    if "load" in res:
+        L = res["load"]
+        print(f"\n{L['sessions']} sesiones × {L['steps']} pasos en {L['threads']} hilos: "
+              f"{L['reruns']} reruns, {L['reruns_per_s']}/s, errores {L['errors']}, "
+              f"RSS pico {L['peak_rss_mib']} MiB, figuras {L['figures']}")
+        for k, v in [("todos", L["rerun"]), *L["by_action"].items()]:
+            print(f"  {k:<16}n={v['n']:<5} p50 {v['p50_ms']:>8.1f}  p90 {v['p90_ms']:>8.1f}"
+                  f"  p99 {v['p99_ms']:>8.1f} ms")
+        print("  etapas (p50 / p90 ms):", ", ".join(
+            f"{k} {v['p50_ms']:.1f}/{v['p90_ms']:.1f}" for k, v in L["stages"].items()))
+    if a.json:
+        Path(a.json).write_text(json.dumps(res, indent=2, ensure_ascii=False))
+    if a.compare:
+        peores = compare(json.loads(Path(a.compare).read_text()), res, a.tolerance)
+        for k, o, n, r in peores:
+            print(f"REGRESIÓN {k}: {o:.2f} → {n:.2f} ms (+{r:.0%})")
+        return 1 if peores else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
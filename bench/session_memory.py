@@ -0,0 +1,92 @@
+# bench/session_memory.py
+"""Memoria por sesión del tablero: N sesiones simuladas con AppTest.
+
+Cada sesión abre el dashboard y mueve los sliders; todas quedan vivas para
+medir lo que retiene cada una (tracemalloc + RSS) y qué guarda su session_state.
+Con `--before REV` mide también la app de esa revisión de git para comparar.
+
+    python bench/session_memory.py [--sessions 20] [--before REV] [--json salida.json]
+"""
+import argparse, gc, json, os, subprocess, sys, tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP  = ROOT/"civic_twin_cafe_app.py"
+
+
+def rss_kib():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+def session(app, i):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(app), default_timeout=120)
+    at.run()
+    at.session_state["view"] = "dashboard"
+    at.run()
+    sliders = at.sidebar.slider
+    if len(sliders) >= 2:  # cada sesión en un escenario distinto
+        sliders[0].set_value(30 + 5 * (i % 35)).run()
+        sliders[1].set_value(3000 + 100 * (i % 51)).run()
+    if at.exception:
+        raise RuntimeError(f"sesión {i}: {at.exception[0].value}")
+    return at
+
+def measure(app, n) -> dict:
+    session(app, 0)               # calienta cachés compartidas e imports
+    gc.collect()
+    tracemalloc.start()
+    base_py, base_rss = tracemalloc.get_traced_memory()[0], rss_kib()
+    alive = [session(app, i + 1) for i in range(n)]
+    gc.collect()
+    py, rss = tracemalloc.get_traced_memory()[0], rss_kib()
+    tracemalloc.stop()
+    keys = sorted(alive[-1].session_state._state.filtered_state)
+    return {"app": app.name, "sessions": n,
+            "kib_per_session": round((py - base_py) / 1024 / n, 1),
+            "rss_kib_per_session": round((rss - base_rss) / n, 1),
+            "session_state": keys}
+
+def _revision_app(rev) -> Path:
+    src = subprocess.run(["git", "-C", str(ROOT), "show", f"{rev}:civic_twin_cafe_app.py"],
+                         capture_output=True, text=True, check=True).stdout
+    out = ROOT/f".session_memory_{rev.replace('/', '_')}.py"  # junto al dataset
+    out.write_text(src)
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--before")
+    ap.add_argument("--json")
+    ap.add_argument("--app", help=argparse.SUPPRESS)
+    a = ap.parse_args(argv)
+    if a.app:  # un proceso por app: las cachés de Streamlit son globales del proceso
+        print(json.dumps(measure(Path(a.app), a.sessions)))
+        return 0
+    apps = [("después", APP)]
+    if a.before:
+        apps.insert(0, (f"antes ({a.before})", _revision_app(a.before)))
+    results = {}
+    try:
+        for label, app in apps:
+            r = subprocess.run([sys.executable, __file__, "--app", str(app),
+                                "--sessions", str(a.sessions)],
+                               cwd=ROOT, capture_output=True, text=True)
+            if r.returncode:
+                sys.exit(r.stderr[-2000:])
+            results[label] = json.loads(r.stdout.strip().splitlines()[-1])
+    finally:
+        for _, app in apps:
+            if app != APP:
+                app.unlink(missing_ok=True)
+    for label, r in results.items():
+        print(f"{label:<22}{r['kib_per_session']:>10.1f} KiB/sesión (python)"
+              f"{r['rss_kib_per_session']:>10.1f} KiB/sesión (RSS)   estado: {r['session_state']}")
+    if a.json:
+        Path(a.json).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
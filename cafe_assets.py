@@ -0,0 +1,184 @@
+# cafe_assets.py
+"""CSS del tablero minificado por vista, armado una vez por proceso e inyectado inline.
+
+Las hojas viven en `assets/css/` y cada vista concatena las suyas según `VIEWS`
+(el orden es la cascada: lo último gana). La primera vez que el proceso pide
+una vista se minifica, se quitan las reglas repetidas y se guarda el `<style>`
+resultante (se rearma sólo si cambia una hoja). Va inline y no como `<link>` a
+`app/static/`: el static serving de Streamlit anterior a Starlette (1.37 en
+adelante, el mínimo de requirements.txt) sirve .css y .svg como `text/plain`
+con `nosniff` y el navegador los descarta. Por lo mismo el logo va como SVG
+inline (`inline_svg`) y la bandera como PNG.
+
+Fuente, textura y foto del hero pueden servirse desde `static/vendor/`:
+
+    python cafe_assets.py --vendor     # descarga lo que falte de VENDOR (y se commitea)
+    python cafe_assets.py              # arma los bundles e informa tamaños
+
+El repo no trae esos archivos (hace falta red para bajarlos): mientras un
+archivo de `VENDOR` no esté en `static/vendor/`, el CSS usa su URL original y
+`python cafe_assets.py` lista los que faltan.
+"""
+import argparse, gzip, os, re, sys, urllib.request
+from functools import lru_cache
+from pathlib import Path
+
+BASE       = Path(__file__).parent
+CSS_DIR    = BASE/"assets"/"css"
+STATIC_DIR = BASE/"static"                  # junto al script de la app: lo sirve Streamlit
+VENDOR_DIR = STATIC_DIR/"vendor"
+STATIC_URL = "app/static"
+
+# Hojas de cada vista, en orden de cascada
+VIEWS = {
+    "home":        ("fonts", "base", "home"),
+    "dashboard":   ("fonts", "base", "header", "dashboard", "final"),
+    "portfolio":   ("fonts", "base", "header", "final"),
+    "contact":     ("fonts", "base", "final"),
+    "diagnostics": ("fonts", "base", "final"),
+}
+DEFAULT_VIEW = "contact"
+
+FONT_CSS = "https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;700&display=swap"
+VENDOR = {   # static/vendor/<archivo> → origen
+    "montserrat-latin.woff2": FONT_CSS,
+    "grey_wash_wall.png": "https://www.toptal.com/designers/subtlepatterns/grey_wash_wall.png",
+    "hero.jpg": "https://images.unsplash.com/photo-1522202195467-52c5a0bfb57c"
+                "?auto=format&fit=crop&w=1500&q=80",
+}
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_STRING  = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+_PUNCT   = re.compile(r"\s*([{};,>!])\s*")
+_VENDOR  = re.compile(r"""url\((["']?)vendor/([^"')]+)\1\)""")
+
+
+# ── Minificado ──────────────────────────────────────────────────────────────
+
+def minify(css: str) -> str:
+    """Sin comentarios ni espacios sobrantes; el contenido de los strings no se toca."""
+    parts = _STRING.split(_COMMENT.sub("", css))
+    for i in range(0, len(parts), 2):      # pares: fuera de strings
+        s = _PUNCT.sub(r"\1", re.sub(r"\s+", " ", parts[i]))
+        parts[i] = re.sub(r":\s+", ":", s).replace(";}", "}")
+    return "".join(parts).strip()
+
+def rules(css: str) -> list:
+    """Reglas de primer nivel de un CSS minificado (bloques completos y @import/@charset)."""
+    out, depth, start = [], 0, 0
+    for i, ch in enumerate(css):
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if not depth:
+                out.append(css[start:i + 1]); start = i + 1
+        elif ch == ";" and not depth:
+            out.append(css[start:i + 1]); start = i + 1
+    return out
+
+def dedupe(rs) -> list:
+    """Quita reglas idénticas conservando la última (la cascada no cambia)."""
+    seen, out = set(), []
+    for r in reversed(rs):
+        if r not in seen:
+            seen.add(r); out.append(r)
+    return out[::-1]
+
+def localize(rs) -> list:
+    """Resuelve `url(vendor/...)`: `app/static/vendor/` si está descargado, si no el
+    origen de VENDOR (una fuente sin archivo usa la hoja de Google Fonts)."""
+    out, fonts = [], False
+    for r in rs:
+        missing = [n for _, n in _VENDOR.findall(r) if not (VENDOR_DIR/n).is_file()]
+        if any(n.endswith(".woff2") for n in missing):
+            fonts = True
+            continue
+        out.append(_VENDOR.sub(lambda m: f'url("{STATIC_URL}/vendor/{m.group(2)}")'
+                               if m.group(2) not in missing
+                               else f'url("{VENDOR.get(m.group(2), m.group(2))}")', r))
+    return [f'@import url("{FONT_CSS}");'] * fonts + out
+
+def bundle_css(view) -> str:
+    names = VIEWS.get(view, VIEWS[DEFAULT_VIEW])
+    css = "\n".join((CSS_DIR/f"{n}.css").read_text(encoding="utf-8") for n in names)
+    return "".join(dedupe(localize(rules(minify(css)))))
+
+
+# ── Bundle inline ───────────────────────────────────────────────────────────
+
+def assets_version() -> tuple:
+    """Firma barata (stat) de hojas y archivos vendorizados; cambia si se edita alguno."""
+    files = sorted(CSS_DIR.glob("*.css")) + sorted(VENDOR_DIR.glob("*"))
+    return tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in files)
+
+@lru_cache(maxsize=32)
+def _style(view, version):
+    """`<style>` de una vista; se arma una vez por versión de las hojas."""
+    return f"<style>{bundle_css(view)}</style>"
+
+def stylesheet(view) -> str:
+    """HTML de estilos de la vista para cada rerun (cacheado por vista)."""
+    return _style(view if view in VIEWS else DEFAULT_VIEW, assets_version())
+
+@lru_cache(maxsize=None)
+def inline_svg(rel, cls="") -> str:
+    """Contenido de `static/<rel>` para insertar inline, con `class` en el `<svg>`."""
+    svg = (STATIC_DIR/rel).read_text(encoding="utf-8").strip()
+    return svg.replace("<svg", f"<svg class='{cls}'", 1) if cls else svg
+
+def static_url(rel) -> str:
+    """URL de un archivo de `static/` (sólo tipos que Streamlit sirve bien: png, jpg, ...)."""
+    return f"{STATIC_URL}/{rel}"
+
+
+# ── Vendorizado ─────────────────────────────────────────────────────────────
+
+def _get(url) -> bytes:
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as r:
+        return r.read()
+
+def vendor(force=False):
+    """Descarga a `static/vendor/` lo que falte de VENDOR; devuelve los archivos escritos."""
+    VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, url in VENDOR.items():
+        path = VENDOR_DIR/name
+        if path.exists() and not force:
+            continue
+        if name.endswith(".woff2"):        # la hoja de Google apunta al archivo real
+            sheet = _get(url).decode()
+            m = re.search(r"/\* latin \*/.*?url\((\S+?\.woff2)\)", sheet, re.S)
+            if not m:
+                raise RuntimeError(f"No encontré el subset latin en {url}")
+            url = m.group(1)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(_get(url))
+        os.replace(tmp, path)
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--vendor", action="store_true", help="descarga fuentes e imágenes")
+    ap.add_argument("--force", action="store_true", help="con --vendor: vuelve a bajar todo")
+    a = ap.parse_args(argv)
+    if a.vendor:
+        for p in vendor(a.force):
+            print(f"{p.relative_to(BASE)}  {p.stat().st_size:,} B")
+    print(f"{'vista':<13}{'fuentes':>9}{'bundle':>9}{'gzip':>7}")
+    for view, names in VIEWS.items():
+        raw = sum((CSS_DIR/f"{n}.css").stat().st_size for n in names)
+        css = bundle_css(view)
+        print(f"{view:<13}{raw:>9,}{len(css):>9,}{len(gzip.compress(css.encode())):>7,}")
+    faltan = [n for n in VENDOR if not (VENDOR_DIR/n).is_file()]
+    if faltan:
+        print("sin vendorizar (se usa el origen):", ", ".join(faltan))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
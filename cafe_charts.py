@@ -0,0 +1,257 @@
+# cafe_charts.py
+"""Render del gráfico de proyección sin estado global de pyplot, con caché LRU de bytes.
+
+Cada render usa un `Figure` propio con lienzo Agg (pyplot no lo registra, así que
+se libera al salir de la función) y el PNG/SVG resultante se memoiza por
+(ganancia, inflación, INV[, banda]); repetir una posición de sliders es un hit.
+
+Modo interactivo: `projection_data` + `PROJECTION_SPEC` mandan sólo la serie
+(submuestreada a `MAX_POINTS`) y el navegador dibuja con Vega-Lite.
+`projection_grid_spec` arma el gráfico sobre la rejilla de ganancias con controles
+propios (parámetros de Vega-Lite ligados a inputs): moverlos redibuja en el
+navegador, sin rerun ni ida y vuelta al servidor. La rejilla se publica una vez
+por versión del dataset como JSON en `static/grid/` (`publish_grid`) y la spec
+sólo lleva su URL: los reruns de la barra lateral cambian los valores de los
+parámetros, no reenvían la rejilla.
+
+Comparación de ambos caminos:  python cafe_charts.py
+"""
+from functools import lru_cache
+import io, json, os, time
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from cafe_assets import STATIC_DIR, static_url
+from cafe_engine import HORIZONTE, flujo
+
+AZUL, AZUL_OSC = "#1F4E79", "#14406b"
+FIGSIZE  = (11, 2.3)
+DPI      = 200          # mismo default que st.pyplot
+MAXSIZE  = 256
+MAX_POINTS = 500
+GRID_DIR = STATIC_DIR/"grid"
+
+
+@lru_cache(maxsize=MAXSIZE)
+def _render(ganancia, inf, inv, band, fmt):
+    mes = np.arange(1, HORIZONTE + 1)
+    fig = Figure(figsize=FIGSIZE)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    if band is not None:
+        p10, p50, p90 = (np.asarray(b) for b in band)
+        ax.fill_between(mes, p10, p90, color=AZUL, alpha=.15, lw=0)
+        ax.plot(mes, p50, color=AZUL, lw=1, ls=":")
+    ax.plot(mes, flujo(ganancia, inv, inf), color=AZUL, lw=2)
+    ax.axhline(0, color="#888", lw=.8, ls="--")
+    ax.set_xlabel("Mes"); ax.set_ylabel("Flujo acumulado (ARS)")
+    ax.set_title("Proyección 24 meses", color=AZUL_OSC, weight="bold")
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=DPI, bbox_inches="tight")
+    return buf.getvalue()
+
+def render_projection(ganancia, inf, inv, band=None, fmt="png") -> bytes:
+    """Bytes del gráfico de flujo acumulado; `band` = (p10, p50, p90) opcional."""
+    if band is not None:
+        band = tuple(tuple(np.round(np.asarray(b, dtype=float), 2)) for b in band)
+    return _render(float(ganancia), float(inf), float(inv), band, fmt)
+
+def cache_stats() -> dict:
+    """Contadores de la caché de render (hits, misses, tamaño actual y máximo)."""
+    i = _render.cache_info()
+    return {"hits": i.hits, "misses": i.misses, "size": i.currsize, "maxsize": i.maxsize}
+
+def cache_clear():
+    _render.cache_clear()
+
+
+# ── Modo interactivo (render en el navegador) ───────────────────────────────
+
+def downsample(x, y, max_points=MAX_POINTS):
+    """Índices a conservar según Largest-Triangle-Three-Buckets (extremos incluidos)."""
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for k in range(max_points - 2):
+        lo, hi = edges[k], edges[k + 1]
+        nxt = slice(hi, edges[k + 2] if k + 2 < len(edges) else n)
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = keep[k + 1] = lo + int(area.argmax())
+    return keep
+
+def projection_data(ganancia, inf, inv, band=None, meses=HORIZONTE, max_points=MAX_POINTS) -> dict:
+    """Columnas compactas (ARS redondeados) para el gráfico del navegador."""
+    mes = np.arange(1, meses + 1)
+    return series_data(mes, flujo(float(ganancia), float(inv), float(inf), meses), band, max_points)
+
+def series_data(mes, f, band=None, max_points=MAX_POINTS) -> dict:
+    """Igual que `projection_data` pero con el flujo ya calculado (p. ej. `cafe_projection`)."""
+    mes, f = np.asarray(mes), np.asarray(f)
+    idx = downsample(mes, f, max_points)
+    data = {"mes": np.round(mes[idx], 3).tolist(), "flujo": np.rint(f[idx]).tolist()}
+    if band is not None:
+        for name, b in zip(("p10", "p50", "p90"), band):
+            data[name] = np.rint(np.asarray(b)[idx]).tolist()
+    return data
+
+_ENC_X = {"field": "mes", "type": "quantitative", "title": "Mes"}
+PROJECTION_SPEC = {
+    "height": 220,
+    "title": {"text": "Proyección 24 meses", "color": AZUL_OSC},
+    "layer": [
+        {"mark": {"type": "area", "color": AZUL, "opacity": .15},
+         "transform": [{"filter": "isValid(datum.p10)"}],
+         "encoding": {"x": _ENC_X, "y": {"field": "p10", "type": "quantitative"},
+                      "y2": {"field": "p90"}}},
+        {"mark": {"type": "line", "color": AZUL, "strokeWidth": 1, "strokeDash": [2, 2]},
+         "transform": [{"filter": "isValid(datum.p50)"}],
+         "encoding": {"x": _ENC_X, "y": {"field": "p50", "type": "quantitative"}}},
+        {"mark": {"type": "line", "color": AZUL, "strokeWidth": 2},
+         "encoding": {"x": _ENC_X,
+                      "y": {"field": "flujo", "type": "quantitative",
+                            "title": "Flujo acumulado (ARS)"},
+                      "tooltip": [{"field": "mes"}, {"field": "flujo", "format": ",.0f"}]}},
+        {"mark": {"type": "rule", "color": "#888", "strokeDash": [4, 4]},
+         "encoding": {"y": {"datum": 0}}},
+    ],
+}
+
+
+def projection_spec(meses) -> dict:
+    """`PROJECTION_SPEC` con el horizonte en el título."""
+    return {**PROJECTION_SPEC, "title": {"text": f"Proyección {meses:g} meses", "color": AZUL_OSC}}
+
+def publish_grid(grid, version, out_dir=GRID_DIR):
+    """Escribe la rejilla de ganancias como `<version>.json` (filas {k, g}) y devuelve su URL.
+
+    Se escribe una sola vez por versión y se borran las de versiones anteriores.
+    Devuelve None si la carpeta no se puede escribir (la spec embebe entonces la rejilla).
+    """
+    name = f"{version}.json"
+    path = out_dir/name
+    if not path.exists():
+        g = np.rint(grid.ganancia).ravel()
+        rows = [{"k": k, "g": float(v)} for k, v in enumerate(g)]
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(rows, separators=(",", ":")))
+            os.replace(tmp, path)
+            for old in out_dir.glob("*.json"):
+                if old.name != name:
+                    old.unlink(missing_ok=True)
+        except OSError:
+            return None
+    return static_url(f"{out_dir.name}/{name}")
+
+def _paso(eje):
+    return float(eje[1] - eje[0]) if len(eje) > 1 else 1.0
+
+def _ejes(grid):
+    """(inicio, paso, fin) de clientes, tickets e inflación: hashables para la caché de specs."""
+    return tuple((float(e[0]), _paso(e), float(e[-1]))
+                 for e in (grid.clientes, grid.tickets, grid.inflacion))
+
+@lru_cache(maxsize=16)
+def _grid_spec(url, ejes, n_tic, inv, meses):
+    """Todo lo que no cambia entre reruns de una versión del dataset: se arma una vez."""
+    (c0, pc, _), (t0, pt, _), _ = ejes
+    k = f"round((cli - {c0}) / {pc}) * {n_tic} + round((tic - {t0}) / {pt})"
+    if url is None:                 # sin carpeta estática: la rejilla va en el parámetro G
+        ganancia = [{"calculate": f"G[{k}]", "as": "g"}]
+    else:
+        ganancia = [{"calculate": k, "as": "k"},
+                    {"lookup": "k", "from": {"data": {"url": url, "format": {"type": "json"}},
+                                             "key": "k", "fields": ["g"]}}]
+    transform = ganancia + [
+        {"calculate": "pow(1 + inf / 100, 1 / 12)", "as": "q"},
+        {"calculate": "round((datum.q == 1 ? datum.mes : datum.q * (pow(datum.q, datum.mes) - 1)"
+                      f" / (datum.q - 1)) * datum.g - {inv})", "as": "flujo"},
+    ]
+    spec = projection_spec(meses)
+    return {**spec, "transform": transform,
+            "data": {"sequence": {"start": 1, "stop": meses + 1, "as": "mes"}},
+            "layer": spec["layer"][2:]}   # sin banda: la banda de riesgo la arma el servidor
+
+def projection_grid_spec(grid, cli, tic, inf, meses=HORIZONTE, url=None) -> dict:
+    """Spec con controles sobre la rejilla de ganancias; el flujo se calcula en el navegador.
+
+    Con `url` (de `publish_grid`) la rejilla se busca con un `lookup` sobre ese JSON,
+    que el navegador baja una vez por versión; sin ella viaja como parámetro constante
+    `G`. Los meses salen de un generador `sequence`: no hay `data.values` que
+    Streamlit convierta a Arrow. El acumulado usa la forma cerrada de
+    `cafe_engine.flujo_final` en cada mes. Lo fijo de la spec se cachea por
+    (url, ejes, INV, meses); en cada rerun sólo cambian los valores de los controles.
+    """
+    ejes = _ejes(grid)
+    spec = _grid_spec(url, ejes, len(grid.tickets), float(grid.inv), meses)
+    labels = ("Clientes por día ", "Ticket (ARS) ", "Inflación anual (%) ")
+    params = [{"name": name, "value": float(v),
+               "bind": {"input": "range", "min": e0, "max": e1, "step": paso, "name": label}}
+              for name, v, (e0, paso, e1), label in zip(("cli", "tic", "inf"), (cli, tic, inf),
+                                                         ejes, labels)]
+    if url is None:
+        params.append({"name": "G", "value": np.rint(grid.ganancia).ravel().tolist()})
+    return {**spec, "params": params}
+
+
+def tornado_data(t, top=10) -> list:
+    """Filas para `TORNADO_SPEC` a partir de un `cafe_sensitivity.Tornado` (payback en meses).
+
+    Una variante que deja de ser rentable (payback inf) se dibuja hasta el máximo
+    del eje (el mayor payback finito, o `HORIZONTE` si no hay) y se rotula "sin payback".
+    """
+    idx = [i for i in range(min(top, len(t.nombre))) if t.impacto[i]]
+    pbs = [float(pb) for i in idx for pb in (t.payback_bajo[i], t.payback_alto[i])]
+    tope = max((pb for pb in pbs if np.isfinite(pb)), default=float(HORIZONTE))
+    rows = []
+    for i in idx:
+        for lado, pb in (("-", float(t.payback_bajo[i])), ("+", float(t.payback_alto[i]))):
+            fin = np.isfinite(pb)
+            rows.append({"entrada": str(t.nombre[i]), "variación": lado,
+                         "payback": round(pb if fin else tope, 2),
+                         "etiqueta": f"{pb:.2f}" if fin else "sin payback"})
+    return rows
+
+TORNADO_SPEC = {
+    "height": {"step": 18},
+    "title": {"text": "Sensibilidad del payback (±10 %)", "color": AZUL_OSC},
+    "encoding": {
+        "y": {"field": "entrada", "type": "nominal", "sort": None, "title": None},
+        "x": {"field": "payback", "type": "quantitative", "title": "Pay-back (meses)",
+              "scale": {"zero": False}},
+    },
+    "layer": [
+        {"mark": {"type": "bar", "opacity": .85},
+         "encoding": {
+             "color": {"field": "variación", "type": "nominal",
+                       "scale": {"domain": ["-", "+"], "range": ["#9bb7d4", AZUL]}},
+             "tooltip": [{"field": "entrada"}, {"field": "variación"},
+                         {"field": "etiqueta", "title": "Pay-back (meses)"}]}},
+        # las variantes sin payback llegan al borde del eje: se rotulan sobre la barra
+        {"transform": [{"filter": "datum.etiqueta == 'sin payback'"}],
+         "mark": {"type": "text", "align": "right", "dx": -4, "fontSize": 10, "fontWeight": "bold",
+                  "color": "white"},
+         "encoding": {"text": {"field": "etiqueta"}}},
+    ],
+}
+
+if __name__ == "__main__":
+    # PNG del servidor vs. payload para el navegador, sobre escenarios distintos (miss)
+    n = 20
+    t = time.perf_counter()
+    png = [len(render_projection(5e6 + i, 10, 9.5e6)) for i in range(n)]
+    t_png = (time.perf_counter() - t) / n
+    t = time.perf_counter()
+    js = [len(json.dumps(projection_data(5e6 + i, 10, 9.5e6), separators=(",", ":")))
+          for i in range(n)]
+    t_js = (time.perf_counter() - t) / n
+    print(f"imagen (servidor):   {t_png*1e3:8.2f} ms/render  {np.mean(png)/1024:8.1f} KiB")
+    print(f"datos  (navegador):  {t_js*1e3:8.2f} ms/render  {np.mean(js)/1024:8.1f} KiB")
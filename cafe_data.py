@@ -0,0 +1,140 @@
+# cafe_data.py
+"""Carga del dataset con caché binaria columnar (NumPy .npy mapeados en memoria).
+
+El Excel/CSV fuente se convierte una sola vez a un directorio por versión
+(`<fuente>/<sha256>-<mtime>`) con un .npy por columna; los procesos siguientes
+lo abren con `mmap_mode="r"`, de modo que todos los workers comparten las mismas
+páginas de sólo lectura. Si la fuente cambia, la clave cambia y la caché se
+reconstruye; sólo se borran las versiones viejas de esa misma fuente (cada
+fuente tiene su subdirectorio, por nombre y hash de la ruta absoluta).
+
+Uso como paso de build:  python cafe_data.py [ruta_fuente]
+"""
+import hashlib, json, os, shutil, sys, tempfile
+from pathlib import Path
+import numpy as np, pandas as pd
+
+SHEETS = ("initial_costs", "monthly_costs", "sales_scenarios", "assumptions")
+BASE   = Path(__file__).parent
+CSV, XLSX = BASE/'CivicTwin_Cafe_Quilmes_Data.csv', BASE/'CivicTwin_Cafe_Quilmes_Data.xlsx'
+CACHE_DIR = Path(os.environ.get("CIVIC_TWIN_CACHE", BASE/".cache"/"dataset"))
+
+
+def find_source():
+    """Ruta del dataset fuente (el CSV tidy tiene prioridad), o None."""
+    for p in (CSV, XLSX):
+        if p.exists():
+            return p
+    return None
+
+def source_key(src) -> str:
+    """Clave de versión de la fuente: hash de contenido + mtime."""
+    src = Path(src)
+    h = hashlib.sha256(src.read_bytes()).hexdigest()[:16]
+    return f"{h}-{src.stat().st_mtime_ns}"
+
+def sheet_keys(sheets: dict) -> dict:
+    """Hash de contenido por hoja (columnas + valores), para saber qué hojas cambiaron."""
+    out = {}
+    for name, df in sheets.items():
+        h = hashlib.sha256("\0".join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        out[name] = h.hexdigest()[:16]
+    return out
+
+
+# ── Parseo de la fuente (lento: openpyxl / csv) ─────────────────────────────
+
+def read_source(src) -> dict:
+    """Lee el Excel (una hoja por dataset) o el CSV tidy (columna `dataset`)."""
+    src = Path(src)
+    if src.suffix == ".csv":
+        t = pd.read_csv(src)
+        return {s: t[t.dataset == s].drop(columns="dataset").dropna(axis=1, how="all")
+                                     .reset_index(drop=True) for s in SHEETS}
+    d = pd.read_excel(src, sheet_name=None)
+    return {s: d[s] for s in SHEETS}
+
+
+# ── Escritura / lectura de la caché ─────────────────────────────────────────
+
+def _write_sheet(df, out: Path):
+    cols = []
+    out.mkdir(parents=True)
+    for i, (name, s) in enumerate(df.items()):
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            kind, arr = "num", s.to_numpy()
+        else:
+            kind, arr = "str", s.fillna("").astype(str).to_numpy().astype(str)
+            if s.isna().any():
+                np.save(out/f"c{i}.na.npy", s.isna().to_numpy())
+        np.save(out/f"c{i}.npy", arr)
+        cols.append([str(name), kind])
+    return cols
+
+def _source_dir(src: Path) -> str:
+    """Subdirectorio de la caché para una fuente: nombre + hash de la ruta absoluta."""
+    return f"{src.stem}-{hashlib.sha256(str(src.resolve()).encode()).hexdigest()[:12]}"
+
+def build_cache(src, cache_dir=CACHE_DIR) -> Path:
+    """Convierte la fuente a la caché binaria y devuelve su directorio."""
+    src = Path(src)
+    cache_dir = Path(cache_dir)/_source_dir(src)
+    key = source_key(src)
+    dest = cache_dir/key
+    if (dest/"manifest.json").exists():
+        return dest
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".build-", dir=cache_dir))
+    try:
+        sheets = {name: _write_sheet(df, tmp/name) for name, df in read_source(src).items()}
+        (tmp/"manifest.json").write_text(json.dumps(
+            {"source": src.name, "key": key, "sheets": sheets}, ensure_ascii=False))
+        try:
+            os.rename(tmp, dest)  # atómico: otro worker pudo ganarnos la carrera
+        except OSError:
+            if not (dest/"manifest.json").exists():
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for old in cache_dir.iterdir():  # versiones viejas de esta fuente
+        if old.is_dir() and old.name != key and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+    for legacy in cache_dir.parent.glob("*/manifest.json"):  # esquema anterior, sin subdirectorio
+        shutil.rmtree(legacy.parent, ignore_errors=True)
+    return dest
+
+def read_cache(path) -> dict:
+    """Abre una caché construida; columnas numéricas quedan mapeadas en memoria."""
+    path = Path(path)
+    man = json.loads((path/"manifest.json").read_text())
+    out = {}
+    for sheet, cols in man["sheets"].items():
+        data = {}
+        for i, (name, kind) in enumerate(cols):
+            arr = np.asarray(np.load(path/sheet/f"c{i}.npy", mmap_mode="r"))
+            if kind == "str":
+                arr = arr.astype(object)
+                na = path/sheet/f"c{i}.na.npy"
+                if na.exists():
+                    arr[np.load(na)] = None
+            data[name] = arr
+        out[sheet] = pd.DataFrame(data, copy=False)
+    return out
+
+def load_sheets(src=None, cache_dir=CACHE_DIR) -> dict:
+    """Las cuatro hojas del dataset, desde la caché (reconstruida si hace falta)."""
+    src = src or find_source()
+    if src is None:
+        return {}
+    try:
+        return read_cache(build_cache(src, cache_dir))
+    except OSError:  # caché no escribible: se parsea la fuente directamente
+        return read_source(src)
+
+
+if __name__ == "__main__":
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else find_source()
+    if src is None:
+        sys.exit("Dataset no encontrado")
+    print(build_cache(src))
@@ -0,0 +1,123 @@
+# cafe_engine.py
+"""Motor de escenarios vectorizado para los KPI del tablero (clientes × ticket × inflación)."""
+from dataclasses import dataclass
+import numpy as np
+
+# ── Rejilla por defecto (mismos rangos/pasos que los controles del sidebar) ──
+CLIENTES  = np.arange(30, 201, 5)
+TICKETS   = np.arange(3000, 8001, 100)
+INFLACION = np.arange(0.0, 201.0, 1.0)
+HORIZONTE = 24
+
+
+# ── Fórmulas (aceptan escalares o arrays que hagan broadcast) ───────────────
+
+def kpis(cli, tic, wd, ins_pct, fixed):
+    """Ventas, insumos y ganancia mensual, igual que el bloque KPI del tablero."""
+    ventas   = np.multiply(np.multiply(cli, tic), wd, dtype=float)
+    insumos  = ventas * ins_pct
+    ganancia = ventas - (insumos + fixed)
+    return ventas, insumos, ganancia
+
+def payback(ganancia, inv):
+    """Meses para recuperar la inversión sin inflación (inf si no es rentable)."""
+    g = np.asarray(ganancia, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(g > 0, inv / g, np.inf)
+
+def payback_inflacion(ganancia, inv, inf_pct):
+    """Meses (continuos) hasta que el flujo acumulado indexado llega a cero.
+
+    Resuelve en forma cerrada `sum_{m=1..n} g*q**m = INV` con `q = (1+inf)**(1/12)`,
+    la misma serie que grafica la proyección.
+    """
+    g = np.asarray(ganancia, dtype=float)
+    q = (1 + np.asarray(inf_pct, dtype=float) / 100) ** (1 / 12)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        lq = np.log(q)
+        geo = np.log1p(inv * (q - 1) / (g * q)) / np.where(lq > 0, lq, 1)
+        n = np.where(lq > 0, geo, inv / g)
+    return np.where(g > 0, n, np.inf)
+
+def flujo(ganancia, inv, inf_pct, meses=HORIZONTE):
+    """Flujo acumulado mensual; el último eje es el mes."""
+    mes   = np.arange(1, meses + 1)
+    g     = np.asarray(ganancia, dtype=float)[..., None]
+    r     = 1 + np.asarray(inf_pct, dtype=float)[..., None] / 100
+    serie = g * r ** (mes / 12)
+    return np.cumsum(serie, axis=-1) - np.asarray(inv, dtype=float)[..., None]
+
+def flujo_final(ganancia, inv, inf_pct, meses=HORIZONTE):
+    """Último punto de `flujo` (acumulado al mes `meses`) en forma cerrada, sin la serie."""
+    g  = np.asarray(ganancia, dtype=float)
+    lq = np.log1p(np.asarray(inf_pct, dtype=float) / 100) / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        den = np.expm1(np.where(lq != 0, lq, 1.0))
+        geo = np.where(lq != 0, np.exp(lq) * np.expm1(meses * lq) / den, meses)
+    return g * geo - inv
+
+def clientes_equilibrio(tic, wd, ins_pct, fixed):
+    """Clientes por día que igualan ventas netas de insumos y costos fijos."""
+    margen = np.asarray(tic, dtype=float) * wd * (1 - ins_pct)
+    with np.errstate(divide="ignore"):
+        return np.where(margen > 0, fixed / margen, np.inf)
+
+
+# ── Rejilla precalculada ────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class ScenarioGrid:
+    """Superficies de KPI sobre la rejilla completa; ejes (clientes, ticket[, inflación])."""
+    clientes:  np.ndarray
+    tickets:   np.ndarray
+    inflacion: np.ndarray
+    wd:        int
+    ins_pct:   float
+    fixed:     float
+    inv:       float
+    ventas:    np.ndarray   # (C, T)
+    insumos:   np.ndarray   # (C, T)
+    ganancia:  np.ndarray   # (C, T)
+    payback:   np.ndarray   # (C, T)     meses, sin inflación
+    payback_inf: np.ndarray # (C, T, I)  meses, con inflación
+    equilibrio:  np.ndarray # (T,)       clientes/día de equilibrio
+
+    def index(self, cli, tic, inf=None):
+        """Índices en la rejilla, o None si algún valor cae fuera de ella."""
+        ejes = [(self.clientes, cli), (self.tickets, tic)]
+        if inf is not None:
+            ejes.append((self.inflacion, inf))
+        idx = []
+        for eje, v in ejes:
+            i = int(np.searchsorted(eje, v))
+            if i >= len(eje) or eje[i] != v:
+                return None
+            idx.append(i)
+        return tuple(idx)
+
+    def kpis(self, cli, tic):
+        """(ventas, insumos, ganancia, payback) para un par de sliders."""
+        ij = self.index(cli, tic)
+        if ij is None:  # fuera de la rejilla: se calcula en el momento
+            v, i, g = kpis(cli, tic, self.wd, self.ins_pct, self.fixed)
+            return float(v), float(i), float(g), float(payback(g, self.inv))
+        return (self.ventas[ij], self.insumos[ij],
+                self.ganancia[ij], self.payback[ij])
+
+    def flujo(self, cli, tic, inf, meses=HORIZONTE):
+        """Serie de flujo acumulado para un escenario puntual."""
+        return flujo(self.kpis(cli, tic)[2], self.inv, inf, meses)
+
+def build_grid(wd, ins_pct, fixed, inv,
+               clientes=CLIENTES, tickets=TICKETS, inflacion=INFLACION):
+    """Evalúa toda la rejilla de escenarios en una sola pasada vectorizada."""
+    clientes, tickets, inflacion = (np.asarray(a) for a in (clientes, tickets, inflacion))
+    ventas, insumos, ganancia = kpis(clientes[:, None], tickets[None, :], wd, ins_pct, fixed)
+    return ScenarioGrid(
+        clientes=clientes, tickets=tickets, inflacion=inflacion,
+        wd=int(wd), ins_pct=float(ins_pct), fixed=float(fixed), inv=float(inv),
+        ventas=ventas, insumos=insumos, ganancia=ganancia,
+        payback=payback(ganancia, inv),
+        payback_inf=payback_inflacion(ganancia[..., None], inv, inflacion),
+        equilibrio=clientes_equilibrio(tickets, wd, ins_pct, fixed),
+    )
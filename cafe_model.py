@@ -0,0 +1,83 @@
+# cafe_model.py
+"""Modelo derivado del dataset: agregados, escenarios y supuestos ya tipados.
+
+Se construye una vez por versión del dataset; los reruns del tablero sólo leen
+atributos escalares, sin filtrar ni sumar DataFrames.
+"""
+from collections import namedtuple
+from types import MappingProxyType
+
+from cafe_data import find_source, load_sheets, source_key
+
+Scenario = namedtuple("Scenario", "clients_per_day ticket_ars monthly_sales_ars")
+
+
+class CafeModel:
+    """Agregados inmutables de un dataset (una instancia por versión)."""
+    __slots__ = ("version", "inv", "fixed", "wd", "ins_pct", "scenarios", "assumptions",
+                 "initial_costs", "monthly_costs")
+
+    def __init__(self, version, inv, fixed, wd, ins_pct, scenarios, assumptions,
+                 initial_costs=(), monthly_costs=()):
+        for k, v in zip(self.__slots__, (version, inv, fixed, wd, ins_pct,
+                                         MappingProxyType(dict(scenarios)),
+                                         MappingProxyType(dict(assumptions)),
+                                         MappingProxyType(dict(initial_costs)),
+                                         MappingProxyType(dict(monthly_costs)))):
+            object.__setattr__(self, k, v)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CafeModel es inmutable")
+
+    __delattr__ = __setattr__
+
+    def __repr__(self):
+        return (f"CafeModel(version={self.version!r}, inv={self.inv:,.0f}, "
+                f"fixed={self.fixed:,.0f}, escenarios={list(self.scenarios)})")
+
+    @property
+    def base(self) -> Scenario:
+        """Escenario por defecto del sidebar (Moderado, o el primero disponible)."""
+        return self.scenarios.get("Moderado") or next(iter(self.scenarios.values()))
+
+    @classmethod
+    def from_sheets(cls, d: dict, version=None):
+        """Deriva el modelo de las cuatro hojas de `load_sheets()`."""
+        init, month = d["initial_costs"], d["monthly_costs"]
+        sales, ass  = d["sales_scenarios"], d["assumptions"]
+        ASS = {str(k): float(v) for k, v in zip(ass.variable, ass.value)}
+        scenarios = {
+            str(r.scenario): Scenario(int(r.clients_per_day), int(r.ticket_ars),
+                                      float(r.monthly_sales_ars))
+            for r in sales.itertuples(index=False)
+        }
+        return cls(
+            version=version,
+            inv=float(init.cost_ars.sum()),
+            fixed=float(month.cost_ars.sum()),
+            wd=int(ASS.get("working_days_per_month", 26)),
+            ins_pct=float(ASS.get("insumos_percent_of_sales", 0.30)),
+            scenarios=scenarios,
+            assumptions=ASS,
+            initial_costs=_por_categoria(init),
+            monthly_costs=_por_categoria(month),
+        )
+
+
+def _por_categoria(df) -> dict:
+    """Costo (ARS) por línea de la hoja, sumando categorías repetidas."""
+    out = {}
+    for cat, cost in zip(df.category, df.cost_ars):
+        out[str(cat)] = out.get(str(cat), 0.0) + float(cost)
+    return out
+
+
+def dataset_version(src=None):
+    """Versión (hash + mtime) del dataset fuente, o None si no existe."""
+    src = src or find_source()
+    return source_key(src) if src else None
+
+def load_model(version=None, src=None):
+    """Carga las hojas y construye el CafeModel (None si no hay dataset)."""
+    d = load_sheets(src)
+    return CafeModel.from_sheets(d, version or dataset_version(src)) if d else None
@@ -0,0 +1,150 @@
+# cafe_montecarlo.py
+"""Simulación Monte Carlo del flujo acumulado (caminos × meses, totalmente vectorizada)."""
+from dataclasses import dataclass
+import numpy as np
+
+from cafe_engine import HORIZONTE
+
+PERCENTILES = (10, 50, 90)
+HIST_BINS   = 4096      # bins por mes para los percentiles en modo por bloques
+
+# Dispersión de insumos y de inflación: el dataset no trae historia para
+# estimarlas (la hoja `assumptions` sólo tiene el valor central), así que son
+# parámetros de `params_from_model`. Una fila `insumos_percent_sd` o
+# `inflation_sd_pct` en `assumptions` tiene prioridad sobre estos valores.
+INS_SD = 0.03           # sd de insumos/ventas (3 puntos sobre ~30 %)
+INF_SD = 10.0           # sd de la inflación anual, en puntos porcentuales
+
+
+@dataclass(frozen=True)
+class MCParams:
+    """Distribuciones de entrada de la simulación."""
+    cli_min: float; cli_mode: float; cli_max: float     # triangular, clientes/día
+    tic_min: float; tic_mode: float; tic_max: float     # triangular, ARS
+    ins_mean: float; ins_sd: float                      # normal truncada a [0, 1]
+    inf_mean: float; inf_sd: float                      # normal truncada a >= 0, % anual
+    ruido_mensual: float = 0.10                         # sd log-normal de clientes mes a mes
+    wd: int = 26
+
+def params_from_model(m, cli=None, tic=None, inf=0.0, ins_sd=None, inf_sd=None):
+    """Arma MCParams a partir de los escenarios y supuestos de un CafeModel.
+
+    El rango relativo Conservador–Optimista se centra en los valores elegidos en
+    el sidebar (o en el escenario base si no se pasan). `ins_sd` / `inf_sd`:
+    dispersión de insumos y de inflación; sin valor, la de `assumptions` si la
+    hoja la trae y si no `INS_SD` / `INF_SD`.
+    """
+    base, sc = m.base, m.scenarios.values()
+    cli = float(base.clients_per_day if cli is None else cli)
+    tic = float(base.ticket_ars if tic is None else tic)
+    c_lo = min(s.clients_per_day for s in sc) / base.clients_per_day
+    c_hi = max(s.clients_per_day for s in sc) / base.clients_per_day
+    t_lo = min(s.ticket_ars for s in sc) / base.ticket_ars
+    t_hi = max(s.ticket_ars for s in sc) / base.ticket_ars
+    ASS = m.assumptions
+    return MCParams(
+        cli_min=cli * c_lo, cli_mode=cli, cli_max=cli * c_hi,
+        tic_min=tic * t_lo, tic_mode=tic, tic_max=tic * t_hi,
+        ins_mean=m.ins_pct,
+        ins_sd=float(ins_sd if ins_sd is not None else ASS.get("insumos_percent_sd", INS_SD)),
+        inf_mean=float(inf),
+        inf_sd=float(inf_sd if inf_sd is not None else ASS.get("inflation_sd_pct", INF_SD)),
+        wd=m.wd,
+    )
+
+
+@dataclass(frozen=True)
+class MCResult:
+    """Bandas de flujo acumulado y probabilidad de payback por mes."""
+    mes:   np.ndarray   # (M,)
+    bands: np.ndarray   # (len(PERCENTILES), M)
+    prob_payback: np.ndarray  # (M,) P(flujo >= 0 en algún mes <= m)
+    n_paths: int
+
+    @property
+    def p10(self): return self.bands[0]
+    @property
+    def p50(self): return self.bands[1]
+    @property
+    def p90(self): return self.bands[2]
+
+    def prob_payback_mes(self, n):
+        """Probabilidad de recuperar la inversión a más tardar en el mes `n`."""
+        n = int(np.clip(n, 1, len(self.mes)))
+        return float(self.prob_payback[n - 1])
+
+
+def _triangular(rng, lo, mode, hi, n):
+    if hi <= lo:
+        return np.full(n, float(mode))
+    return rng.triangular(lo, mode, hi, n)
+
+def _truncnorm(rng, mean, sd, lo, hi, n):
+    return np.clip(rng.normal(mean, sd, n), lo, hi)
+
+def _paths(rng, p, fixed, inv, n, meses):
+    """Flujo acumulado de `n` caminos: array (n, meses)."""
+    mes = np.arange(1, meses + 1)
+    cli = _triangular(rng, p.cli_min, p.cli_mode, p.cli_max, n)[:, None]
+    tic = _triangular(rng, p.tic_min, p.tic_mode, p.tic_max, n)[:, None]
+    ins = _truncnorm(rng, p.ins_mean, p.ins_sd, 0.0, 1.0, n)[:, None]
+    inf = _truncnorm(rng, p.inf_mean, p.inf_sd, 0.0, np.inf, n)[:, None]
+    ruido = rng.lognormal(-p.ruido_mensual ** 2 / 2, p.ruido_mensual, (n, meses))
+    serie  = cli * ruido
+    serie *= tic * p.wd * (1 - ins)
+    serie -= fixed
+    serie *= (1 + inf / 100) ** (mes / 12)
+    flujo = np.cumsum(serie, axis=1, out=serie)
+    flujo -= inv
+    return flujo
+
+def _hist_percentiles(hist, lo, width, q):
+    """Percentiles (interpolación lineal dentro del bin) de un histograma por mes."""
+    cdf = np.cumsum(hist, axis=1)
+    n = cdf[:, -1:]
+    out = np.empty((len(q), len(hist)))
+    for i, p in enumerate(q):
+        target = p / 100 * n                        # (M, 1)
+        k = (cdf < target).sum(axis=1)              # primer bin que alcanza el objetivo
+        k = np.minimum(k, hist.shape[1] - 1)
+        rows = np.arange(len(hist))
+        antes = np.where(k > 0, cdf[rows, k - 1], 0)
+        frac = (target[:, 0] - antes) / np.maximum(hist[rows, k], 1)
+        out[i] = lo + (k + np.clip(frac, 0, 1)) * width
+    return out
+
+def simulate(p, fixed, inv, n_paths=10_000, meses=HORIZONTE, chunk=None, seed=None):
+    """Simula `n_paths` caminos de `meses` meses.
+
+    Con `chunk` los caminos se generan de a bloques y cada bloque se reduce al
+    salir: suma a los conteos de payback y a un histograma por mes de
+    `HIST_BINS` bins (rango tomado del primer bloque con margen; lo que cae
+    fuera va a los bins extremos). La memoria queda en `chunk × meses` más el
+    histograma, y los percentiles se interpolan dentro del bin (error menor que
+    el ancho de un bin, ~1/2000 del rango del primer bloque).
+    """
+    rng = np.random.default_rng(seed)
+    if not chunk or chunk >= n_paths:
+        flujo = _paths(rng, p, fixed, inv, n_paths, meses)
+        reached = np.logical_or.accumulate(flujo >= 0, axis=1).sum(axis=0)
+        bands = np.percentile(flujo, PERCENTILES, axis=0)
+    else:
+        reached = np.zeros(meses, dtype=np.int64)
+        hist = np.zeros((meses, HIST_BINS), dtype=np.int64)
+        offset = np.arange(meses) * HIST_BINS
+        lo = width = None
+        for a in range(0, n_paths, chunk):
+            f = _paths(rng, p, fixed, inv, min(chunk, n_paths - a), meses)
+            reached += np.logical_or.accumulate(f >= 0, axis=1).sum(axis=0)
+            if lo is None:
+                fmin, fmax = f.min(axis=0), f.max(axis=0)
+                span = np.where(fmax > fmin, fmax - fmin, np.abs(fmin) + 1.0)
+                lo, width = fmin - span / 2, 2 * span / HIST_BINS
+            else:
+                fmin, fmax = np.minimum(fmin, f.min(axis=0)), np.maximum(fmax, f.max(axis=0))
+            k = np.clip(((f - lo) / width).astype(np.int64), 0, HIST_BINS - 1)
+            hist += np.bincount((k + offset).ravel(),
+                                minlength=meses * HIST_BINS).reshape(meses, HIST_BINS)
+        bands = np.clip(_hist_percentiles(hist, lo, width, PERCENTILES), fmin, fmax)
+    return MCResult(mes=np.arange(1, meses + 1), bands=bands,
+                    prob_payback=reached / n_paths, n_paths=n_paths)
@@ -0,0 +1,195 @@
+# cafe_portfolio.py
+"""Modo cadena: el mismo modelo para N locales en una sola pasada vectorizada.
+
+Cada local es un dataset con el esquema de cuatro hojas (`VENUES_DIR/*.xlsx|csv`).
+`load_portfolio` lo reduce a columnas escalares (INV, FIXED, WD, INS_PCT y el
+escenario base) apiladas en arrays; `Portfolio.evaluate` calcula KPI y
+proyección de todos los locales a la vez, y `resumen` / `ranking` agregan.
+El detalle de un local (hojas completas) se lee recién cuando se pide.
+
+Índice:  <PORTFOLIO_CACHE>/<hash(dir)>.npz  con la clave (sha256-mtime) de cada
+archivo; al recargar sólo se parsean los locales nuevos o modificados, en paralelo.
+
+Benchmark con datos sintéticos:  python cafe_portfolio.py [n_locales] [dir]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib, os, sys, time
+from pathlib import Path
+import numpy as np
+
+from cafe_data import BASE, read_source, source_key
+from cafe_engine import HORIZONTE, flujo, kpis, payback_inflacion
+
+VENUES_DIR      = Path(os.environ.get("CIVIC_TWIN_VENUES", BASE/"venues"))
+PORTFOLIO_CACHE = Path(os.environ.get("CIVIC_TWIN_PORTFOLIO_CACHE", BASE/".cache"/"portfolio"))
+COLUMNAS = ("inv", "fixed", "wd", "ins_pct", "cli", "tic")
+
+
+@dataclass(frozen=True)
+class Results:
+    """KPI por local (N,) y flujo acumulado (N, meses)."""
+    ventas:   np.ndarray
+    insumos:  np.ndarray
+    ganancia: np.ndarray
+    payback:  np.ndarray
+    flujo:    np.ndarray
+    inv:      np.ndarray
+    inf:      float
+
+
+@dataclass(frozen=True)
+class Portfolio:
+    """Columnas de la cadena: un elemento por local."""
+    version: str
+    names:   np.ndarray
+    paths:   np.ndarray
+    keys:    np.ndarray
+    inv:     np.ndarray
+    fixed:   np.ndarray
+    wd:      np.ndarray
+    ins_pct: np.ndarray
+    cli:     np.ndarray     # escenario base (Moderado) de cada local
+    tic:     np.ndarray
+
+    def __len__(self):
+        return len(self.names)
+
+    def evaluate(self, cli=None, tic=None, inf=0.0, meses=HORIZONTE) -> Results:
+        """KPI y proyección de todos los locales; `cli`/`tic` escalares o (N,) (default: base)."""
+        cli = self.cli if cli is None else cli
+        tic = self.tic if tic is None else tic
+        ventas, insumos, ganancia = kpis(cli, tic, self.wd, self.ins_pct, self.fixed)
+        return Results(ventas=ventas, insumos=insumos, ganancia=ganancia,
+                       payback=payback_inflacion(ganancia, self.inv, inf),
+                       flujo=flujo(ganancia, self.inv, inf, meses),
+                       inv=self.inv, inf=float(inf))
+
+    def detalle(self, i):
+        """CafeModel completo del local `i` (se parsea bajo demanda y queda en caché)."""
+        if not self.paths[i]:
+            raise LookupError(f"{self.names[i]} no tiene dataset en disco")
+        return _detalle(str(self.paths[i]), str(self.keys[i]))
+
+
+def resumen(r: Results) -> dict:
+    """Agregados de la cadena: totales, payback consolidado y distribución."""
+    g, inv = float(r.ganancia.sum()), float(r.inv.sum())
+    ok = np.isfinite(r.payback)
+    p10, p50, p90 = np.percentile(r.payback[ok], (10, 50, 90)) if ok.any() else (np.inf,) * 3
+    return {
+        "locales": int(len(r.ganancia)), "rentables": int((r.ganancia > 0).sum()),
+        "ventas": float(r.ventas.sum()), "ganancia": g, "inv": inv,
+        "payback": float(payback_inflacion(g, inv, r.inf)),
+        "payback_p10": float(p10), "payback_p50": float(p50), "payback_p90": float(p90),
+        "flujo": r.flujo.sum(axis=0),
+    }
+
+def ranking(r: Results, by="payback", n=20, desc=False) -> np.ndarray:
+    """Índices de los `n` mejores locales según `by` (sin ordenar toda la cadena)."""
+    v = np.asarray(getattr(r, by), dtype=float)
+    v = -v if desc else v
+    n = min(n, len(v))
+    if n == 0:
+        return np.arange(0)
+    top = np.argpartition(v, n - 1)[:n] if n < len(v) else np.arange(len(v))
+    return top[np.argsort(v[top], kind="stable")]
+
+
+# ── Carga desde disco ───────────────────────────────────────────────────────
+
+@lru_cache(maxsize=64)
+def _detalle(path, key):
+    from cafe_model import CafeModel
+    return CafeModel.from_sheets(read_source(path), key)
+
+def _fila(path):
+    """Columnas escalares de un local (corre en un proceso worker)."""
+    from cafe_model import CafeModel
+    m = CafeModel.from_sheets(read_source(path))
+    return (m.inv, m.fixed, m.wd, m.ins_pct, m.base.clients_per_day, m.base.ticket_ars)
+
+def venue_files(venues_dir=VENUES_DIR) -> list:
+    d = Path(venues_dir)
+    return sorted(p for p in d.glob("*") if p.suffix in (".xlsx", ".csv")) if d.is_dir() else []
+
+def portfolio_version(venues_dir=VENUES_DIR):
+    """Clave barata (nombre, tamaño, mtime) del directorio, para cachear por versión."""
+    files = venue_files(venues_dir)
+    if not files:
+        return None
+    sig = "\n".join(f"{p.name}:{p.stat().st_size}:{p.stat().st_mtime_ns}" for p in files)
+    return hashlib.sha256(sig.encode()).hexdigest()[:16]
+
+def load_portfolio(venues_dir=VENUES_DIR, cache_dir=PORTFOLIO_CACHE, workers=None):
+    """Apila los datasets de `venues_dir`; None si no hay locales."""
+    files = venue_files(venues_dir)
+    if not files:
+        return None
+    keys = [source_key(p) for p in files]
+    idx = Path(cache_dir)/f"{hashlib.sha256(str(Path(venues_dir).resolve()).encode()).hexdigest()[:16]}.npz"
+    prev = {}
+    try:
+        with np.load(idx) as z:
+            prev = {k: z["data"][i] for i, k in enumerate(z["keys"])}
+    except (OSError, KeyError, ValueError):
+        pass
+    faltan = [i for i, k in enumerate(keys) if k not in prev]
+    if faltan:
+        with ProcessPoolExecutor(workers) as ex:
+            for i, fila in zip(faltan, ex.map(_fila, [str(files[i]) for i in faltan], chunksize=16)):
+                prev[keys[i]] = np.array(fila, dtype=float)
+    data = np.stack([prev[k] for k in keys])
+    if faltan or len(prev) != len(keys):
+        idx.parent.mkdir(parents=True, exist_ok=True)
+        tmp = idx.with_suffix(f".{os.getpid()}.tmp.npz")
+        np.savez(tmp, keys=np.array(keys), data=data)
+        os.replace(tmp, idx)
+    return _portfolio([p.stem for p in files], [str(p) for p in files], keys, data)
+
+def _portfolio(names, paths, keys, data):
+    version = hashlib.sha256("\n".join(keys).encode()).hexdigest()[:16]
+    cols = {c: np.ascontiguousarray(data[:, j]) for j, c in enumerate(COLUMNAS)}
+    for a in cols.values():
+        a.setflags(write=False)
+    return Portfolio(version=version, names=np.array(names), paths=np.array(paths),
+                     keys=np.array(keys), **cols)
+
+def synthetic(n, seed=0, base=None):
+    """Cadena sintética de `n` locales alrededor de un modelo base (benchmarks)."""
+    rng = np.random.default_rng(seed)
+    b = base or (9.5e6, 4.0e6, 26, 0.30, 100, 5000)
+    data = np.column_stack([
+        b[0] * rng.uniform(.6, 1.6, n), b[1] * rng.uniform(.6, 1.6, n),
+        rng.integers(22, 31, n), np.clip(rng.normal(b[3], .04, n), .15, .5),
+        np.round(b[4] * rng.uniform(.4, 1.8, n)), np.round(b[5] * rng.uniform(.7, 1.4, n), -2),
+    ]).astype(float)
+    names = [f"local_{i:05d}" for i in range(n)]
+    return _portfolio(names, [""] * n, [f"sintetico-{seed}-{i}" for i in range(n)], data)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    def t(label, fn, reps=20):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            out = fn()
+        print(f"{label:<28}{(time.perf_counter() - t0) / reps * 1e3:9.2f} ms")
+        return out
+
+    p = t(f"sintético ({n:,} locales)", lambda: synthetic(n), reps=3)
+    r = t("evaluate (KPI + 24 meses)", lambda: p.evaluate(inf=50.0))
+    s = t("resumen", lambda: resumen(r))
+    t("ranking top 20", lambda: ranking(r, "payback", 20))
+    t("evaluate con ticket +10 %", lambda: p.evaluate(tic=p.tic * 1.1, inf=50.0))
+    print(f"rentables {s['rentables']:,}/{s['locales']:,}  payback consolidado {s['payback']:.1f} meses")
+    if len(sys.argv) > 2:  # carga real desde un directorio de datasets
+        import shutil
+        shutil.rmtree(PORTFOLIO_CACHE, ignore_errors=True)
+        for label in ("carga en frío", "carga con índice"):
+            t0 = time.perf_counter()
+            q = load_portfolio(sys.argv[2])
+            print(f"{label:<28}{(time.perf_counter() - t0) * 1e3:9.2f} ms  ({len(q):,} locales)")
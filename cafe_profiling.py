@@ -0,0 +1,181 @@
+# cafe_profiling.py
+"""Instrumentación opcional de cada rerun del tablero, por etapa.
+
+Se activa con `CIVIC_TWIN_PROFILE` (todo el proceso) o `?profile=1` en la URL
+(sólo esa sesión). Desactivada, `begin()` devuelve un objeto cuyos métodos no
+hacen nada.
+
+    prof = begin(view)          # al principio del script
+    prof.stage("css")           # desde acá hasta la próxima etapa cuenta como "css"
+    ...
+    prof.end()                  # al final (o antes de st.stop())
+
+Una misma etapa puede abrirse varias veces por rerun; se suma. Los tiempos se
+agregan en memoria (últimas `WINDOW` muestras por etapa) y se exponen como
+percentiles en la vista oculta `?diag=1` y en formato texto de Prometheus,
+escrito cada `PROM_EVERY` segundos en `PROM_FILE` (textfile collector).
+
+Snapshots de reruns lentos: `CIVIC_TWIN_PROFILE=cprofile` (o `pyinstrument`,
+si está instalado) perfila cada rerun y guarda en `SNAP_DIR` los que superan
+`CIVIC_TWIN_PROFILE_SLOW_MS` (default 500 ms).
+"""
+from collections import defaultdict, deque
+import os, threading, time
+from pathlib import Path
+import numpy as np
+
+BASE       = Path(__file__).parent
+MODE       = os.environ.get("CIVIC_TWIN_PROFILE", "")
+SLOW_MS    = float(os.environ.get("CIVIC_TWIN_PROFILE_SLOW_MS", 500))
+SNAP_DIR   = Path(os.environ.get("CIVIC_TWIN_PROFILE_DIR", BASE/".cache"/"profiles"))
+PROM_FILE  = Path(os.environ.get("CIVIC_TWIN_PROFILE_PROM", BASE/".cache"/"metrics"/"civic_twin.prom"))
+PROM_EVERY = 5.0
+WINDOW     = 1000
+QUANTILES  = (0.5, 0.9, 0.99)
+MAX_SNAPS  = 50
+
+
+class Registry:
+    """Muestras por etapa (ventana deslizante) + contadores acumulados, thread-safe."""
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._sum = defaultdict(float)
+        self._count = defaultdict(int)
+        self.last = {}            # desglose del último rerun
+        self.snapshots = deque(maxlen=MAX_SNAPS)
+        self._written = 0.0
+
+    def record(self, stages: dict):
+        with self._lock:
+            for k, v in stages.items():
+                self._samples[k].append(v)
+                self._sum[k] += v
+                self._count[k] += 1
+            self.last = dict(stages)
+            due = time.monotonic() - self._written >= PROM_EVERY
+            if due:
+                self._written = time.monotonic()
+        if due:
+            self.write_prometheus()
+
+    def summary(self) -> dict:
+        """{etapa: {count, sum, mean, p50, p90, p99}} en segundos."""
+        with self._lock:
+            snap = {k: (np.fromiter(v, float), self._sum[k], self._count[k])
+                    for k, v in self._samples.items()}
+        out = {}
+        for k, (v, s, n) in sorted(snap.items()):
+            q = np.quantile(v, QUANTILES) if len(v) else [np.nan] * len(QUANTILES)
+            out[k] = {"count": n, "sum": s, "mean": s / n if n else 0.0,
+                      **{f"p{int(p * 100)}": float(x) for p, x in zip(QUANTILES, q)}}
+        return out
+
+    def prometheus(self) -> str:
+        lines = ["# HELP civic_twin_stage_seconds Tiempo por etapa del rerun del tablero.",
+                 "# TYPE civic_twin_stage_seconds summary"]
+        for k, s in self.summary().items():
+            for p in QUANTILES:
+                lines.append(f'civic_twin_stage_seconds{{stage="{k}",quantile="{p}"}} '
+                             f'{s[f"p{int(p * 100)}"]:.6f}')
+            lines.append(f'civic_twin_stage_seconds_sum{{stage="{k}"}} {s["sum"]:.6f}')
+            lines.append(f'civic_twin_stage_seconds_count{{stage="{k}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        path = Path(path or PROM_FILE)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(self.prometheus())
+            os.replace(tmp, path)   # el collector nunca lee un archivo a medias
+        except OSError:
+            pass
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear(); self._sum.clear(); self._count.clear()
+            self.last = {}
+
+REGISTRY = Registry()
+
+
+# ── Rerun ───────────────────────────────────────────────────────────────────
+
+class _Off:
+    enabled = False
+    def stage(self, name): pass
+    def end(self): pass
+
+_OFF = _Off()
+
+class Rerun:
+    """Cronómetro de un rerun: cada `stage()` cierra la etapa anterior."""
+    enabled = True
+
+    def __init__(self, view, mode="on", registry=REGISTRY):
+        self.view, self.mode, self.registry = view, mode, registry
+        self.stages = defaultdict(float)
+        self._t0 = self._t = time.perf_counter()
+        self._name = "inicio"
+        self._prof = _start_profiler(mode)
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self.stages[self._name] += now - self._t
+        self._name, self._t = name, now
+
+    def end(self):
+        if self._name is None:
+            return
+        self.stage(None)
+        total = self._t - self._t0
+        self.stages[f"rerun:{self.view}"] = total
+        if self._prof is not None:
+            _save_snapshot(self._prof, self.view, total, self.registry)
+        self.registry.record(self.stages)
+
+
+def _start_profiler(mode):
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            mode = "cprofile"
+        else:
+            p = Profiler(); p.start()
+            return p
+    if mode == "cprofile":
+        import cProfile
+        p = cProfile.Profile(); p.enable()
+        return p
+    return None
+
+def _save_snapshot(prof, view, total, registry):
+    if hasattr(prof, "disable"):
+        prof.disable()
+    else:
+        prof.stop()
+    if total * 1000 < SLOW_MS:
+        return
+    SNAP_DIR.mkdir(parents=True, exist_ok=True)
+    stem = SNAP_DIR/f"{time.strftime('%Y%m%d-%H%M%S')}-{view}-{total * 1000:.0f}ms"
+    if hasattr(prof, "dump_stats"):
+        path = stem.with_suffix(".prof"); prof.dump_stats(path)
+    else:
+        path = stem.with_suffix(".html"); path.write_text(prof.output_html())
+    registry.snapshots.append(str(path))
+
+def _mode(v) -> str:
+    v = str(v or "").lower()
+    return "" if v in ("", "0", "off", "false") else ("on" if v in ("1", "true") else v)
+
+def enabled(query_params=None) -> str:
+    """Modo activo ('' si está apagado): env var o `?profile=` de la sesión."""
+    return _mode(MODE) or _mode((query_params or {}).get("profile"))
+
+def begin(view, query_params=None):
+    """Cronómetro del rerun actual (no-op si la instrumentación está apagada)."""
+    mode = enabled(query_params)
+    return Rerun(view, mode) if mode else _OFF
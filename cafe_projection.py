@@ -0,0 +1,203 @@
+# cafe_projection.py
+"""Proyección por componentes con horizonte configurable y recálculo incremental.
+
+Cada componente es un array por período (mensual o diario, hasta `MAX_MESES`):
+
+    ventas_t  = V0 · idx_ticket_t            V0 = cli · tic · WD (por período)
+    insumos_t = V0 · INS_PCT · idx_insumos_t
+    costo_c,t = C_c · idx_c,t                 una curva por línea de monthly_costs
+    ganancia_t = ventas_t - insumos_t - Σ costo_c,t ;   flujo = cumsum(ganancia) - INV
+
+Las curvas son una tasa anual (%) escalar o un array de tasas por período;
+`idx_t` es el producto acumulado de los factores del período (mismo criterio que
+`cafe_engine.flujo`: el mes m ya está indexado por `(1+inf)**(m/12)`).
+
+`Projection.update()` compara las entradas nuevas con las anteriores y recalcula
+sólo los componentes que cambiaron, desde el primer período distinto; la suma
+acumulada se rehace desde el mínimo de esos períodos. Cambiar INV no recalcula nada.
+
+Benchmark:  python cafe_projection.py
+"""
+from collections import OrderedDict
+import threading, time
+import numpy as np
+
+DIAS_MES  = 365 / 12
+FREQS     = {"M": 1.0, "D": DIAS_MES}       # períodos por mes
+MAX_MESES = 240
+
+
+def index_curve(rate, n, per_month=1.0):
+    """Índice acumulado (n,) de una tasa anual en % (escalar o array por período)."""
+    r = np.broadcast_to(np.asarray(rate, dtype=float), (n,))
+    return np.cumprod((1 + r / 100) ** (1 / (12 * per_month)))
+
+
+class Projection:
+    """Componentes de la proyección de un escenario; se actualiza in situ."""
+
+    def __init__(self, meses=24, freq="M"):
+        if freq not in FREQS:
+            raise ValueError(f"Frecuencia {freq!r} no soportada (M o D)")
+        if not 0 < meses <= MAX_MESES:
+            raise ValueError(f"Horizonte fuera de rango (1..{MAX_MESES} meses)")
+        self.meses, self.freq, self.ppm = meses, freq, FREQS[freq]
+        self.n = int(round(meses * self.ppm))
+        self.mes = np.arange(1, self.n + 1) / self.ppm          # eje en meses
+        self._rates, self._idx, self._base = {}, {}, {}
+        self._comp = {}                                        # línea de costo → array
+        self.ventas   = np.zeros(self.n)
+        self.insumos  = np.zeros(self.n)
+        self.costos   = np.zeros(self.n)                       # Σ líneas
+        self.ganancia = np.zeros(self.n)
+        self.acum     = np.zeros(self.n)                       # cumsum(ganancia)
+        self.inv = 0.0
+        self.recalculados = 0                                  # períodos·componente del último update
+
+    # ── API ──────────────────────────────────────────────────────────────
+
+    def update(self, cli, tic, wd, ins_pct, inv, costs: dict, curves: dict) -> int:
+        """Aplica entradas nuevas; devuelve el primer período recalculado (n si nada cambió).
+
+        `curves` admite "ticket", "insumos", cada línea de `costs` y "general"
+        (default de las que falten); valores en % anual, escalares o (n,).
+        """
+        self.inv, self.recalculados = float(inv), 0
+        v0 = float(cli) * float(tic) * float(wd) / self.ppm
+        general = curves.get("general", 0.0)
+        k = self.n
+        k = min(k, self._set("ventas", v0, curves.get("ticket", general)))
+        k = min(k, self._set("insumos", v0 * float(ins_pct), curves.get("insumos", general)))
+        for line in set(self._comp) - set(costs):                        # líneas borradas
+            k = min(k, self._set(line, 0.0, 0.0))
+            del self._comp[line], self._base[line], self._rates[line], self._idx[line]
+        for line, c in costs.items():
+            k = min(k, self._set(line, float(c) / self.ppm, curves.get(line, general)))
+        if k < self.n:
+            g = self.ganancia[k:] = self.ventas[k:] - self.insumos[k:] - self.costos[k:]
+            self.acum[k:] = np.cumsum(g) + (self.acum[k - 1] if k else 0.0)
+            self.recalculados += self.n - k
+        return k
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria de los arrays de la proyección (para acotar `ProjectionPool`)."""
+        arrays = [self.mes, self.ventas, self.insumos, self.costos, self.ganancia, self.acum,
+                  *self._rates.values(), *self._idx.values(), *self._comp.values()]
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def flujo(self):
+        return self.acum - self.inv
+
+    def payback(self) -> float:
+        """Meses hasta que el flujo acumulado llega a cero (inf si no ocurre en el horizonte)."""
+        ok = self.acum >= self.inv
+        return float(self.mes[ok.argmax()]) if ok.any() else np.inf
+
+    # ── Componentes ──────────────────────────────────────────────────────
+
+    def _set(self, name, base, rate) -> int:
+        """Actualiza un componente; devuelve el primer período cambiado (n si ninguno)."""
+        r = np.broadcast_to(np.asarray(rate, dtype=float), (self.n,))
+        old_r, old_base = self._rates.get(name), self._base.get(name)
+        if old_r is None:
+            k_idx = 0
+        else:
+            diff = np.flatnonzero(r != old_r)
+            k_idx = int(diff[0]) if len(diff) else self.n
+        if k_idx < self.n:   # la curva cambió desde k_idx: se rehace su índice
+            idx = self._idx.setdefault(name, np.empty(self.n))
+            idx[k_idx:] = index_curve(r[k_idx:], self.n - k_idx, self.ppm)
+            if k_idx:
+                idx[k_idx:] *= idx[k_idx - 1]
+            self._rates[name] = r.copy()
+        k = 0 if base != old_base else k_idx
+        if k == self.n:
+            return k
+        self._base[name] = base
+        new = base * self._idx[name][k:]
+        if name == "ventas":
+            self.ventas[k:] = new
+        elif name == "insumos":
+            self.insumos[k:] = new
+        else:
+            comp = self._comp.setdefault(name, np.zeros(self.n))
+            self.costos[k:] += new - comp[k:]
+            comp[k:] = new
+        self.recalculados += self.n - k
+        return k
+
+
+class ProjectionPool:
+    """Projections por sesión para recalcular sólo lo que cambió entre reruns.
+
+    La cota es global al proceso (el pool vive en `st.cache_resource`): a lo sumo
+    `maxsize` entradas y `max_bytes` de arrays, desalojando la menos usada; las que
+    no se tocan hace `ttl` segundos (sesiones cerradas) se liberan en cada `get`.
+    """
+
+    def __init__(self, maxsize=32, max_bytes=64 << 20, ttl=1800.0):
+        self.maxsize, self.max_bytes, self.ttl = maxsize, max_bytes, ttl
+        self._items = OrderedDict()                 # session_id → (Projection, último uso)
+        self._lock = threading.Lock()
+
+    def get(self, session_id, meses, freq):
+        """Projection de la sesión para ese horizonte (nueva si cambió o no había)."""
+        if session_id is None:
+            return Projection(meses, freq)
+        now = time.monotonic()
+        with self._lock:
+            p, _ = self._items.pop(session_id, (None, None))
+            if p is None or (p.meses, p.freq) != (meses, freq):
+                p = Projection(meses, freq)
+            while self._items:
+                _, (q, used) = next(iter(self._items.items()))
+                if (now - used <= self.ttl and len(self._items) < self.maxsize
+                        and self._bytes() + p.nbytes <= self.max_bytes):
+                    break
+                self._items.popitem(last=False)
+            self._items[session_id] = (p, now)
+            return p
+
+    def discard(self, session_id):
+        with self._lock:
+            self._items.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _bytes(self):
+        return sum(p.nbytes for p, _ in self._items.values())
+
+if __name__ == "__main__":
+    costs = {"Personal": 1.7e6, "Alquiler": 0, "Insumos": 2e6, "Servicios": 1.2e5,
+             "Mantenimiento": 5e4, "Marketing": 3e4, "Impuestos y tasas": 1e5}
+    curves = {"general": 60.0, "ticket": 55.0, "insumos": 70.0}
+    args = dict(cli=100, tic=5000, wd=26, ins_pct=.3, inv=9.5e6)
+
+    def t(fn, reps=200):
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            fn()
+        return (time.perf_counter() - t0) / reps * 1e3
+
+    print(f"{'horizonte':<18}{'completo':>10}{'1 línea':>10}{'curva m/2':>11}{'INV':>8}   (ms)")
+    for meses, freq in ((24, "M"), (120, "M"), (240, "M"), (120, "D"), (240, "D")):
+        full = t(lambda: Projection(meses, freq).update(costs=costs, curves=curves, **args))
+        p = Projection(meses, freq)
+        p.update(costs=costs, curves=curves, **args)
+        state = [0]
+        def one_line():
+            state[0] ^= 1
+            p.update(costs={**costs, "Servicios": 1.2e5 + state[0]}, curves=curves, **args)
+        mid = np.full(p.n, 60.0)
+        def curve_tail():
+            state[0] ^= 1
+            mid[p.n // 2:] = 60.0 + state[0]
+            p.update(costs=costs, curves={**curves, "Personal": mid}, **args)
+        def inv():
+            state[0] ^= 1
+            p.update(costs=costs, curves={**curves, "Personal": mid}, **{**args, "inv": 9.5e6 + state[0]})
+        print(f"{f'{meses} meses ({freq})':<18}{full:>10.3f}{t(one_line):>10.3f}"
+              f"{t(curve_tail):>11.3f}{t(inv):>8.3f}")
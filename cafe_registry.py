@@ -0,0 +1,184 @@
+# cafe_registry.py
+"""Dataset del tablero con recarga en caliente: vigilancia, versión y swap atómico.
+
+Un `DatasetRegistry` por proceso (lo crea `st.cache_resource`) tiene el `Store`
+vigente (ver cafe_store.py). Un hilo mira cada `POLL_S` segundos el `stat` de la
+fuente (`find_source()`: el CSV tiene prioridad sobre el Excel); si cambió y se
+mantiene estable `SETTLE_S` segundos (editores que escriben en varios pasos),
+recalcula la versión de contenido y, si es nueva, arma el Store nuevo en ese
+mismo hilo, fuera de cualquier rerun. Recién entonces reemplaza la referencia:
+los reruns en curso terminan con el Store que tomaron y los siguientes ven el
+nuevo. Ningún worker hace una carga en frío ni se limpia ninguna caché entera.
+
+Invalidación por hoja: se compara el hash de cada hoja con la versión anterior
+y sólo se recalculan los derivados de `cafe_store.DEPENDS` que usan alguna hoja
+cambiada (editar `sales_scenarios` no rehace la rejilla ni las curvas).
+Si la fuente nueva no se puede leer, queda el Store anterior y `error` lo informa.
+
+Las sesiones se enteran comparando `version` con la que usaron en su último
+rerun (en el tablero, un fragmento que corre cada `POLL_S` segundos).
+
+Demo con una copia del dataset:  python cafe_registry.py
+"""
+import atexit, logging, os, threading, time
+from pathlib import Path
+
+from cafe_data import CACHE_DIR, SHEETS, find_source, load_sheets, sheet_keys, source_key
+from cafe_model import CafeModel
+from cafe_store import store_from_model
+
+log = logging.getLogger(__name__)
+
+POLL_S   = float(os.environ.get("CIVIC_TWIN_DATASET_POLL", 2.0))
+SETTLE_S = 0.5
+
+
+class DatasetRegistry:
+    """Store vigente del dataset + hilo que lo recarga cuando cambia la fuente."""
+
+    def __init__(self, src=None, poll=POLL_S, on_swap=None, cache_dir=CACHE_DIR):
+        self.src, self.poll, self.cache_dir = (Path(src) if src else None), poll, cache_dir
+        self.on_swap = on_swap              # on_swap(anterior, nuevo, hojas_cambiadas)
+        self._current, self._keys, self._sig = None, {}, None
+        self._lock = threading.Lock()       # una recarga a la vez
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self.reloads, self.error, self.changed, self.reload_s = 0, None, (), 0.0
+
+    @property
+    def current(self):
+        """Store vigente (None si no hay dataset); tomarlo una vez por rerun."""
+        return self._current
+
+    @property
+    def version(self):
+        s = self._current
+        return s.version if s is not None else None
+
+    # ── Ciclo de vida ───────────────────────────────────────────────────
+
+    def start(self):
+        """Carga la versión actual (sincrónico) y arranca el vigía (idempotente)."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self.check()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="dataset-registry", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            if self._stop:
+                break
+            try:
+                self.check()
+            except Exception:   # el vigía no se cae por un dataset roto
+                log.exception("Recarga del dataset fallida")
+
+    # ── Recarga ─────────────────────────────────────────────────────────
+
+    def _source(self):
+        return self.src if self.src is not None else find_source()
+
+    @staticmethod
+    def _stat(src):
+        try:
+            st = src.stat()
+        except (OSError, AttributeError):
+            return None
+        return (str(src), st.st_mtime_ns, st.st_size)
+
+    def check(self) -> bool:
+        """Un paso del vigía: recarga si la fuente cambió; True si hubo swap."""
+        src = self._source()
+        sig = self._stat(src)
+        if sig == self._sig:
+            return False
+        if self._current is not None and sig is not None:
+            time.sleep(SETTLE_S)            # que termine de escribirse
+            if self._stat(src) != sig:
+                return False                # sigue cambiando: próxima vuelta
+        return self.reload(src, sig)
+
+    def reload(self, src=None, sig=None) -> bool:
+        """Relee la fuente y reemplaza el Store si la versión cambió; True si hubo swap."""
+        with self._lock:
+            src = src or self._source()
+            sig = sig or self._stat(src)
+            if sig is None:                 # sin dataset: se conserva lo último cargado
+                self._sig = None
+                return False
+            t0 = time.perf_counter()
+            try:
+                version = source_key(src)
+                sheets = load_sheets(src, self.cache_dir)
+                keys = sheet_keys(sheets)
+                changed = tuple(s for s in SHEETS if keys.get(s) != self._keys.get(s))
+                prev = self._current
+                if prev is not None and not changed:
+                    self._sig = sig         # mismo contenido (p. ej. sólo un touch): sin swap
+                    return False
+                new = store_from_model(CafeModel.from_sheets(sheets, version), prev,
+                                       changed if prev is not None else None)
+            except Exception as e:
+                self._sig, self.error = sig, f"{type(e).__name__}: {e}"
+                log.warning("No se pudo cargar %s: %s", src, self.error)
+                return False
+            self._current, self._keys, self._sig = new, keys, sig   # swap atómico
+            self.reloads += 1
+            self.error, self.changed = None, changed
+            self.reload_s = time.perf_counter() - t0
+        log.info("Dataset %s cargado en %.0f ms (hojas cambiadas: %s)",
+                 version, self.reload_s * 1e3, ", ".join(changed) or "ninguna")
+        if self.on_swap is not None and prev is not None:
+            self.on_swap(prev, new, changed)
+        return True
+
+    def stats(self) -> dict:
+        return {"version": self.version, "reloads": self.reloads, "error": self.error,
+                "changed": list(self.changed), "reload_ms": round(self.reload_s * 1e3, 1)}
+
+
+if __name__ == "__main__":
+    import shutil, tempfile
+    import pandas as pd
+    from cafe_data import read_source
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    orig = find_source()
+    if orig is None:
+        raise SystemExit("Dataset no encontrado")
+    tmp = Path(tempfile.mkdtemp())
+    sheets = read_source(orig)
+
+    def write(d):   # CSV tidy, como lo escribe un analista
+        pd.concat([df.assign(dataset=name) for name, df in d.items()]).to_csv(tmp/"data.csv", index=False)
+
+    write(sheets)
+    reg = DatasetRegistry(tmp/"data.csv", poll=0.2, cache_dir=tmp/"cache").start()
+    s0 = reg.current
+    print(f"inicial  {reg.version}  {reg.reload_s * 1e3:.0f} ms")
+    for label, sheet, col, delta in (("escenarios", "sales_scenarios", "clients_per_day", 10),
+                                     ("costos mensuales", "monthly_costs", "cost_ars", 50_000)):
+        sheets[sheet].loc[0, col] += delta
+        t0 = time.perf_counter()
+        write(sheets)
+        while reg.current is s0:
+            time.sleep(0.01)
+        s1 = reg.current
+        print(f"{label:<17}detectado y cargado en {(time.perf_counter() - t0) * 1e3:.0f} ms  "
+              f"hojas {list(reg.changed)}  rejilla reutilizada: {s1.grid is s0.grid}")
+        s0 = s1
+    reg.stop()
+    shutil.rmtree(tmp, ignore_errors=True)
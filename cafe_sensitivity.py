@@ -0,0 +1,156 @@
+# cafe_sensitivity.py
+"""Análisis de sensibilidad y equilibrio sobre las mismas fórmulas del bloque KPI.
+
+    ventas = cli * tic * WD     insumos = ventas * INS_PCT     ganancia = ventas - insumos - FIXED
+
+Todo en forma cerrada y vectorizada (sin iterar sliders):
+
+- `ticket_equilibrio` / `clientes_equilibrio`: ganancia = 0.
+- `ganancia_objetivo` / `clientes_para_payback`: curva de clientes por ticket que
+  recupera INV en `meses`, con o sin inflación (misma serie que la proyección).
+- `tornado`: ±`delta` sobre cada línea de `initial_costs`, `monthly_costs`,
+  cada supuesto de `assumptions` y los sliders; todas las variantes en un
+  único cálculo vectorizado, ordenadas por impacto en el payback.
+
+`analyze(m)` junta las curvas por versión del dataset; `cached_analysis()` la
+memoiza por versión para uso headless.
+"""
+from collections import namedtuple
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+
+from cafe_engine import TICKETS, clientes_equilibrio, kpis, payback_inflacion
+
+OBJETIVOS = (6, 12, 18, 24)    # meses de payback para las curvas
+DELTA     = 0.10
+
+# índice de cada parámetro en el vector (cli, tic, wd, ins_pct, fixed, inv)
+CLI, TIC, WD, INS, FIXED, INV = range(6)
+_SUPUESTOS = {"working_days_per_month": WD, "insumos_percent_of_sales": INS}
+
+Tornado = namedtuple("Tornado", "grupo nombre base bajo alto "
+                                "ganancia_bajo ganancia_alto payback_bajo payback_alto impacto")
+
+
+# ── Forma cerrada ───────────────────────────────────────────────────────────
+
+def ticket_equilibrio(cli, wd, ins_pct, fixed):
+    """Ticket que iguala ventas netas de insumos y costos fijos."""
+    margen = np.asarray(cli, dtype=float) * wd * (1 - ins_pct)
+    with np.errstate(divide="ignore"):
+        return np.where(margen > 0, fixed / margen, np.inf)
+
+def ganancia_objetivo(inv, meses, inf_pct=0.0):
+    """Ganancia mensual que recupera `inv` en `meses` (inverso de `payback_inflacion`).
+
+    Con `q = (1+inf)**(1/12)`:  g = INV·(q-1) / (q·(q**n - 1));  sin inflación g = INV/n.
+    """
+    n = np.asarray(meses, dtype=float)
+    q = (1 + np.asarray(inf_pct, dtype=float) / 100) ** (1 / 12)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        geo = inv * (q - 1) / (q * np.expm1(n * np.log(q)))
+    return np.where(q > 1, geo, inv / n)
+
+def clientes_para_payback(tic, meses, wd, ins_pct, fixed, inv, inf_pct=0.0):
+    """Clientes por día que, con ticket `tic`, recuperan la inversión en `meses`."""
+    g = ganancia_objetivo(inv, meses, inf_pct)
+    margen = np.asarray(tic, dtype=float) * wd * (1 - ins_pct)
+    with np.errstate(divide="ignore"):
+        return np.where(margen > 0, (fixed + g) / margen, np.inf)
+
+
+# ── Tornado ─────────────────────────────────────────────────────────────────
+
+def _entradas(m, cli, tic):
+    """(grupo, nombre, valor base, índice del parámetro, es_aditivo) por cada entrada."""
+    rows = [("escenario", "clients_per_day", float(cli), CLI, False),
+            ("escenario", "ticket_ars", float(tic), TIC, False)]
+    rows += [("initial_costs", k, v, INV, True) for k, v in m.initial_costs.items()]
+    rows += [("monthly_costs", k, v, FIXED, True) for k, v in m.monthly_costs.items()]
+    # supuestos que no entran en las fórmulas (sueldos, tipo de cambio) quedan con impacto 0
+    rows += [("assumptions", k, v, _SUPUESTOS.get(k), False) for k, v in m.assumptions.items()]
+    return rows
+
+def tornado(m, cli, tic, inf=0.0, delta=DELTA) -> Tornado:
+    """Ganancia y payback con cada entrada en ±`delta`, de mayor a menor impacto.
+
+    Cada campo es un array alineado; `impacto` es |payback_alto - payback_bajo|
+    (inf si alguna variante deja de ser rentable).
+    """
+    rows = _entradas(m, cli, tic)
+    base = np.array([cli, tic, m.wd, m.ins_pct, m.fixed, m.inv], dtype=float)
+    P = np.broadcast_to(base, (len(rows), 2, 6)).copy()     # (entrada, bajo/alto, parámetro)
+    valor = np.array([r[2] for r in rows], dtype=float)
+    for i, (_, _, v, j, aditivo) in enumerate(rows):
+        if j is None:
+            continue
+        if aditivo:   # una línea de costo: se mueve sólo su parte del total
+            P[i, :, j] += (-delta * v, delta * v)
+        else:
+            P[i, :, j] *= (1 - delta, 1 + delta)
+    _, _, g = kpis(P[..., CLI], P[..., TIC], P[..., WD], P[..., INS], P[..., FIXED])
+    pb = payback_inflacion(g, P[..., INV], inf)
+    with np.errstate(invalid="ignore"):
+        imp = np.abs(pb[:, 1] - pb[:, 0])
+    imp = np.where(np.isnan(imp), np.inf, imp)             # inf - inf: ambos no rentables
+    orden = np.lexsort((-np.abs(g[:, 1] - g[:, 0]), -imp))
+    return Tornado(
+        grupo=np.array([r[0] for r in rows])[orden], nombre=np.array([r[1] for r in rows])[orden],
+        base=valor[orden], bajo=valor[orden] * (1 - delta), alto=valor[orden] * (1 + delta),
+        ganancia_bajo=g[orden, 0], ganancia_alto=g[orden, 1],
+        payback_bajo=pb[orden, 0], payback_alto=pb[orden, 1], impacto=imp[orden],
+    )
+
+
+# ── Curvas por versión del dataset ──────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Analysis:
+    """Curvas de equilibrio y payback objetivo sobre el eje de tickets."""
+    version:    str
+    wd:         int
+    ins_pct:    float
+    fixed:      float
+    inv:        float
+    tickets:    np.ndarray
+    objetivos:  tuple
+    equilibrio: np.ndarray   # (T,)     clientes/día con ganancia 0
+    payback:    np.ndarray   # (K, T)   clientes/día para payback en objetivos[k] meses
+
+    def clientes(self, tic, meses=None):
+        """Clientes/día de equilibrio (o para payback en `meses`) con ticket `tic`."""
+        i = int(np.searchsorted(self.tickets, tic))
+        if i < len(self.tickets) and self.tickets[i] == tic:
+            if meses is None:
+                return float(self.equilibrio[i])
+            if meses in self.objetivos:
+                return float(self.payback[self.objetivos.index(meses), i])
+        # fuera de la rejilla: se calcula en el momento
+        if meses is None:
+            return float(clientes_equilibrio(tic, self.wd, self.ins_pct, self.fixed))
+        return float(clientes_para_payback(tic, meses, self.wd, self.ins_pct,
+                                           self.fixed, self.inv))
+
+def analyze(m, tickets=TICKETS, objetivos=OBJETIVOS, inf=0.0) -> Analysis:
+    """Curvas de equilibrio y de payback objetivo para todo el eje de tickets."""
+    tickets = np.asarray(tickets)
+    return Analysis(
+        version=m.version, wd=m.wd, ins_pct=m.ins_pct, fixed=m.fixed, inv=m.inv,
+        tickets=tickets, objetivos=tuple(objetivos),
+        equilibrio=clientes_equilibrio(tickets, m.wd, m.ins_pct, m.fixed),
+        payback=clientes_para_payback(tickets[None, :], np.asarray(objetivos)[:, None],
+                                      m.wd, m.ins_pct, m.fixed, m.inv, inf),
+    )
+
+def cached_analysis(version=None) -> Analysis:
+    """`analyze` del dataset actual, una vez por versión (None si no hay dataset)."""
+    from cafe_model import dataset_version
+    version = version or dataset_version()
+    return _analysis(version) if version else None
+
+@lru_cache(maxsize=8)
+def _analysis(version):
+    from cafe_model import load_model
+    m = load_model(version)
+    return analyze(m) if m else None
@@ -0,0 +1,59 @@
+# cafe_store.py
+"""Almacén compartido y de sólo lectura para todas las sesiones del tablero.
+
+Una instancia por versión del dataset (la guarda `st.cache_resource`, que no
+copia): modelo, rejilla de escenarios y curvas de sensibilidad, con todos sus
+arrays marcados `writeable=False`. Las sesiones guardan sólo la vista y los
+valores de los widgets; ningún rerun copia ni puede mutar estos datos.
+
+Cada derivado declara en `DEPENDS` las hojas que usa: al recargar el dataset
+(`cafe_registry`) se reutilizan los que no dependen de ninguna hoja cambiada.
+
+Memoria por sesión:  python bench/session_memory.py
+"""
+from dataclasses import dataclass, fields, is_dataclass, replace
+import numpy as np
+
+from cafe_engine import ScenarioGrid, build_grid
+from cafe_model import CafeModel, dataset_version, load_model
+from cafe_sensitivity import Analysis, analyze
+
+# Hojas de las que depende cada derivado (WD/INS_PCT, FIXED e INV)
+DEPENDS = {
+    "grid":     ("initial_costs", "monthly_costs", "assumptions"),
+    "analysis": ("initial_costs", "monthly_costs", "assumptions"),
+}
+
+
+@dataclass(frozen=True)
+class Store:
+    version:  str
+    model:    CafeModel
+    grid:     ScenarioGrid
+    analysis: Analysis
+
+
+def freeze(obj):
+    """Marca de sólo lectura los arrays de un dataclass (recursivo); devuelve `obj`."""
+    if isinstance(obj, np.ndarray):
+        obj.setflags(write=False)
+    elif is_dataclass(obj):
+        for f in fields(obj):
+            freeze(getattr(obj, f.name))
+    return obj
+
+def build_store(version=None, src=None):
+    """Arma el Store de una versión del dataset (None si no hay dataset)."""
+    version = version or dataset_version(src)
+    m = load_model(version, src) if version else None
+    return store_from_model(m) if m is not None else None
+
+def store_from_model(m: CafeModel, prev: Store = None, changed=None):
+    """Store de un modelo; de `prev` se reutilizan los derivados cuyas hojas
+    (`DEPENDS`) no están en `changed` (None: todas cambiaron)."""
+    def vigente(name):
+        return prev is not None and changed is not None and not set(DEPENDS[name]) & set(changed)
+    grid = prev.grid if vigente("grid") else build_grid(m.wd, m.ins_pct, m.fixed, m.inv)
+    analysis = (replace(prev.analysis, version=m.version) if vigente("analysis")
+                else analyze(m))
+    return freeze(Store(version=m.version, model=m, grid=grid, analysis=analysis))
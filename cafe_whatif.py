@@ -0,0 +1,242 @@
+# cafe_whatif.py
+"""What-if en lote, sin Streamlit: miles de escenarios del modelo del café por corrida.
+
+Cada fila de la entrada (CSV o Parquet) es un escenario. Columnas reconocidas,
+todas opcionales (si faltan o vienen vacías se usa el dataset del tablero):
+
+    cli       clientes por día             (default: escenario Moderado)
+    tic       ticket promedio (ARS)        (default: escenario Moderado)
+    inf       inflación anual (%)          (default: 0)
+    wd        días hábiles por mes         ins_pct   insumos / ventas
+    fixed     costos fijos mensuales       inv       inversión inicial
+
+El resto de las columnas (un id, etiquetas) pasa tal cual a la salida. Se
+agregan ventas, insumos, ganancia, payback (sin y con inflación), clientes de
+equilibrio y el flujo acumulado al final del horizonte, con las mismas
+fórmulas que el tablero (`cafe_engine`). La entrada se lee por bloques, cada
+bloque se evalúa vectorizado en un pool de procesos (a lo sumo
+2 × workers bloques en vuelo) y la salida se escribe en orden, bloque a bloque.
+
+    python cafe_whatif.py escenarios.csv -o resultados.parquet [--meses 24] [--workers 4]
+    python cafe_whatif.py --synthetic 1000000 -o /dev/null     # throughput
+
+Parquet (entrada o salida) requiere `pyarrow`.
+"""
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse, os, sys, time
+from pathlib import Path
+import numpy as np, pandas as pd
+
+from cafe_engine import (HORIZONTE, clientes_equilibrio, flujo_final, kpis, payback,
+                         payback_inflacion)
+
+CHUNKSIZE = 50_000
+PARAMS    = ("cli", "tic", "inf", "wd", "ins_pct", "fixed", "inv")
+Defaults  = namedtuple("Defaults", PARAMS)
+
+
+def defaults(model) -> Defaults:
+    """Valores del dataset para las columnas que no vengan en la entrada."""
+    b = model.base
+    return Defaults(float(b.clients_per_day), float(b.ticket_ars), 0.0,
+                    float(model.wd), float(model.ins_pct), float(model.fixed), float(model.inv))
+
+
+# ── Evaluación ──────────────────────────────────────────────────────────────
+
+def _columna(df, name, default):
+    if name not in df:
+        return default
+    try:
+        v = pd.to_numeric(df[name], errors="raise").to_numpy(dtype=float)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Columna {name!r} con valores no numéricos: {e}") from None
+    return np.where(np.isnan(v), default, v)
+
+def evaluate(df, d: Defaults, meses=HORIZONTE) -> pd.DataFrame:
+    """KPI de cada fila de `df` (un bloque); devuelve las columnas originales + resultados."""
+    p = Defaults(*(_columna(df, k, getattr(d, k)) for k in PARAMS))
+    ventas, insumos, ganancia = kpis(p.cli, p.tic, p.wd, p.ins_pct, p.fixed)
+    n = len(df)
+    out = {
+        "ventas":      ventas,
+        "insumos":     insumos,
+        "ganancia":    ganancia,
+        "payback":     payback(ganancia, p.inv),
+        "payback_inf": payback_inflacion(ganancia, p.inv, p.inf),
+        "equilibrio":  clientes_equilibrio(p.tic, p.wd, p.ins_pct, p.fixed),
+        f"flujo_{meses}m": flujo_final(ganancia, p.inv, p.inf, meses),
+    }
+    return df.reset_index(drop=True).assign(
+        **{k: np.broadcast_to(v, (n,)) for k, v in out.items()})
+
+def whatif(df, model=None, meses=HORIZONTE) -> pd.DataFrame:
+    """Evalúa un DataFrame en memoria (notebooks, tests manuales)."""
+    return evaluate(df, defaults(model or _model()), meses)
+
+def _model(src=None):
+    from cafe_model import load_model
+    m = load_model(src=src)
+    if m is None:
+        raise FileNotFoundError("No se encontró el dataset del café (CSV o Excel)")
+    return m
+
+def _task(args):
+    df, d, meses = args
+    return evaluate(df, d, meses)
+
+
+# ── Entrada / salida por bloques ────────────────────────────────────────────
+
+def _parquet():
+    try:
+        import pyarrow, pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet requiere pyarrow (pip install pyarrow)") from None
+    return pyarrow, pq
+
+def read_chunks(src, chunksize=CHUNKSIZE):
+    """Bloques de escenarios de un CSV o Parquet, sin cargar el archivo entero."""
+    if Path(str(src)).suffix == ".parquet":
+        _, pq = _parquet()
+        for batch in pq.ParquetFile(src).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(src, chunksize=chunksize)
+
+class Writer:
+    """Escribe bloques en CSV, Parquet o stdout ("-"), en el orden en que llegan.
+
+    En Parquet el esquema se fija una vez con el primer bloque y todos se
+    castean a él: los parámetros (`PARAMS`) y los KPI van como float64 aunque un
+    bloque los traiga enteros o vacíos; del resto, enteros → int64 (NaN → null),
+    decimales → float64 y cualquier otra cosa (o una columna vacía en el primer
+    bloque, que no dice nada del tipo) → string.
+    """
+
+    def __init__(self, dest):
+        self.dest, self._pq, self._f, self._schema = str(dest), None, None, None
+        self.parquet = self.dest.endswith(".parquet")
+
+    def _schema_for(self, df):
+        pa, _ = _parquet()
+        def tipo(name, s):
+            if name in PARAMS:
+                return pa.float64()
+            if s.isna().all():
+                return pa.string()
+            if pd.api.types.is_float_dtype(s):
+                return pa.float64()
+            if pd.api.types.is_bool_dtype(s):
+                return pa.bool_()
+            if pd.api.types.is_integer_dtype(s):
+                return pa.int64()
+            return pa.string()
+        return pa.schema([(str(c), tipo(c, s)) for c, s in df.items()])
+
+    def write(self, df):
+        if self.parquet:
+            pa, pq = _parquet()
+            if self._pq is None:
+                self._schema = self._schema_for(df)
+                self._pq = pq.ParquetWriter(self.dest, self._schema)
+            try:
+                t = pa.Table.from_pandas(df, preserve_index=False).cast(self._schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+                raise ValueError(f"Un bloque no coincide con el esquema de la salida: {e}") from None
+            self._pq.write_table(t)
+        else:
+            first = self._f is None
+            if first:
+                self._f = sys.stdout if self.dest == "-" else open(self.dest, "w", newline="")
+            df.to_csv(self._f, header=first, index=False)
+
+    def close(self):
+        if self._pq is not None:
+            self._pq.close()
+        if self._f not in (None, sys.stdout):
+            self._f.close()
+
+def _imap(fn, items, workers):
+    """map ordenado con a lo sumo 2 × workers tareas en vuelo (workers=0: en proceso)."""
+    if not workers:
+        yield from map(fn, items)
+        return
+    with ProcessPoolExecutor(workers) as ex:
+        pending = deque()
+        for x in items:
+            pending.append(ex.submit(fn, x))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def run(chunks, dest, model=None, meses=HORIZONTE, workers=None, progress=None) -> dict:
+    """Evalúa un iterable de bloques y los escribe en `dest`; devuelve estadísticas.
+
+    `workers=None` usa un proceso por CPU (0: todo en este proceso).
+    `progress(filas, segundos)` se llama después de cada bloque escrito.
+    """
+    d = defaults(model or _model())
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    w, filas, bloques = Writer(dest), 0, 0
+    t0 = time.perf_counter()
+    try:
+        for res in _imap(_task, ((df, d, meses) for df in chunks), workers):
+            w.write(res)
+            filas += len(res); bloques += 1
+            if progress:
+                progress(filas, time.perf_counter() - t0)
+        if not bloques:  # entrada vacía: salida con las columnas de resultado y sin filas
+            w.write(evaluate(pd.DataFrame(), d, meses))
+    finally:
+        w.close()
+    dt = time.perf_counter() - t0
+    return {"escenarios": filas, "bloques": bloques, "workers": workers, "segundos": round(dt, 3),
+            "escenarios_por_s": round(filas / dt, 1) if dt else float("inf")}
+
+def synthetic(n, chunksize=CHUNKSIZE, seed=0):
+    """Bloques de escenarios aleatorios alrededor de los rangos del sidebar (benchmarks)."""
+    rng = np.random.default_rng(seed)
+    for i in range(0, n, chunksize):
+        k = min(chunksize, n - i)
+        yield pd.DataFrame({"id": np.arange(i, i + k),
+                            "cli": rng.integers(30, 201, k), "tic": rng.integers(30, 81, k) * 100,
+                            "inf": rng.uniform(0, 200, k).round(1)})
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("entrada", nargs="?", help="CSV o Parquet de escenarios")
+    ap.add_argument("-o", "--output", default="-", help="CSV, Parquet o - (stdout)")
+    ap.add_argument("--dataset", help="dataset del café (default: el del tablero)")
+    ap.add_argument("--meses", type=int, default=HORIZONTE)
+    ap.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    ap.add_argument("--workers", type=int, help="procesos (default: uno por CPU; 0 = sin pool)")
+    ap.add_argument("--synthetic", type=int, metavar="N", help="N escenarios aleatorios en vez de entrada")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    a = ap.parse_args(argv)
+    if (a.entrada is None) == (a.synthetic is None):
+        ap.error("indicá un archivo de entrada o --synthetic N")
+    if a.synthetic is not None and a.synthetic < 0:
+        ap.error("--synthetic N requiere N >= 0")
+    chunks = (synthetic(a.synthetic, a.chunksize) if a.synthetic is not None
+              else read_chunks(a.entrada, a.chunksize))
+
+    def progress(filas, dt):
+        print(f"\r{filas:,} escenarios  {filas / dt:,.0f}/s", end="", file=sys.stderr)
+    try:
+        s = run(chunks, a.output, _model(a.dataset), a.meses, a.workers,
+                None if a.quiet else progress)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"\nerror: {e}", file=sys.stderr)
+        return 1
+    print(f"\r{s['escenarios']:,} escenarios en {s['segundos']:.2f} s "
+          f"({s['escenarios_por_s']:,.0f} escenarios/s, {s['bloques']} bloques, "
+          f"{s['workers']} workers)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,30 @@
 import streamlit as st, pandas as pd, numpy as np
-from pathlib import Path
-import matplotlib.pyplot as plt
-import smtplib
 from email.message import EmailMessage
+from cafe_assets import inline_svg, static_url, stylesheet
+from cafe_charts import (PROJECTION_SPEC, TORNADO_SPEC, projection_data, projection_grid_spec,
+                         projection_spec, publish_grid, render_projection, series_data,
+                         tornado_data)
+from cafe_montecarlo import params_from_model, simulate
+from cafe_portfolio import load_portfolio, portfolio_version, ranking, resumen
+from cafe_profiling import REGISTRY, begin, enabled
+from cafe_registry import POLL_S, DatasetRegistry
+from cafe_projection import ProjectionPool
+from cafe_sensitivity import tornado
+from cafe_store import freeze
+from contact_mailer import MailDispatcher, QueueFull
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 import streamlit as st
 
+# Instrumentación opcional por etapa (CIVIC_TWIN_PROFILE o ?profile=1, ver cafe_profiling.py)
+prof = begin(st.session_state.get("view", "home"), st.query_params)
+prof.stage("config")
+
+def stop():
+    """`st.stop()` cerrando antes la medición del rerun (después ya no corre nada)."""
+    prof.end()
+    st.stop()
+
 # ─── Set page config ─────────────────────────────────────────────────
 st.set_page_config(
     page_title="Cafetería en Quilmes | Civic Twin™",
@@ -18,45 +37,24 @@ st.set_page_config(
     }
 )
 
-# ─── Oculta el menú (hamburguesa) y el footer ─────────────────────────
-st.markdown(
-    """
-    <style>
-      /* Oculta el menú principal (incluye 'View source') */
-      #MainMenu {visibility: hidden;}
-      /* Oculta el footer de Streamlit */
-      footer {visibility: hidden;}
-      /* Opcional: oculta el header que aparece al mover el ratón arriba */
-      header {visibility: hidden;}
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-# … el resto de tu app …
+@st.cache_resource
+def mail_dispatcher():
+    """Worker de envío compartido por todas las sesiones del proceso."""
+    return MailDispatcher(st.secrets["smtp"]).start()
 
-
-def send_contact_email(nombre: str, email: str, mensaje: str):
-    """Envía un email con los datos del formulario."""
+def send_contact_email(nombre: str, email: str, mensaje: str) -> str:
+    """Encola un email con los datos del formulario; devuelve el id de seguimiento."""
     msg = EmailMessage()
     msg["Subject"] = f"[Civic Twin™] Nuevo mensaje de {nombre}"
     msg["From"]    = st.secrets["smtp"]["username"]
     msg["To"]      = st.secrets["smtp"]["to_email"]
     msg.set_content(f"De: {nombre} <{email}>\n\nMensaje:\n{mensaje}")
-
-    with smtplib.SMTP_SSL(
-        st.secrets["smtp"]["server"],
-        st.secrets["smtp"]["port"]
-    ) as smtp:
-        smtp.login(
-            st.secrets["smtp"]["username"],
-            st.secrets["smtp"]["password"]
-        )
-        smtp.send_message(msg)
+    return mail_dispatcher().submit(msg)
 
 
 # ─── helpers de navegación ──────────────────────────────
 def go_home():
+    st.query_params.pop("diag", None)
     st.session_state.view = "home"
 
 def go_dashboard():
@@ -65,201 +63,45 @@ def go_dashboard():
 def go_contact():
     st.session_state.view = "contact"
 
+def go_portfolio():
+    st.session_state.view = "portfolio"
+
+
+# ─── dataset compartido con recarga en caliente ─────────────────
+@st.cache_resource
+def dataset():
+    """Un registro por proceso: Store vigente + hilo que vigila la fuente."""
+    return DatasetRegistry().start()
+
+@st.fragment(run_every=POLL_S)
+def dataset_watch(version):
+    """Si el dataset cambió desde el último rerun de la sesión, la recarga entera."""
+    if dataset().version != version:
+        st.rerun()
+
 
 st.set_page_config(page_title="Cafetería en Quilmes | Civic Twin™", layout="wide")
 
 # Inicializar la vista por defecto
 if "view" not in st.session_state:
     st.session_state.view = "home"
+# Vista oculta de diagnóstico (sólo con la instrumentación activa)
+if st.query_params.get("diag") == "1" and enabled(st.query_params):
+    st.session_state.view = "diagnostics"
 
 
-GLOBAL_CSS = """
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;700&display=swap');
-
-/* Variables */
-:root {
-  --primary: #1F4E79;
-  --white: #FFFFFF;
-  --hero-overlay: rgba(31, 78, 121, 0.6);
-  --gap: 24px;
-}
-
-/* Body con textura ligera */
-body {
-  background: #f7f7f7 url("https://www.toptal.com/designers/subtlepatterns/grey_wash_wall.png") repeat;
-}
-
-/* Hero a pantalla completa */
-.hero {
-  position: relative;
-  width: 100%;
-  height: 35vh;
-  background: url("https://images.unsplash.com/photo-1522202195467-52c5a0bfb57c?auto=format&fit=crop&w=1500&q=80") center/cover no-repeat;
-  display: flex;
-  align-items: center;
-  justify-content: center;
-  color: var(--white);
-  text-align: center;
-  font-family: 'Montserrat', sans-serif;
-}
-.hero::before {
-  content: "";
-  position: absolute;
-  top: 0; left: 0; right:0; bottom:0;
-  background: var(--hero-overlay);
-}
-.hero-content {
-  position: relative;
-  z-index: 1;
-  max-width: 800px;
-  padding: 0 var(--gap);
-}
-.hero-content h1 {
-  font-size: 3.5rem;
-  margin-bottom: 0.5rem;
-  font-weight: 700;
-}
-.hero-content p {
-  font-size: 1.25rem;
-  font-weight: 300;
-  margin-bottom: var(--gap);
-  line-height: 1.4;
-}
-
-/* Feature cards */
-.features {
-  display: flex;
-  justify-content: center;
-  gap: var(--gap);
-  margin: var(--gap) 0 2rem;
-  flex-wrap: wrap;
-}
-.feature-card {
-  background: var(--white);
-  border-radius: 8px;
-  box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-  padding: 1.5rem;
-  max-width: 240px;
-  text-align: center;
-  font-family: 'Montserrat', sans-serif;
-}
-.feature-card svg {
-  width: 40px;
-  height: 40px;
-  margin-bottom: 0.75rem;
-  fill: var(--primary);
-}
-.feature-card h3 {
-  margin: 0.5rem 0;
-  font-size: 1.125rem;
-  font-weight: 600;
-}
-.feature-card p {
-  font-size: 0.9rem;
-  color: #555;
-  font-weight: 300;
-  line-height: 1.3;
-}
-</style>
-"""
-st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
-
-st.markdown(
-    """
-    <style>
-      /* Fuerza el overlay de azul en la portada */
-      .hero::before {
-        background: rgba(31, 78, 121, 0.6) !important;
-      }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
- 
-# ────── SVG del logo (dos “círculos abiertos”)
-SVG_LOGO = """
-<svg width="32" height="32" viewBox="0 0 64 64" fill="none"
-     xmlns="http://www.w3.org/2000/svg"
-     style="vertical-align:middle;margin-right:8px">
-  <circle cx="24" cy="32" r="18" stroke="white" stroke-width="6" fill="none"/>
-  <circle cx="40" cy="32" r="18" stroke="white" stroke-width="6" fill="none"/>
-</svg>
-"""
-
-# ────── CSS global
-HEADER_CSS = """
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@400;700&display=swap');
-
-:root{
-  --topbar-h: 42px;   /* barra de íconos de Streamlit Cloud */
-  --header-h: 70px;
-  --sidebar-w: 300px;
-  --azul: #1F4E79;
-}
-
-/* HEADER full-width, debajo de topbar */
-.header-bar{
-  position:fixed; top:var(--topbar-h); left:0; width:100%; height:var(--header-h);
-  background:linear-gradient(90deg,#14406b 0%,var(--azul) 100%);
-  display:flex; align-items:center; justify-content:center;
-  z-index:100; padding:0 16px;
-}
-
-/* Secciones internas */
-.header-left{
-  position:absolute; left:0; width:var(--sidebar-w);
-  display:flex; align-items:center; justify-content:center;
-}
-.header-center{ font:700 30px 'Montserrat',sans-serif; color:#fff; }
-.header-flag{
-  position:absolute; right:16px; height:32px; border-radius:3px;
-}
-
-/* Empujar contenido para que no quede oculto */
-section[data-testid="stSidebar"]{ margin-top:calc(var(--topbar-h) + var(--header-h)); }
-div.block-container{ margin-top:calc(var(--topbar-h) + var(--header-h) + 4px); }
-
-/* KPI cards */
-.stMetric>div{border:2px solid var(--azul)!important; border-radius:10px;
-              background:#fff; box-shadow:0 2px 6px #0003; padding:8px 8px}
-
-/* Sliders -> azul */
-input[type=range]::-webkit-slider-runnable-track{background:var(--azul)33}
-input[type=range]::-webkit-slider-thumb{background:var(--azul); border:none}
-input[type=range]::-moz-range-track{background:var(--azul)33}
-input[type=range]::-moz-range-thumb{background:var(--azul); border:none}
-
-/* Sidebar gris azulado */
-section[data-testid=stSidebar]{ background:#eaf0f7; }
-/* Centrar imagen del gráfico */
-  .block-container img:not(.header-flag){ display:block; margin:0 auto; }
-</style>
-"""
-st.markdown("""
-<style>
-/* oculta cualquier delta (None) que se pueda colar */
-div[data-testid="stMetricDelta"]{display:none!important;}
-</style>
-""", unsafe_allow_html=True)
-
-FLAG_AR = "https://flagcdn.com/w40/ar.png"
-
-SVG_LOGO = """
-<svg width="32" height="32" viewBox="0 0 64 64" fill="none"
-     xmlns="http://www.w3.org/2000/svg"
-     style="vertical-align:middle;margin-right:8px">
-  <circle cx="24" cy="32" r="18" stroke="white" stroke-width="6" fill="none"/>
-  <circle cx="40" cy="32" r="18" stroke="white" stroke-width="6" fill="none"/>
-</svg>
-"""
+# ─── Estilos: CSS minificado por vista, inline y cacheado (ver cafe_assets.py) ───
+prof.stage("css")
+st.markdown(stylesheet(st.session_state.view), unsafe_allow_html=True)
+
+# ────── Header azul (logo SVG inline; bandera PNG desde static/img)
+LOGO    = inline_svg("img/logo.svg", "header-logo")
+FLAG_AR = static_url("img/flag-ar.png")
 
 header_html = (
-    HEADER_CSS +
     "<div class='header-bar'>"
       "<div class='header-left'>"
-        f"{SVG_LOGO}<span style='font:600 20px Montserrat,sans-serif;color:#d0e1ff'>Civic Twin™</span>"
+        f"{LOGO}<span class='header-brand'>Civic Twin™</span>"
       "</div>"
       "<span class='header-center'>Cafetería en Quilmes</span>"
       f"<img src='{FLAG_AR}' class='header-flag'>"
@@ -271,79 +113,9 @@ header_html = (
 if "view" not in st.session_state:
     st.session_state.view = "home"
 
-# Vista HOME
-# ─── CSS para quitar scroll en Home ───────────────────────
-if st.session_state.view == "home":
-    st.markdown(
-        """
-        <style>
-        html, body, [data-testid="stAppViewContainer"] {
-          height: 100vh !important;
-          overflow-y: hidden !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-       
-
- # ─── Empuja el contenido 50px hacia arriba ─────────────
-    st.markdown(
-        """
-        <style>
-        /* Reduce el margin-top para que la hero suba y desaparezca el scroll */
-        div.block-container, section[data-testid="stAppViewContainer"] {
-            margin-top: -100px !important;
-            padding-top: 0 !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-# ── Override para feature‐cards más anchas y bajas ──
-    st.markdown(
-        """
-        <style>
-        /* Ensancha las cards */
-        .feature-card {
-          max-width: 300px !important;   /* antes 240px */
-          padding: 1rem 0.75rem !important; /* antes 1.5rem todo */
-          margin: 0.5rem !important;     /* menos espacio vertical */
-        }
-        /* Texto más compacto */
-        .feature-card h3 {
-          font-size: 1rem !important;    /* antes 1.125rem */
-        }
-        .feature-card p {
-          font-size: 0.85rem !important; /* antes 0.9rem */
-          line-height: 1.2 !important;
-        }
-        /* Reduce gap entre cards */
-        .features {
-          gap: 16px !important;          /* antes var(--gap) */
-          margin-bottom: 0.5rem !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
 # ─── VISTA HOME ───────────────────────────────
 if st.session_state.view == "home":
-    # Inyectamos el CSS para overflow:hidden (aunque ya está en GLOBAL_CSS)
-    st.markdown(
-        """
-        <style>
-        html, body, [data-testid="stAppViewContainer"] {
-          overflow: hidden !important;
-          height: 100vh !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
+    prof.stage("home")
     # Hero reducido
     st.markdown(
         """
@@ -391,17 +163,11 @@ if st.session_state.view == "home":
     with c2:
         st.button("▶ Demo", use_container_width=True, on_click=go_dashboard)
         st.write("")
+        if portfolio_version():
+            st.button("🏪 Cadena", use_container_width=True, on_click=go_portfolio)
+            st.write("")
         st.button("✉️ Contacto", use_container_width=True, on_click=go_contact)
-    st.stop()
-
-    # CTA final: Demo y Contacto centrados
-    st.write("")
-    c1, c2, c3 = st.columns([1, 2, 1])
-    with c2:
-        st.button("▶ Demo", use_container_width=True, on_click=go_dashboard)
-        st.write("")
-        st.button("✉️ Contacto", use_container_width=True, on_click=go_contact)
-    st.stop()
+    stop()
 
 
 # ————————————————————————————————————————————————
@@ -415,64 +181,61 @@ if st.session_state.view == "dashboard":
     # — Header azul —
     st.markdown(header_html, unsafe_allow_html=True)
 
-     # ────── AJUSTE DE MÁRGENES & OCULTAR RAYA ─────────────
-    st.markdown(
-        """
-        <style>
-         /* Eleva todo el contenido principal 40px hacia arriba */
-        div.block-container {
-            margin-top: calc(var(--topbar-h) + var(--header-h) - 80px) !important;
-            padding-top: 0 !important;
-        }
-        /* Mueve TODO el contenido justo bajo el banner azul (sin gap) */
-        div.block-container,
-        section[data-testid="stSidebar"] {
-            margin-top: calc(var(--topbar-h) + var(--header-h) + 0px) !important;
-            padding-top: 0 !important;
-        }
-        /* Oculta cualquier línea <hr> (divider) que aparezca */
-        hr, div[data-testid="stDivider"] { display: none !important; }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
     # ────── DATOS ───────────────────────────────────────
-    BASE = Path(__file__).parent
-    CSV, XLSX = BASE/'CivicTwin_Cafe_Quilmes_Data.csv', BASE/'CivicTwin_Cafe_Quilmes_Data.xlsx'
-    @st.cache_data
-    def load():
-        if CSV.exists():  return {"tidy": pd.read_csv(CSV)}
-        if XLSX.exists(): return pd.read_excel(XLSX, sheet_name=None)
-        st.error("Dataset no encontrado"); return {}
-    d = load()
-    if not d:
-        st.stop()
-    if "tidy" in d:
-        t = d["tidy"]
-        init, month  = t[t.dataset=="initial_costs"], t[t.dataset=="monthly_costs"]
-        sales, ass   = t[t.dataset=="sales_scenarios"], t[t.dataset=="assumptions"]
-    else:
-        init, month, sales, ass = d["initial_costs"], d["monthly_costs"], d["sales_scenarios"], d["assumptions"]
-    ASS      = dict(zip(ass.variable, ass.value))
-    WD       = int(ASS.get("working_days_per_month", 26))
-    INS_PCT  = float(ASS.get("insumos_percent_of_sales", 0.30))
-    INV      = init.cost_ars.sum()
-    FIXED    = month.cost_ars.sum()
+    prof.stage("data")
+    # Un solo almacén de sólo lectura por versión del dataset, compartido por
+    # todas las sesiones sin copias: modelo, rejilla de escenarios (cada rerun
+    # sólo indexa en ella) y curvas de sensibilidad (ver cafe_store.py).
+    # En la sesión quedan sólo la vista y los valores de los widgets.
+    # El registro lo recarga en segundo plano cuando cambia la fuente (ver
+    # cafe_registry.py); cada rerun toma el Store vigente una sola vez.
+    data = dataset().current
+    if data is None:
+        st.error("Dataset no encontrado")
+        stop()
+    m, grid = data.model, data.grid
+    visto = st.session_state.get("dataset_version")
+    if visto is not None and visto != data.version:
+        st.toast("📄 Se actualizó el dataset: el tablero ya usa los datos nuevos")
+    st.session_state["dataset_version"] = data.version
+    dataset_watch(data.version)
 
     # ────── SIDEBAR controles ────────────────────────────
+    prof.stage("sidebar")
     st.sidebar.header("Escenario")
     cli = st.sidebar.slider("Clientes por día", 30, 200,
-          int(sales.loc[sales.scenario=="Moderado","clients_per_day"]), 5)
+          m.base.clients_per_day, 5, key="cli")
     tic = st.sidebar.slider("Ticket promedio (ARS)", 3000, 8000,
-          int(sales.loc[sales.scenario=="Moderado","ticket_ars"]), 100)
-    inf = st.sidebar.number_input("Inflación anual (%)", 0.0, 200.0, 0.0, 1.0)
+          m.base.ticket_ars, 100, key="tic")
+    inf = st.sidebar.number_input("Inflación anual (%)", 0.0, 200.0, 0.0, 1.0, key="inf")
+    modo = st.sidebar.radio("Gráfico", ["Imagen", "Interactivo"], horizontal=True, key="modo")
+    mc  = st.sidebar.checkbox("Simulación de riesgo (Monte Carlo)", key="mc")
+    if mc:
+        n_paths = st.sidebar.select_slider("Caminos simulados", [1_000, 10_000, 100_000], 10_000,
+                                           key="n_paths")
+        mes_pb  = st.sidebar.slider("Payback a más tardar en el mes", 1, 24, 12, key="mes_pb")
+    adv = st.sidebar.checkbox("Proyección avanzada (horizonte y curvas)", key="adv")
+    if adv:
+        horizonte = st.sidebar.select_slider("Horizonte (meses)", [12, 24, 36, 60, 120, 240], 24,
+                                             key="horizonte")
+        paso = st.sidebar.radio("Paso", ["Mensual", "Diario"], horizontal=True, key="paso")
+        # vacío = usa la inflación anual general
+        inf_tic = st.sidebar.number_input("Indexación del ticket (%)", 0.0, 500.0, None, 1.0,
+                                          key="inf_tic")
+        inf_ins = st.sidebar.number_input("Inflación de insumos (%)", 0.0, 500.0, None, 1.0,
+                                          key="inf_ins")
+        with st.sidebar.expander("Costos mensuales e inflación por línea"):
+            lineas = st.data_editor(
+                pd.DataFrame({"Línea": list(m.monthly_costs),
+                              "Costo (ARS)": list(m.monthly_costs.values()),
+                              "Inflación (%)": [None] * len(m.monthly_costs)}),
+                disabled=["Línea"], hide_index=True, key="lineas",
+                column_config={"Inflación (%)": st.column_config.NumberColumn(min_value=0.0)})
 
     # ────── KPI ───────────────────────────────────────────
-    ventas   = cli * tic * WD
-    insumos  = ventas * INS_PCT
-    ganancia = ventas - (insumos + FIXED)
-    payback  = "∞" if ganancia <= 0 else INV / ganancia
+    prof.stage("kpi")
+    ventas, insumos, ganancia, payback = grid.kpis(cli, tic)
+    payback  = "∞" if ganancia <= 0 else payback
     NBSP = "\u00A0"
     c1, c2, c3 = st.columns(3)
     c1.metric("Ventas mensuales", f"${ventas:,.0f}", delta=NBSP)
@@ -482,30 +245,132 @@ if st.session_state.view == "dashboard":
               delta=NBSP)
 
     # ────── Gráfico flujo acumulado ───────────────────────
-    mes   = np.arange(1,25)
-    serie = ganancia * (1 + inf/100) ** (mes / 12)
-    flujo = np.cumsum(serie) - INV
-    fig, ax = plt.subplots(figsize=(11,2.3))
-    ax.plot(mes, flujo, color="#1F4E79", lw=2)
-    ax.axhline(0, color="#888", lw=.8, ls="--")
-    ax.set_xlabel("Mes"); ax.set_ylabel("Flujo acumulado (ARS)")
-    ax.set_title("Proyección 24 meses", color="#14406b", weight="bold")
-    st.pyplot(fig, use_container_width=False)
+    # (render sin pyplot y memoizado por escenario, ver cafe_charts.py)
+    band = None
+    if mc and not adv:  # las bandas de riesgo son a 24 meses con inflación única
+        prof.stage("montecarlo")
+        @st.cache_resource(max_entries=32)
+        def risk(p, fixed, inv, n):
+            return freeze(simulate(p, fixed, inv, n_paths=n, chunk=10_000, seed=0))
+        r = risk(params_from_model(m, cli, tic, inf), m.fixed, m.inv, n_paths)
+        band = (r.p10, r.p50, r.p90)
+    if adv:  # componentes por curva, recalculando sólo lo que cambió desde el rerun anterior
+        prof.stage("projection")
+        @st.cache_resource
+        def projection_pool():
+            return ProjectionPool()
+        ctx = get_script_run_ctx()
+        proj = projection_pool().get(ctx.session_id if ctx else None, horizonte,
+                                     "D" if paso == "Diario" else "M")
+        curvas = {"general": inf}
+        if inf_tic is not None: curvas["ticket"] = inf_tic
+        if inf_ins is not None: curvas["insumos"] = inf_ins
+        curvas.update({r["Línea"]: r["Inflación (%)"] for _, r in lineas.iterrows()
+                       if pd.notna(r["Inflación (%)"])})
+        # celdas vacías o no numéricas del editor cuentan como 0 (no NaN)
+        costos = dict(zip(lineas["Línea"],
+                          pd.to_numeric(lineas["Costo (ARS)"], errors="coerce").fillna(0)))
+        proj.update(cli, tic, m.wd, m.ins_pct, m.inv, costos, curvas)
+        prof.stage("chart:data")
+        spec_data = series_data(proj.mes, proj.flujo)
+        prof.stage("chart:send")
+        st.vega_lite_chart(spec_data, projection_spec(horizonte), use_container_width=True)
+        pb = proj.payback()
+        st.caption("Pay-back con curvas: " +
+                   (f"{pb:.1f} meses" if np.isfinite(pb) else f"no se alcanza en {horizonte} meses"))
+    elif modo == "Interactivo" and band is None:
+        # la rejilla se baja una vez por versión (static/grid/); los controles del
+        # gráfico redibujan en el navegador y cada rerun sólo cambia sus valores
+        prof.stage("chart:send")
+        st.vega_lite_chart(projection_grid_spec(grid, cli, tic, inf,
+                                                url=publish_grid(grid, data.version)),
+                           use_container_width=True)
+        st.caption("Los controles bajo el gráfico lo redibujan en el navegador, sin recargar; "
+                   "los de la barra lateral actualizan también los indicadores.")
+    elif modo == "Interactivo":  # con banda de riesgo: sólo viaja la serie
+        prof.stage("chart:data")
+        spec_data = projection_data(ganancia, inf, m.inv, band)
+        prof.stage("chart:send")
+        st.vega_lite_chart(spec_data, PROJECTION_SPEC, use_container_width=True)
+    else:
+        prof.stage("chart:render")
+        png = render_projection(ganancia, inf, m.inv, band)
+        prof.stage("chart:send")
+        st.image(png)
+    if mc and not adv:
+        st.caption(f"Banda P10–P90 y mediana de {r.n_paths:,} caminos · "
+                   f"Prob. de payback en ≤ {mes_pb} meses: {r.prob_payback_mes(mes_pb):.0%}")
+
+    # ────── Sensibilidad y equilibrio (forma cerrada, sin mover sliders) ─────
+    prof.stage("sensitivity")
+    with st.expander("Sensibilidad y equilibrio"):
+        sa = data.analysis
+        e1, e2 = st.columns(2)
+        e1.metric("Clientes/día de equilibrio", f"{sa.clientes(tic):.0f}")
+        e2.metric("Clientes/día para payback en 12 meses", f"{sa.clientes(tic, 12):.0f}")
+        st.vega_lite_chart(tornado_data(tornado(m, cli, tic, inf)), TORNADO_SPEC,
+                           use_container_width=True)
     st.caption("Datos fuente · Julio 2025 – Civic Twin™")
 
-    # oculta cualquier delta (None)
-    st.markdown(
-        """
-        <style>
-        [data-testid="stMetricDelta"] { display:none !important; }
-        </style>
-        """, unsafe_allow_html=True
-    )
+# ————————————————————————————————————————————————
+# VISTA CADENA (varios locales, ver cafe_portfolio.py)
+# ————————————————————————————————————————————————
+if st.session_state.view == "portfolio":
+    prof.stage("portfolio")
+    st.button("🏠 Inicio", on_click=go_home)
+    st.markdown(header_html, unsafe_allow_html=True)
+
+    # Columnas de todos los locales, una vez por versión del directorio
+    @st.cache_resource
+    def portfolio(version):
+        return load_portfolio()
+    pversion = portfolio_version()
+    pf = portfolio(pversion) if pversion else None
+    if pf is None:
+        st.error("No hay datasets de locales")
+        stop()
+
+    st.sidebar.header("Cadena")
+    f_cli = st.sidebar.slider("Clientes (% del escenario base)", 50, 150, 100, 5, key="pf_cli")
+    f_tic = st.sidebar.slider("Ticket (% del escenario base)", 50, 150, 100, 5, key="pf_tic")
+    inf   = st.sidebar.number_input("Inflación anual (%)", 0.0, 200.0, 0.0, 1.0, key="pf_inf")
+    orden = st.sidebar.selectbox("Ranking por", ["payback", "ganancia", "ventas"], key="pf_orden")
+    top   = st.sidebar.slider("Locales en el ranking", 5, 50, 20, 5, key="pf_top")
+
+    r = pf.evaluate(pf.cli * f_cli / 100, pf.tic * f_tic / 100, inf)
+    s = resumen(r)
+    NBSP = "\u00A0"
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Locales rentables", f"{s['rentables']:,} / {s['locales']:,}", delta=NBSP)
+    c2.metric("Ganancia mensual total", f"${s['ganancia']:,.0f}", delta=NBSP)
+    c3.metric("Pay-back consolidado (meses)",
+              "No rentable" if not np.isfinite(s["payback"]) else f"{s['payback']:.1f}",
+              delta=NBSP)
+    c4.metric("Pay-back P10 / P50 / P90",
+              f"{s['payback_p10']:.1f} / {s['payback_p50']:.1f} / {s['payback_p90']:.1f}",
+              delta=NBSP)
+    # el flujo consolidado es el de la ganancia e INV totales (misma inflación)
+    st.vega_lite_chart(projection_data(s["ganancia"], inf, s["inv"]),
+                       PROJECTION_SPEC, use_container_width=True)
+
+    idx = ranking(r, orden, top, desc=orden != "payback")
+    st.dataframe(pd.DataFrame({
+        "Local": pf.names[idx], "Ventas": r.ventas[idx].round(), "Ganancia": r.ganancia[idx].round(),
+        "Pay-back (meses)": r.payback[idx].round(1), "Inversión": pf.inv[idx].round(),
+    }), hide_index=True, use_container_width=True)
+
+    with st.expander("Detalle de un local"):
+        i = st.selectbox("Local", idx.tolist(), format_func=lambda i: pf.names[i], key="pf_local")
+        if i is not None and pf.paths[i]:
+            d = pf.detalle(i)   # se lee recién acá
+            st.write({k: v._asdict() for k, v in d.scenarios.items()})
+            st.bar_chart(pd.Series(dict(d.monthly_costs), name="Costo mensual (ARS)"))
 
 # ————————————————————————————————————————————————
 # VISTA CONTACTO
 # ————————————————————————————————————————————————
 if st.session_state.view == "contact":
+    prof.stage("contact")
     st.button("🏠 Inicio", on_click=go_home)
 
     st.title("📬 Contacto")
@@ -517,51 +382,37 @@ if st.session_state.view == "contact":
 
     if enviado:
         try:
-            send_contact_email(nombre, email, mensaje)
-            st.success("✅ Tu mensaje ha sido enviado, ¡gracias!")
+            mid = send_contact_email(nombre, email, mensaje)
+            st.success(f"✅ Tu mensaje fue recibido y se enviará en breve, ¡gracias! (ref. {mid})")
+        except QueueFull:
+            st.warning("📮 Hay muchos mensajes en cola: reintentá en unos minutos.")
         except Exception as e:
-            st.error(f"❌ No se pudo enviar el correo: {e}")
-
-
-# ─── BLOQUE CSS FINAL (se inyecta al final para que siempre gane) ───
-st.markdown("""
-<style>
-/* ① reducir margen bajo el header */
-div.block-container{
-    margin-top:calc(var(--topbar-h) + var(--header-h)) !important; /* ↓ 4 px → 0 px */
-    padding-top:0 !important;          /* quita padding interno extra */
-    height:calc(100vh - var(--topbar-h) - var(--header-h));
-    display:flex; flex-direction:column; overflow:hidden;
-}
-
-
-/* ② KPI más compactos — se conserva el borde azul de 2 px */
-div[data-testid="stMetric"]{
-    padding:4px 6px !important;        /* antes 12 px */
-}
-div[data-testid="stMetric"] > label div{
-    font-size:14px !important; line-height:16px !important;
-}
-div[data-testid="stMetric"] > div:nth-child(2) span{
-    font-size:19px !important; line-height:21px !important;
-}
-
-/* ③ limitar altura del gráfico a 220 px */
-.graph-row svg,
-.graph-row canvas{
-    max-height:220px !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-
-# Oculta por completo la etiqueta delta (texto y flecha) de TODAS las métricas
-st.markdown(
-    """
-    <style>
-    /* oculta la cajita delta (None) en cualquier tag */
-[data-testid="stMetricDelta"]{display:none !important;}
- </style>
-    """,
-    unsafe_allow_html=True
-)
+            st.error(f"❌ No se pudo enviar el correo: {e or type(e).__name__}")
+
+
+# ————————————————————————————————————————————————
+# VISTA DIAGNÓSTICO (oculta: ?profile=1&diag=1 o CIVIC_TWIN_PROFILE)
+# ————————————————————————————————————————————————
+if st.session_state.view == "diagnostics":
+    prof.stage("diagnostics")
+    st.button("🏠 Inicio", on_click=go_home)
+    st.title("⏱️ Tiempos por etapa del rerun")
+    resumen_etapas = REGISTRY.summary()
+    if resumen_etapas:
+        st.dataframe(pd.DataFrame(resumen_etapas).T[["count", "mean", "p50", "p90", "p99"]]
+                       .mul([1, 1e3, 1e3, 1e3, 1e3]).round(2)
+                       .rename(columns=lambda c: c if c == "count" else f"{c} (ms)"),
+                     use_container_width=True)
+        st.caption("Último rerun (ms)")
+        st.bar_chart(pd.Series(REGISTRY.last).mul(1e3).drop(
+            [k for k in REGISTRY.last if k.startswith("rerun:")]))
+    else:
+        st.info("Sin reruns medidos todavía: navegá el tablero con ?profile=1")
+    prom = REGISTRY.prometheus()
+    st.download_button("Métricas (Prometheus)", prom, "civic_twin.prom", "text/plain")
+    st.code(prom, language="text")
+    if REGISTRY.snapshots:
+        st.caption("Snapshots de reruns lentos")
+        st.write(list(REGISTRY.snapshots))
+
+prof.end()
@@ -0,0 +1,254 @@
+# contact_mailer.py
+"""Despachador de emails en segundo plano para el formulario de contacto.
+
+`submit()` escribe el mensaje en un spool en disco y devuelve un id de
+seguimiento sin tocar la red. Un hilo worker mantiene una conexión SMTP
+autenticada reutilizable, envía en lotes y reintenta con backoff exponencial.
+Los mensajes pendientes del spool se recuperan al reiniciar el proceso.
+
+Spool:  pending/ → inflight/ → (borrado al enviarse) | failed/
+
+En inflight/ el archivo lleva el dueño (`<id>.<host>.<pid>.<token>.eml`, con un
+token por proceso para distinguir un pid reutilizado tras reiniciar). Cada
+`recover_every` segundos se devuelven a pending/ los de dueños que ya no
+existen, y cualquiera con más de `stale_after` segundos (dueño en otro host).
+"""
+from collections import OrderedDict
+import email, email.policy, heapq, logging, os, queue, smtplib, socket, threading, time, uuid
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+SPOOL_DIR = Path(os.environ.get("CIVIC_TWIN_MAIL_SPOOL",
+                                Path(__file__).parent/".cache"/"mail_spool"))
+HOST  = socket.gethostname()
+TOKEN = uuid.uuid4().hex[:8]            # distingue este proceso de otro con el mismo pid
+
+
+class QueueFull(queue.Full):
+    """La cola de envío está llena; el mensaje no quedó en el spool."""
+
+
+def _owner_alive(name) -> bool:
+    """¿Sigue vivo el proceso dueño de un archivo de inflight/? (None: no se puede saber)."""
+    parts = name.split(".")             # id . host... . pid . token . eml
+    if len(parts) < 5:
+        return None
+    host, pid, token = ".".join(parts[1:-3]), parts[-3], parts[-2]
+    if host != HOST or not pid.isdigit():
+        return None
+    if int(pid) == os.getpid():
+        return token == TOKEN
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MailDispatcher:
+    """Cola acotada + worker con conexión SMTP persistente."""
+
+    def __init__(self, cfg: dict, spool=SPOOL_DIR, maxsize=1000, batch=20,
+                 max_retries=5, backoff=2.0, idle_timeout=60.0, stale_after=600.0,
+                 recover_every=30.0, max_status=10_000):
+        self.cfg, self.spool = dict(cfg), Path(spool)
+        self.batch, self.max_retries = batch, max_retries
+        self.backoff, self.idle_timeout, self.stale_after = backoff, idle_timeout, stale_after
+        self.recover_every, self.max_status = recover_every, max_status
+        self._q = queue.Queue(maxsize)
+        self._retry = []                 # heap (cuando, id)
+        self._tries = {}
+        self._status = OrderedDict()     # últimos `max_status` ids (los más viejos se consultan en el spool)
+        self._owner = f"{HOST}.{os.getpid()}.{TOKEN}"
+        self._recovered = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._smtp, self._last_use = None, 0.0
+        self._thread, self._busy = None, False
+        for d in ("pending", "inflight", "failed"):
+            (self.spool/d).mkdir(parents=True, exist_ok=True)
+
+    # ── API ──────────────────────────────────────────────────────────────
+
+    def start(self):
+        """Recupera el spool y arranca el worker (idempotente)."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._recover()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, msg) -> str:
+        """Encola un EmailMessage; devuelve su id. Lanza QueueFull si la cola está llena."""
+        mid = uuid.uuid4().hex[:12]
+        tmp = self.spool/"pending"/f".{mid}.tmp"
+        tmp.write_bytes(msg.as_bytes())
+        os.replace(tmp, self.spool/"pending"/f"{mid}.eml")
+        self._set_status(mid, "pending")    # antes de encolar: el worker puede terminar primero
+        try:
+            self._q.put_nowait(mid)
+        except queue.Full:
+            (self.spool/"pending"/f"{mid}.eml").unlink(missing_ok=True)
+            with self._lock:
+                self._status.pop(mid, None)
+            raise QueueFull(f"cola de envío llena ({self._q.maxsize} mensajes); "
+                            "reintentá en unos minutos") from None
+        return mid
+
+    def status(self, mid) -> str:
+        """'pending', 'sent', 'failed' o 'unknown'."""
+        with self._lock:
+            st = self._status.get(mid)
+        if st is not None:
+            return st
+        if (self.spool/"failed"/f"{mid}.eml").exists():
+            return "failed"
+        if (self.spool/"pending"/f"{mid}.eml").exists() or \
+                any((self.spool/"inflight").glob(f"{mid}.*")):
+            return "pending"
+        return "unknown"
+
+    def _set_status(self, mid, st):
+        with self._lock:
+            self._status[mid] = st
+            self._status.move_to_end(mid)
+            while len(self._status) > self.max_status:
+                self._status.popitem(last=False)
+
+    def flush(self, timeout=10.0) -> bool:
+        """Espera a que no queden mensajes por despachar (útil en pruebas)."""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            with self._lock:
+                idle = self._q.unfinished_tasks == 0 and not self._retry and not self._busy
+            if idle:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._close()
+
+    # ── Worker ───────────────────────────────────────────────────────────
+
+    def _recover(self):
+        """Al arrancar: huérfanos de inflight/ a pending/ y todo pending/ a la cola."""
+        self._requeue_orphans(enqueue=False)
+        for f in sorted((self.spool/"pending").glob("*.eml"), key=lambda p: p.stat().st_mtime):
+            try:
+                self._q.put_nowait(f.stem)
+            except queue.Full:
+                break
+
+    def _requeue_orphans(self, enqueue=True):
+        """Devuelve a pending/ los envíos cuyo dueño murió (o colgados hace `stale_after`)."""
+        now = time.time()
+        self._recovered = time.monotonic()
+        for f in sorted((self.spool/"inflight").glob("*.eml")):
+            try:
+                vivo = _owner_alive(f.name)
+                if vivo is False or (vivo is None and now - f.stat().st_mtime > self.stale_after):
+                    mid = f.name.split(".")[0]
+                    os.replace(f, self.spool/"pending"/f"{mid}.eml")
+                    log.warning("mail %s: recuperado de un envío interrumpido", mid)
+                    if enqueue:
+                        self._q.put_nowait(mid)
+            except (FileNotFoundError, queue.Full):
+                continue            # otro proceso lo recuperó primero / cola llena: al arrancar
+
+    def _next(self):
+        with self._lock:
+            wait = self._retry[0][0] - time.monotonic() if self._retry else 0.5
+            if self._retry and wait <= 0:
+                self._busy = True
+                return heapq.heappop(self._retry)[1], False
+        try:
+            return self._q.get(timeout=min(max(wait, 0.01), 0.5)), True
+        except queue.Empty:
+            return None, False
+
+    def _run(self):
+        while not self._stop.is_set():
+            if time.monotonic() - self._recovered > self.recover_every:
+                self._requeue_orphans()
+            mid, from_q = self._next()
+            if mid is None:
+                if self._smtp and time.monotonic() - self._last_use > self.idle_timeout:
+                    self._close()
+                continue
+            lote = [(mid, from_q)]
+            while len(lote) < self.batch:
+                try:
+                    lote.append((self._q.get_nowait(), True))
+                except queue.Empty:
+                    break
+            for mid, from_q in lote:
+                try:
+                    self._deliver(mid)
+                except Exception:  # el worker nunca debe morir
+                    log.exception("mail %s: error inesperado", mid)
+                finally:
+                    if from_q:
+                        self._q.task_done()
+            self._busy = False
+
+    def _deliver(self, mid):
+        src = self.spool/"pending"/f"{mid}.eml"
+        work = self.spool/"inflight"/f"{mid}.{self._owner}.eml"
+        try:
+            os.replace(src, work)  # lo reclama este worker
+        except FileNotFoundError:
+            return                 # ya lo tomó otro proceso (o ya se envió)
+        msg = email.message_from_bytes(work.read_bytes(), policy=email.policy.default)
+        try:
+            self._connection().send_message(msg)
+        except (smtplib.SMTPException, OSError) as e:
+            self._close()
+            os.replace(work, src)
+            n = self._tries[mid] = self._tries.get(mid, 0) + 1
+            if isinstance(e, smtplib.SMTPRecipientsRefused) or n > self.max_retries:
+                os.replace(src, self.spool/"failed"/f"{mid}.eml")
+                self._set_status(mid, "failed")
+                self._tries.pop(mid, None)
+                log.error("mail %s descartado tras %d intentos: %s", mid, n, e)
+            else:
+                with self._lock:
+                    heapq.heappush(self._retry, (time.monotonic() + self.backoff ** n, mid))
+                log.warning("mail %s: reintento %d: %s", mid, n, e)
+            return
+        work.unlink(missing_ok=True)
+        self._tries.pop(mid, None)
+        self._set_status(mid, "sent")
+        self._last_use = time.monotonic()
+
+    def _connection(self):
+        if self._smtp is not None:
+            return self._smtp
+        c = self.cfg
+        host, port = c["server"], int(c["port"])
+        if c.get("ssl", True):
+            smtp = smtplib.SMTP_SSL(host, port, timeout=c.get("timeout", 30))
+        else:
+            smtp = smtplib.SMTP(host, port, timeout=c.get("timeout", 30))
+            if c.get("starttls"):
+                smtp.starttls()
+        if c.get("username") and c.get("password"):
+            smtp.login(c["username"], c["password"])
+        self._smtp, self._last_use = smtp, time.monotonic()
+        return smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
@@ -1,9 +1,12 @@
 # my_agent.py
-import os, json, subprocess
-import pandas as pd, requests
+#
+# Importar este módulo debe ser barato: las dependencias pesadas (pandas,
+# requests, jinja2, langchain) se importan dentro de cada tool, y el Agent se
+# construye recién la primera vez que se pide (`get_agent()` o `my_agent.agent`).
+# Control de regresión:  python bench/import_time.py
+import os, json
+from functools import lru_cache
 from pathlib import Path
-from langchain.agents import initialize_agent, Tool
-from langchain.chat_models import ChatOpenAI
 
 # ── Funciones “tools” para el Agent ─────────────────────────
 
@@ -12,61 +15,122 @@ def fetch_data(source: dict) -> str:
     if source is None:
         raise ValueError("No source provided")
     if source["type"] == "url":
-        r = requests.get(source["url"])
-        path = Path("/tmp")/Path(source["url"]).name
-        path.write_bytes(r.content)
-        return str(path)
+        # streaming + reanudación + caché condicional (ver agent_fetch.py)
+        from agent_fetch import download
+        return str(download(source["url"], sha256=source.get("sha256")))
     # (añade s3/db si las usarás)
     raise ValueError(f"Source type {source['type']} no soportado")
 
-def prepare_data(path: str, transforms: list) -> str:
-    """Carga CSV, aplica transforms y guarda CSV limpio."""
-    df = pd.read_csv(path)
-    for t in transforms:
-        if t["op"] == "dropna":
-            df = df.dropna()
-        elif t["op"] == "rename":
-            df = df.rename(columns=t["mappings"])
-    out = Path("/tmp")/f"cleaned_{Path(path).name}"
-    df.to_csv(out, index=False)
+def prepare_data(path: str, transforms: list, chunksize: int = None, fmt: str = "csv",
+                 workers: int = 1, ordered: bool = True, out: str = None) -> str:
+    """Carga CSV por bloques (opcionalmente en varios procesos), aplica transforms y guarda el resultado limpio.
+
+    Sin `out`, el nombre lleva un hash de la fuente y del plan: dos nodos con
+    transforms distintos sobre el mismo archivo nunca escriben la misma ruta.
+    """
+    import hashlib
+    from agent_transforms import CHUNKSIZE, run as run_transforms
+    ext = ".parquet" if fmt == "parquet" else ".csv"
+    if out is None:
+        plan = json.dumps([str(Path(path).resolve()), transforms, fmt, ordered],
+                          sort_keys=True, default=str)
+        out = Path("/tmp")/f"cleaned_{Path(path).stem}-{hashlib.sha256(plan.encode()).hexdigest()[:12]}{ext}"
+    run_transforms(path, transforms, out, chunksize=chunksize or CHUNKSIZE, fmt=fmt,
+                   workers=workers, ordered=ordered)
     return str(out)
 
 def generate_dashboard(params: dict) -> str:
-    """Rellena plantilla Jinja y guarda un .py Streamlit."""
-    from jinja2 import Template
-    template = Path("templates/dashboard.py.j2").read_text()
-    script = Template(template).render(**params)
-    out = Path("/tmp")/f"dashboard_{params['project_name']}.py"
-    out.write_text(script)
+    """Rellena plantilla Jinja (compilada una sola vez) y guarda un .py Streamlit."""
+    from agent_templates import output_path, render, write_if_changed
+    out = output_path(params)
+    write_if_changed(out, render(params))
     return str(out)
 
+def generate_dashboards(params_list: list) -> list:
+    """Genera muchos tableros en una pasada; no reescribe los que no cambiaron."""
+    from agent_templates import render_many
+    return [path for path, _ in render_many(params_list)]
+
 def deploy_dashboard(script_path: str) -> str:
-    """Commit a GitHub y devuelve URL pública."""
-    branch = f"deploy/{Path(script_path).stem}"
-    subprocess.run(["git", "checkout", "-b", branch], check=True)
-    dest = Path("dashboards")/Path(script_path).name
-    dest.write_text(Path(script_path).read_text())
-    subprocess.run(["git", "add", str(dest)], check=True)
-    subprocess.run(["git", "commit", "-m", f"Deploy {branch}"], check=True)
-    subprocess.run(["git", "push", "--set-upstream", "origin", branch], check=True)
-    return f"https://{branch.replace('/','-')}.streamlit.app"
+    """Commit a GitHub y devuelve URL pública (por lotes y sin checkout, ver agent_deploy.py)."""
+    return get_deployer().submit(script_path).result()
+
+def deploy_dashboards(script_paths: list) -> dict:
+    """Despliega varios tableros en un solo commit y push; devuelve {ruta: URL}."""
+    from agent_deploy import deploy_many
+    return deploy_many(script_paths)
+
+@lru_cache(maxsize=None)
+def get_deployer():
+    from agent_deploy import DeployBatcher
+    return DeployBatcher()
 
 def send_alert(message: str) -> None:
-    """Envía alertas (ej. webhook Slack)."""
+    """Envía alertas (ej. webhook Slack) en segundo plano, deduplicadas y con rate limit."""
+    alerter = get_alerter()
+    if alerter:
+        alerter.post(message)
+
+@lru_cache(maxsize=None)
+def get_alerter():
     webhook = os.environ.get("SLACK_WEBHOOK")
-    if webhook:
-        requests.post(webhook, json={"text": message})
+    if not webhook:
+        return None
+    from agent_alerts import AlertDispatcher
+    return AlertDispatcher(webhook).start()
 
-# ── Inicializa el Agent ─────────────────────────────────────
+def run_pipeline(spec: dict) -> dict:
+    """Corre un job completo (varias fuentes y tableros) como DAG concurrente."""
+    from agent_pipeline import plan_job, run
+    def on_event(ev):
+        if ev["status"] == "error":
+            send_alert(f"{ev['node']} falló: {ev['error']}")
+    report = run(plan_job(spec), on_event=on_event)
+    return {k: report[k] for k in ("results", "status", "timings", "wall", "failed")}
 
-tools = [
-    Tool(name="fetch_data", func=fetch_data, description="Descarga CSV."),
-    Tool(name="prepare_data", func=prepare_data, description="Limpia datos."),
-    Tool(name="generate_dashboard", func=generate_dashboard, description="Genera script .py."),
-    Tool(name="deploy_dashboard", func=deploy_dashboard, description="Despliega el tablero."),
-    Tool(name="send_alert", func=send_alert, description="Envía alertas si algo falla.")
+# ── Inicializa el Agent (perezoso, una sola vez) ────────────
+
+TOOL_SPECS = [
+    ("fetch_data", fetch_data, "Descarga CSV."),
+    ("prepare_data", prepare_data, "Limpia datos."),
+    ("generate_dashboard", generate_dashboard, "Genera script .py."),
+    ("generate_dashboards", generate_dashboards, "Genera varios scripts .py."),
+    ("deploy_dashboard", deploy_dashboard, "Despliega el tablero."),
+    ("deploy_dashboards", deploy_dashboards, "Despliega varios tableros en un solo commit."),
+    ("send_alert", send_alert, "Envía alertas si algo falla."),
+    ("run_pipeline", run_pipeline, "Corre fetch/prepare/generate/deploy de muchos tableros en paralelo."),
 ]
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, max_tokens=1024)
+@lru_cache(maxsize=None)
+def get_tools():
+    from langchain.agents import Tool
+    return [Tool(name=n, func=f, description=d) for n, f, d in TOOL_SPECS]
+
+@lru_cache(maxsize=None)
+def get_llm_cache():
+    """Caché persistente de respuestas (ver agent_llm_cache.py); `.stats()` da el hit-rate."""
+    from agent_llm_cache import install
+    return install()
+
+@lru_cache(maxsize=None)
+def get_llm():
+    get_llm_cache()
+    fake = os.environ.get("CIVIC_TWIN_FAKE_LLM")  # JSON con respuestas fijas: corridas offline
+    if fake:
+        from agent_llm_cache import fake_llm
+        return fake_llm(json.loads(Path(fake).read_text()))
+    from langchain.chat_models import ChatOpenAI
+    return ChatOpenAI(model="gpt-3.5-turbo", temperature=0, max_tokens=1024)
+
+@lru_cache(maxsize=None)
+def get_agent():
+    from langchain.agents import initialize_agent
+    return initialize_agent(get_tools(), get_llm(), agent="openai-functions", verbose=False)
+
+_LAZY = {"tools": get_tools, "llm": get_llm, "agent": get_agent}
 
-agent = initialize_agent(tools, llm, agent="openai-functions", verbose=False)
+def __getattr__(name):
+    # compatibilidad: `from my_agent import agent` sigue funcionando
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
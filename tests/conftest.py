@@ -0,0 +1,5 @@
+# tests/conftest.py — los módulos viven planos en la raíz del repo
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
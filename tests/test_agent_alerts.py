@@ -0,0 +1,97 @@
+# tests/test_agent_alerts.py
+import http.server, json, threading, time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import agent_alerts as A
+
+
+class Webhook(http.server.ThreadingHTTPServer):
+    """Stand-in del webhook: responde 429 a los primeros `limit` POST."""
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.texts, self.codes, self.limit, self.retry_after = [], [], 0, "0"
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/hook"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *a):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if srv.limit:
+            srv.limit -= 1
+            srv.codes.append(429)
+            ra = srv.retry_after() if callable(srv.retry_after) else srv.retry_after
+            self.send_response(429); self.send_header("Retry-After", ra)
+            self.send_header("Content-Length", "0"); self.end_headers()
+            return
+        srv.codes.append(200)
+        srv.texts.append(body["text"])
+        self.send_response(200); self.send_header("Content-Length", "2"); self.end_headers()
+        self.wfile.write(b"ok")
+
+
+@pytest.fixture
+def hook():
+    srv = Webhook()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+
+
+def http_date(seconds):
+    return format_datetime(datetime.now(timezone.utc) + timedelta(seconds=seconds), usegmt=True)
+
+
+@pytest.mark.parametrize("retry_after", ["0", lambda: http_date(1)], ids=["segundos", "fecha"])
+def test_429_with_retry_after_is_retried(hook, retry_after):
+    hook.limit, hook.retry_after = 1, retry_after
+    d = A.AlertDispatcher(hook.url, rate=100, burst=10, backoff=30).start()
+    t = time.monotonic()
+    d.post("deploy:ventas falló")
+    assert d.flush(timeout=10)
+    d.stop()
+    assert hook.codes == [429, 200] and hook.texts == ["deploy:ventas falló"]
+    assert time.monotonic() - t < 5              # esperó Retry-After, no el backoff de 30 s
+    assert d.stats()["delivered"] == 1
+
+
+def test_retry_after_parsing():
+    assert A.retry_after("3", 9) == 3
+    assert A.retry_after(None, 9) == 9
+    assert A.retry_after("mañana", 9) == 9
+    assert A.retry_after(http_date(-60), 9) == 0
+    assert 0 < A.retry_after(http_date(120), 9) <= 120
+
+
+def test_duplicates_while_pending_are_coalesced(hook):
+    d = A.AlertDispatcher(hook.url, rate=100, burst=10)   # sin start(): todo queda pendiente
+    assert d.post("fetch:clima falló") is True
+    for _ in range(4):
+        assert d.post("fetch:clima falló") is False
+    d.start()
+    d.stop()
+    assert hook.texts == ["fetch:clima falló (×5)"]
+    assert d.stats()["coalesced"] == 4
+
+
+def test_repeats_inside_window_go_out_as_one_summary(hook):
+    d = A.AlertDispatcher(hook.url, window=0.5, rate=100, burst=10).start()
+    d.post("prepare:ventas falló")
+    assert d.flush()
+    for _ in range(3):
+        d.post("prepare:ventas falló")               # ya enviada: se retiene en la ventana
+    assert d.stats()["held"] == 3
+    end = time.monotonic() + 5
+    while len(hook.texts) < 2 and time.monotonic() < end:
+        time.sleep(0.05)
+    d.stop()
+    assert hook.texts == ["prepare:ventas falló", "prepare:ventas falló (×3 en 0.5 s)"]
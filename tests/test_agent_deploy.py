@@ -0,0 +1,66 @@
+# tests/test_agent_deploy.py
+import subprocess
+
+import pytest
+
+import agent_deploy as D
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", "-C", str(cwd), *args], check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    for k, v in (("GIT_AUTHOR_NAME", "t"), ("GIT_AUTHOR_EMAIL", "t@t"),
+                 ("GIT_COMMITTER_NAME", "t"), ("GIT_COMMITTER_EMAIL", "t@t")):
+        monkeypatch.setenv(k, v)
+    bare = tmp_path/"remote.git"
+    git(tmp_path, "init", "-q", "--bare", str(bare))
+    seed = tmp_path/"seed"
+    git(tmp_path, "clone", "-q", str(bare), str(seed))
+    (seed/"README.md").write_text("civic twin\n")
+    git(seed, "add", "README.md")
+    git(seed, "commit", "-q", "-m", "inicio")
+    git(seed, "push", "-q", "origin", "HEAD")
+    return bare
+
+
+def clone(remote, dest):
+    git(remote.parent, "clone", "-q", str(remote), str(dest))
+    return dest
+
+
+def script(repo, name):
+    p = repo/name
+    p.write_text(f"print({name!r})\n")
+    return p
+
+
+def deployed(remote):
+    return git(remote, "ls-tree", "-r", "--name-only", D.BRANCH).splitlines()
+
+
+def test_first_deploy_creates_branch_on_remote(remote, tmp_path):
+    work = clone(remote, tmp_path/"a")
+    urls = D.deploy_many([script(work, "uno.py")], repo=work)
+    assert deployed(remote) == ["README.md", "dashboards/uno.py"]
+    assert git(remote, "rev-parse", f"{D.BRANCH}^") == git(work, "rev-parse", "HEAD")
+    [url] = urls.values()
+    assert "branch=deploy%2Fdashboards" in url and "dashboards%2Funo.py" in url
+
+
+def test_fresh_clone_builds_on_remote_branch(remote, tmp_path):
+    D.deploy_many([script(clone(remote, tmp_path/"a"), "uno.py")], repo=tmp_path/"a")
+    first = git(remote, "rev-parse", D.BRANCH)
+    work = clone(remote, tmp_path/"b")           # la rama de deploy sólo existe en el remoto
+    D.deploy_many([script(work, "dos.py")], repo=work)
+    assert deployed(remote) == ["README.md", "dashboards/dos.py", "dashboards/uno.py"]
+    assert git(remote, "rev-parse", f"{D.BRANCH}^") == first   # fast-forward
+
+
+def test_git_errors_carry_stderr(tmp_path):
+    git(tmp_path, "init", "-q")
+    with pytest.raises(D.GitError, match="fatal"):
+        D._git(tmp_path, "rev-parse", "--verify", "no-existe")
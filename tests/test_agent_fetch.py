@@ -0,0 +1,114 @@
+# tests/test_agent_fetch.py
+import hashlib, http.server, json, os, threading
+
+import pytest
+
+import agent_fetch as F
+
+DATA = os.urandom(300_000)
+ETAG = '"v1"'
+
+
+class Server(http.server.ThreadingHTTPServer):
+    """Stand-in HTTP con ETag, 304 y Range (apagable con `ignore_range`)."""
+    ignore_range = False
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.log = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/data.csv"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *a):
+        pass
+
+    def do_GET(self):
+        srv, rng = self.server, self.headers.get("Range")
+        if self.headers.get("If-None-Match") == ETAG:
+            srv.log.append(304)
+            self.send_response(304); self.end_headers()
+            return
+        start = int(rng.split("=")[1].rstrip("-")) if rng and not srv.ignore_range else 0
+        body = DATA[start:]
+        srv.log.append(206 if start else 200)
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(DATA) - 1}/{len(DATA)}")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    srv = Server()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+
+
+def fetch(server, tmp_path, name="out.csv"):
+    return F.download(server.url, tmp_path/name, sha256=hashlib.sha256(DATA).hexdigest(),
+                      cache_dir=tmp_path/"cache")
+
+
+def partial(server, tmp_path, n):
+    d = tmp_path/"cache"/"partial"
+    d.mkdir(parents=True)
+    k = F._key(server.url)
+    (d/f"{k}.part").write_bytes(DATA[:n])
+    (d/f"{k}.json").write_text(json.dumps({"url": server.url, "etag": ETAG,
+                                           "last_modified": None, "size": len(DATA)}))
+
+
+def test_full_download(server, tmp_path):
+    assert fetch(server, tmp_path).read_bytes() == DATA
+    assert server.log == [200]
+    assert [p.name for p in (tmp_path/"cache"/"objects").iterdir()] == [hashlib.sha256(DATA).hexdigest()]
+
+
+def test_not_modified_reuses_cached_object(server, tmp_path):
+    fetch(server, tmp_path)
+    assert fetch(server, tmp_path, "again.csv").read_bytes() == DATA
+    assert server.log == [200, 304]
+
+
+def test_editing_the_result_does_not_corrupt_the_cache(server, tmp_path):
+    out = fetch(server, tmp_path)
+    with open(out, "ab") as f:
+        f.write(b"fila agregada por otra tool\n")
+    assert fetch(server, tmp_path).read_bytes() == DATA     # el 304 reusa un objeto intacto
+
+
+def test_range_resume(server, tmp_path):
+    partial(server, tmp_path, 100_000)
+    assert fetch(server, tmp_path).read_bytes() == DATA
+    assert server.log == [206]
+
+
+def test_server_ignoring_range_restarts(server, tmp_path):
+    server.ignore_range = True
+    partial(server, tmp_path, 100_000)
+    assert fetch(server, tmp_path).read_bytes() == DATA
+    assert server.log == [200]
+
+
+def test_prune_drops_unreferenced_and_oldest(tmp_path):
+    cache = tmp_path/"cache"
+    for d in ("objects", "index"):
+        (cache/d).mkdir(parents=True)
+    for i, name in enumerate(("huerfano", "viejo", "nuevo")):
+        o = cache/"objects"/name
+        o.write_bytes(b"x" * 100)
+        os.utime(o, (1000 + i, 1000 + i))
+    for name in ("viejo", "nuevo"):
+        (cache/"index"/f"{name}.json").write_text(json.dumps({"sha256": name}))
+    assert [o.name for o in F.prune(cache, max_bytes=1_000)] == ["huerfano"]
+    assert [o.name for o in F.prune(cache, max_bytes=150)] == ["viejo"]
+    assert not (cache/"index"/"viejo.json").exists()
+    assert [o.name for o in (cache/"objects").iterdir()] == ["nuevo"]
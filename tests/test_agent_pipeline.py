@@ -0,0 +1,42 @@
+# tests/test_agent_pipeline.py
+import pandas as pd
+
+import my_agent as A
+from agent_pipeline import Node, run
+
+
+def _prepare(src, transforms, cache_dir):
+    rep = run([Node("prepare", A.prepare_data, (str(src), transforms), cache=True)],
+              cache_dir=cache_dir)
+    return rep["status"]["prepare"], pd.read_csv(rep["results"]["prepare"])
+
+
+def test_cache_hit_restores_its_own_output(tmp_path):
+    """dropna → filter → dropna: el acierto devuelve el archivo del primer dropna,
+    no el del filter que pisó la misma ruta de salida."""
+    src = tmp_path/"pipeline_cache_seq.csv"
+    pd.DataFrame({"a": [1, 2, None, 4], "b": [1, 5, 3, 2]}).to_csv(src, index=False)
+    dropna, filtro = [{"op": "dropna"}], [{"op": "filter", "expr": "b > 4"}]
+    cache = tmp_path/"cache"
+
+    st, df = _prepare(src, dropna, cache)
+    assert (st, len(df)) == ("done", 3)
+    st, df = _prepare(src, filtro, cache)
+    assert (st, len(df)) == ("done", 1)
+    st, df = _prepare(src, dropna, cache)
+    assert (st, len(df)) == ("cached", 3)
+    assert df["a"].tolist() == [1, 2, 4]
+
+
+def test_concurrent_prepare_nodes_write_their_own_output(tmp_path):
+    """Dos nodos sobre la misma fuente, en el pool de procesos a la vez."""
+    src = tmp_path/"ventas.csv"
+    pd.DataFrame({"b": [i % 10 for i in range(200_000)]}).to_csv(src, index=False)
+    nodes = [Node(f"prepare:{n}", A.prepare_data, (str(src), [{"op": "filter", "expr": e}]),
+                  pool="process", cache=True)
+             for n, e in (("bajo", "b < 5"), ("alto", "b >= 5"))]
+    rep = run(nodes, cache_dir=tmp_path/"cache")
+    bajo, alto = rep["results"]["prepare:bajo"], rep["results"]["prepare:alto"]
+    assert bajo != alto
+    assert pd.read_csv(bajo)["b"].max() == 4 and len(pd.read_csv(bajo)) == 100_000
+    assert pd.read_csv(alto)["b"].min() == 5 and len(pd.read_csv(alto)) == 100_000
@@ -0,0 +1,37 @@
+# tests/test_agent_transforms.py
+import pandas as pd
+import pytest
+
+import agent_transforms as T
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_header_only_input_writes_empty_output(tmp_path, fmt, workers):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    src = tmp_path/"in.csv"
+    src.write_text("a,b\n")
+    out = tmp_path/f"out.{fmt}"
+    plan = [{"op": "dropna"}, {"op": "rename", "mappings": {"b": "c"}}]
+    stats = T.run(src, plan, out, fmt=fmt, workers=workers)
+    assert (stats["rows_in"], stats["rows_out"]) == (0, 0)
+    df = pd.read_csv(out) if fmt == "csv" else pd.read_parquet(out)
+    assert df.empty and list(df.columns) == ["a", "c"]
+    assert not list(tmp_path.glob(".*"))   # ni tmp ni partes sueltas
+
+
+def test_parquet_promotes_types_that_change_between_chunks(tmp_path):
+    pytest.importorskip("pyarrow")
+    src = tmp_path/"in.csv"
+    pd.DataFrame({"vacia": [None, None, "x", "y", None, "z"],
+                  "n":     [1, 2, 3.5, None, 5, 6],
+                  "mixta": [1, 2, 3, 4, "a", "b"]}).to_csv(src, index=False)
+    out = tmp_path/"out.parquet"
+    stats = T.run(src, [], out, chunksize=2, fmt="parquet")
+    df = pd.read_parquet(out)
+    assert stats["rows_out"] == len(df) == 6
+    assert df["vacia"].tolist() == [None, None, "x", "y", None, "z"]
+    assert df["n"].tolist()[:3] == [1.0, 2.0, 3.5] and pd.isna(df["n"][3])
+    assert df["mixta"].tolist() == ["1", "2", "3", "4", "a", "b"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.csv", "out.parquet"]
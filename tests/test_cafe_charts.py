@@ -0,0 +1,67 @@
+# tests/test_cafe_charts.py
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from cafe_charts import TORNADO_SPEC, projection_grid_spec, publish_grid, tornado_data
+from cafe_engine import HORIZONTE
+
+inf = np.inf
+
+
+def _tornado(bajo, alto):
+    bajo, alto = np.array(bajo, dtype=float), np.array(alto, dtype=float)
+    with np.errstate(invalid="ignore"):
+        imp = np.nan_to_num(np.abs(alto - bajo), nan=inf)
+    return SimpleNamespace(nombre=np.array([f"e{i}" for i in range(len(bajo))]),
+                           payback_bajo=bajo, payback_alto=alto, impacto=imp)
+
+
+def test_unprofitable_variants_are_kept_and_clamped():
+    rows = tornado_data(_tornado([inf, 8.0, inf, 5.0], [3.0, 12.0, inf, 5.0]))
+    by = {(r["entrada"], r["variación"]): r for r in rows}
+    assert {e for e, _ in by} == {"e0", "e1", "e2"}          # e3 sin impacto: fuera
+    assert by["e0", "-"]["payback"] == 12.0 and by["e0", "-"]["etiqueta"] == "sin payback"
+    assert by["e0", "+"]["etiqueta"] == "3.00"
+    assert by["e2", "-"]["payback"] == by["e2", "+"]["payback"] == 12.0
+    assert all(np.isfinite(r["payback"]) for r in rows)
+
+
+def test_all_unprofitable_clamps_to_horizon():
+    rows = tornado_data(_tornado([inf], [inf]))
+    assert [r["payback"] for r in rows] == [float(HORIZONTE)] * 2
+    assert {r["etiqueta"] for r in rows} == {"sin payback"}
+
+
+def test_spec_labels_clamped_bars():
+    text = [l for l in TORNADO_SPEC["layer"] if l["mark"]["type"] == "text"]
+    assert text and text[0]["encoding"]["text"]["field"] == "etiqueta"
+
+
+def _grid():
+    c, t = np.arange(30, 51, 5.0), np.arange(3000, 3301, 100.0)
+    return SimpleNamespace(clientes=c, tickets=t, inflacion=np.arange(0, 11.0), inv=9.5e6,
+                           ganancia=c[:, None] * t[None, :] * 10 - 2e6)
+
+
+def test_grid_published_once_per_version(tmp_path):
+    g, out = _grid(), tmp_path/"grid"
+    url = publish_grid(g, "v1", out)
+    assert url.endswith("grid/v1.json")
+    rows = json.loads((out/"v1.json").read_text())
+    k = 2 * len(g.tickets) + 3                    # clientes[2], tickets[3]
+    assert rows[k] == {"k": k, "g": g.ganancia[2, 3]}
+    publish_grid(g, "v2", out)
+    assert sorted(p.name for p in out.iterdir()) == ["v2.json"]
+
+
+def test_grid_spec_reuses_fixed_part_and_omits_grid(tmp_path):
+    g = _grid()
+    url = publish_grid(g, "v1", tmp_path/"grid")
+    a = projection_grid_spec(g, 35, 3100, 0, url=url)
+    b = projection_grid_spec(g, 45, 3200, 5, url=url)
+    assert a["transform"] is b["transform"]       # cacheado por versión: sólo cambian los valores
+    assert [p["value"] for p in b["params"]] == [45.0, 3200.0, 5.0]
+    assert "G" not in {p["name"] for p in a["params"]}
+    assert len(json.dumps(a)) < len(json.dumps(projection_grid_spec(g, 35, 3100, 0)))
@@ -0,0 +1,44 @@
+# tests/test_cafe_projection.py
+import numpy as np
+
+from cafe_projection import Projection, ProjectionPool
+
+ARGS = dict(cli=100, tic=5000, wd=26, ins_pct=.3, inv=9.5e6,
+            costs={"Personal": 1.7e6, "Insumos": 2e6}, curves={"general": 60.0})
+
+
+def test_pool_reuses_projection_per_session():
+    pool = ProjectionPool()
+    p = pool.get("a", 24, "M")
+    assert pool.get("a", 24, "M") is p
+    assert pool.get("a", 36, "M") is not p          # otro horizonte: nueva
+
+
+def test_pool_is_bounded_by_entries_and_bytes():
+    pool = ProjectionPool(maxsize=4)
+    for i in range(10):
+        pool.get(i, 24, "M")
+    assert len(pool) == 4
+
+    one = Projection(240, "D")
+    one.update(**ARGS)
+    pool = ProjectionPool(max_bytes=3 * one.nbytes)
+    for i in range(10):
+        pool.get(i, 240, "D").update(**ARGS)
+    assert len(pool) <= 3
+
+
+def test_pool_frees_idle_sessions():
+    pool = ProjectionPool(ttl=0.0)
+    for i in range(5):
+        pool.get(i, 24, "M")
+    assert len(pool) == 1                          # sólo la última sesión en uso
+
+
+def test_update_matches_full_recompute():
+    p = Projection(24, "M")
+    p.update(**ARGS)
+    p.update(**{**ARGS, "curves": {"general": 60.0, "Personal": 80.0}})
+    q = Projection(24, "M")
+    q.update(**{**ARGS, "curves": {"general": 60.0, "Personal": 80.0}})
+    assert np.allclose(p.flujo, q.flujo)
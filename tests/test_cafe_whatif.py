@@ -0,0 +1,19 @@
+# tests/test_cafe_whatif.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import cafe_whatif as W
+
+
+def test_parquet_schema_fixed_across_chunks(tmp_path):
+    pytest.importorskip("pyarrow")
+    src, out = tmp_path/"esc.csv", tmp_path/"res.parquet"
+    pd.DataFrame({"id": range(6), "etiqueta": [None, None, "a", "b", 3, None],
+                  "cli": [np.nan, np.nan, 100, 120, 80, 90]}).to_csv(src, index=False)
+    stats = W.run(W.read_chunks(src, 2), out, workers=0)
+    df = pd.read_parquet(out)
+    assert stats["bloques"] == 3 and len(df) == 6
+    assert df["id"].tolist() == list(range(6))
+    assert df["etiqueta"].tolist() == [None, None, "a", "b", "3", None]
+    assert df["cli"].dtype == float and df["ganancia"].notna().all()
@@ -0,0 +1,92 @@
+# tests/test_contact_mailer.py
+import socket, subprocess, sys, time
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+import contact_mailer as M
+
+
+class Handler:
+    """Stand-in SMTP: cuenta sesiones y responde `fail` 4xx antes de aceptar."""
+    def __init__(self, fail=0):
+        self.fail, self.sessions, self.received = fail, 0, []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail:
+            self.fail -= 1
+            return "451 4.3.0 reintentar más tarde"
+        self.received.append(envelope.content.decode())
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp():
+    with socket.socket() as s:                   # puerto libre
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = Handler()
+    c = Controller(handler, hostname="127.0.0.1", port=port)
+    c.start()
+    handler.cfg = {"server": "127.0.0.1", "port": port, "ssl": False}
+    yield handler
+    c.stop()
+
+
+def msg(i):
+    m = EmailMessage()
+    m["Subject"], m["From"], m["To"] = f"contacto {i}", "web@cafe.test", "hola@cafe.test"
+    m.set_content(f"mensaje {i}")
+    return m
+
+
+def dispatcher(smtp, tmp_path, **kw):
+    return M.MailDispatcher(smtp.cfg, spool=tmp_path/"spool", backoff=0.05, **kw)
+
+
+def test_batch_sent_over_one_connection(smtp, tmp_path):
+    d = dispatcher(smtp, tmp_path).start()
+    ids = [d.submit(msg(i)) for i in range(5)]
+    assert d.flush()
+    d.stop()
+    assert [d.status(i) for i in ids] == ["sent"] * 5
+    assert len(smtp.received) == 5 and smtp.sessions == 1
+    assert not any((tmp_path/"spool"/"pending").iterdir())
+
+
+def test_retry_after_4xx(smtp, tmp_path):
+    smtp.fail = 2
+    d = dispatcher(smtp, tmp_path).start()
+    mid = d.submit(msg(0))
+    assert d.flush()
+    d.stop()
+    assert d.status(mid) == "sent" and len(smtp.received) == 1
+
+
+def test_orphan_of_dead_owner_is_requeued(smtp, tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    d = dispatcher(smtp, tmp_path, recover_every=0.1).start()
+    orphan = tmp_path/"spool"/"inflight"/f"huerfano01.{M.HOST}.{dead.pid}.deadbeef.eml"
+    orphan.write_bytes(msg(1).as_bytes())       # cae después de arrancar: recuperación periódica
+    end = time.monotonic() + 5
+    while d.status("huerfano01") != "sent" and time.monotonic() < end:
+        time.sleep(0.05)
+    d.stop()
+    assert d.status("huerfano01") == "sent" and not orphan.exists()
+
+
+def test_full_queue_raises_with_message(smtp, tmp_path):
+    d = dispatcher(smtp, tmp_path, maxsize=1)      # sin start(): nadie vacía la cola
+    d.submit(msg(0))
+    with pytest.raises(M.QueueFull, match="cola de envío llena"):
+        d.submit(msg(1))
+    assert len(list((tmp_path/"spool"/"pending").glob("*.eml"))) == 1
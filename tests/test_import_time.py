@@ -0,0 +1,28 @@
+# tests/test_import_time.py
+import json, os, subprocess, sys
+from pathlib import Path
+
+ROOT  = Path(__file__).resolve().parent.parent
+HEAVY = ("pandas", "requests", "jinja2", "langchain")
+
+# presupuesto holgado para CI; bench/import_time.py mide con el fino (50 ms)
+BUDGET_MS = float(os.environ.get("CIVIC_TWIN_IMPORT_BUDGET_MS", 500))
+
+
+def _run(code):
+    r = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                       capture_output=True, text=True, check=True)
+    return json.loads(r.stdout)
+
+
+def test_import_does_not_load_heavy_dependencies():
+    mods = _run("import json, sys, my_agent; print(json.dumps(sorted(sys.modules)))")
+    loaded = sorted({m.split(".")[0] for m in mods} & set(HEAVY))
+    assert loaded == [], f"import my_agent arrastra {loaded}"
+
+
+def test_import_within_budget():
+    code = ("import json, time; t = time.perf_counter(); import my_agent; "
+            "print(json.dumps((time.perf_counter() - t) * 1000))")
+    best = min(_run(code) for _ in range(3))
+    assert best <= BUDGET_MS, f"import my_agent tardó {best:.1f} ms (presupuesto {BUDGET_MS:g} ms)"